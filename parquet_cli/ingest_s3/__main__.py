@@ -17,6 +17,12 @@ from parquet_flask.cdms_lambda_func.lambda_func_env import LambdaFuncEnv
 class IngestS3Entry:
     BUCKET_NAME_KEY = 'BUCKET_NAME'
     KEY_PREFIX_KEY = 'KEY_PREFIX'
+    BATCH_SIZE_KEY = 'BATCH_SIZE'
+    WORKERS_KEY = 'WORKERS'
+    CHECKPOINT_FILE_KEY = 'CHECKPOINT_FILE'
+    MAX_RETRIES_KEY = 'MAX_RETRIES'
+    REPORT_INTERVAL_KEY = 'REPORT_INTERVAL'
+    APPEND_DELTA_KEY = 'APPEND_DELTA'
 
     def __init__(self):
         self.__a = ''
@@ -43,6 +49,35 @@ class IngestS3Entry:
                             help="s3 prefix. It will ingest all files starting with this prefix. If all filees need to be ingested, pass empty value. If only 1 file needs to be ingested, pass the exact file path",
                             metavar='2021/01/01/samplefile.json.gz',
                             required=True)
+        parser.add_argument(f'--{self.BATCH_SIZE_KEY}',
+                            help="number of files to ingest in 1 request with ingest_json_s3_batch. 1 to ingest files one by one",
+                            default='1',
+                            metavar='100',
+                            required=False)
+        parser.add_argument(f'--{self.WORKERS_KEY}',
+                            help="number of concurrent ingest requests",
+                            default='1',
+                            metavar='8',
+                            required=False)
+        parser.add_argument(f'--{self.CHECKPOINT_FILE_KEY}',
+                            help="file to record ingested s3 urls. They are skipped when it is run again with the same file",
+                            default=None,
+                            metavar='/tmp/ingest_s3_checkpoint.txt',
+                            required=False)
+        parser.add_argument(f'--{self.MAX_RETRIES_KEY}',
+                            help="number of retries for connection errors, and 429, 502, 503, 504 responses",
+                            default='3',
+                            metavar='3',
+                            required=False)
+        parser.add_argument(f'--{self.REPORT_INTERVAL_KEY}',
+                            help="seconds between progress reports",
+                            default='30',
+                            metavar='30',
+                            required=False)
+        parser.add_argument(f'--{self.APPEND_DELTA_KEY}',
+                            help="for files which are already ingested, append only new rows instead of replacing them. For growing files",
+                            action='store_true',
+                            required=False)
         parser.add_argument(f'--{LambdaFuncEnv.LOG_LEVEL}',
                             help="python log level in integer.",
                             default='10',
@@ -63,17 +98,19 @@ class IngestS3Entry:
         bucket_name = getattr(options, self.BUCKET_NAME_KEY)
         key_prefix = getattr(options, self.KEY_PREFIX_KEY)
 
-        from parquet_flask.cdms_lambda_func.ingest_s3_to_cdms.ingest_s3_to_cdms import IngestS3ToCdms
         from parquet_flask.aws.aws_s3 import AwsS3
+        from parquet_cli.ingest_s3.ingest_s3_runner import IngestS3Runner
 
         s3 = AwsS3()
-        for key, size in s3.get_child_s3_files(bucket_name, key_prefix,
-                                               lambda x: x['Key'].endswith('.json') or x['Key'].endswith('.json.gz')):
-            try:
-                print(f'working on: {key}')
-                IngestS3ToCdms().start(event={'s3_url': f's3://{bucket_name}/{key}'})
-            except Exception as e:
-                print(f'error while processing: s3://{bucket_name}/{key}. details: {str(e)}')
+        s3_files = [(f's3://{bucket_name}/{key}', size, etag) for key, size, etag in s3.get_child_s3_file_details(bucket_name, key_prefix,
+                                                                                                                lambda x: x['Key'].endswith('.json') or x['Key'].endswith('.json.gz'))]
+        print(f'found {len(s3_files)} files under s3://{bucket_name}/{key_prefix}')
+        IngestS3Runner(workers=int(getattr(options, self.WORKERS_KEY)),
+                       batch_size=int(getattr(options, self.BATCH_SIZE_KEY)),
+                       checkpoint_file=getattr(options, self.CHECKPOINT_FILE_KEY),
+                       max_retries=int(getattr(options, self.MAX_RETRIES_KEY)),
+                       report_interval=float(getattr(options, self.REPORT_INTERVAL_KEY)),
+                       append_delta=getattr(options, self.APPEND_DELTA_KEY)).start(s3_files)
         return
 
 
@@ -88,6 +125,17 @@ if __name__ == '__main__':
       --PARQUET_META_TBL_NAME cdms_parquet_meta_dev_v1  \
       --BUCKET_NAME cdms-dev-ncar-in-situ-stage  \
       --KEY_PREFIX cdms_icoads_2017-01-01.json
+
+    Backfilling with 8 concurrent requests. It can be resumed with the same checkpoint file:
+
+    python3 -m parquet_cli.ingest_s3 \
+      --CDMS_DOMAIN https://doms.jpl.nasa.gov/insitu  \
+      --CDMS_BEARER_TOKEN Mock-Token  \
+      --PARQUET_META_TBL_NAME cdms_parquet_meta_dev_v1  \
+      --BUCKET_NAME cdms-dev-ncar-in-situ-stage  \
+      --KEY_PREFIX cdms_icoads_2017 \
+      --WORKERS 8 \
+      --CHECKPOINT_FILE /tmp/icoads_2017_checkpoint.txt
   
   
     """
@@ -0,0 +1,168 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock, local
+
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IngestS3Runner:
+    """
+    Sending S3 files to the ingest endpoints with several workers.
+
+    - each worker thread keeps its own IngestS3ToCdms (DynamoDB client) and HTTP session
+    - throttled or unavailable responses and connection errors are retried with exponential backoff
+    - ingested S3 urls are appended to the checkpoint file, and they are skipped when it is run again
+    - metadata records are retrieved in batches, and files with unchanged ETag & size are skipped without sending them
+    """
+    RETRIABLE_STATUS_CODES = [429, 502, 503, 504]
+
+    def __init__(self, workers=1, batch_size=1, checkpoint_file=None, max_retries=3, backoff_seconds=2.0, report_interval=30, append_delta=False):
+        self.__workers = workers
+        self.__batch_size = batch_size
+        self.__checkpoint_file = checkpoint_file
+        self.__max_retries = max_retries
+        self.__backoff_seconds = backoff_seconds
+        self.__report_interval = report_interval
+        self.__append_delta = append_delta
+        self.__thread_local = local()
+        self.__lock = Lock()
+        self.__ingested_files = 0
+        self.__ingested_bytes = 0
+        self.__failed_files = 0
+        self.__existing_records = {}
+
+    def __read_checkpoint(self):
+        if self.__checkpoint_file is None or not os.path.isfile(self.__checkpoint_file):
+            return set()
+        with open(self.__checkpoint_file, 'r') as ff:
+            return set([k.strip() for k in ff.readlines() if k.strip() != ''])
+
+    def __write_checkpoint(self, s3_urls: list):
+        if self.__checkpoint_file is None or len(s3_urls) < 1:
+            return
+        with open(self.__checkpoint_file, 'a') as ff:
+            ff.write(''.join([f'{k}\n' for k in s3_urls]))
+        return
+
+    def __get_ingester(self):
+        if not hasattr(self.__thread_local, 'ingester'):
+            from parquet_flask.cdms_lambda_func.ingest_s3_to_cdms.ingest_s3_to_cdms import IngestS3ToCdms
+            ingester = IngestS3ToCdms()
+            ingester.http_session = requests.Session()
+            self.__thread_local.ingester = ingester
+        return self.__thread_local.ingester
+
+    def __ingest_with_retry(self, s3_urls: list):
+        ingester = self.__get_ingester()
+        last_error = None
+        for attempt in range(self.__max_retries + 1):
+            if attempt > 0:
+                sleep_seconds = self.__backoff_seconds * (2 ** (attempt - 1)) + random.uniform(0, self.__backoff_seconds)
+                LOGGER.warning(f'retrying {s3_urls[0]} in {sleep_seconds:.1f} seconds. last error: {last_error}')
+                time.sleep(sleep_seconds)
+            try:
+                result = ingester.start(event={'s3_url': s3_urls[0], 'ddb_record': self.__existing_records.get(s3_urls[0], None), 'append_delta': self.__append_delta}) \
+                    if len(s3_urls) < 2 else ingester.start_batch(s3_urls)
+            except requests.exceptions.RequestException as e:
+                last_error = str(e)
+                continue
+            if result.status_code not in self.RETRIABLE_STATUS_CODES:
+                return result
+            last_error = f'status code: {result.status_code}'
+        raise RuntimeError(f'failed after {self.__max_retries + 1} attempts. last error: {last_error}')
+
+    def __get_failed_urls(self, s3_urls: list, result):
+        if result.status_code >= 400:
+            return set(s3_urls)
+        if len(s3_urls) < 2 or result.status_code != 207:
+            return set()
+        return set([k['s3_url'] for k in result.json().get('failed', [])])  # partially ingested batch
+
+    def __ingest(self, s3_files: list):
+        """
+        :param s3_files: list - [(s3_url, size, etag)]. 1 file unless it is a batch
+        :return: None
+        """
+        s3_urls = [k[0] for k in s3_files]
+        try:
+            result = self.__ingest_with_retry(s3_urls)
+            failed_urls = self.__get_failed_urls(s3_urls, result)
+            if len(failed_urls) > 0:
+                LOGGER.error(f'failed to ingest {len(failed_urls)} file(s) starting with: {s3_urls[0]}. status: {result.status_code}. details: {result.text}')
+        except Exception as e:
+            LOGGER.error(f'error while processing: {s3_urls[0]}{"" if len(s3_urls) < 2 else f" and {len(s3_urls) - 1} more files"}. details: {str(e)}')
+            failed_urls = set(s3_urls)
+        ingested_files = [k for k in s3_files if k[0] not in failed_urls]
+        with self.__lock:
+            self.__write_checkpoint([k[0] for k in ingested_files])
+            self.__ingested_files += len(ingested_files)
+            self.__ingested_bytes += sum([k[1] for k in ingested_files])
+            self.__failed_files += len(failed_urls)
+        return
+
+    def __skip_unchanged(self, s3_files: list):
+        """
+        :param s3_files: list - [(s3_url, size, etag)]
+        :return: tuple - (new files, changed files which are already ingested)
+        """
+        if len(s3_files) < 1:
+            return [], []
+        self.__existing_records = self.__get_ingester().get_existing_records([k[0] for k in s3_files])
+        new_files = [k for k in s3_files if k[0] not in self.__existing_records]
+        changed_files = [k for k in s3_files if k[0] in self.__existing_records and not self.__get_ingester().is_unchanged(self.__existing_records[k[0]], k[2], k[1])]
+        unchanged_count = len(s3_files) - len(new_files) - len(changed_files)
+        if unchanged_count > 0:
+            LOGGER.info(f'skipping {unchanged_count} files which are unchanged since they were ingested')
+        return new_files, changed_files
+
+    def __report(self, total_files, start_time):
+        duration = max(time.time() - start_time, 1e-6)
+        LOGGER.info(f'progress: {self.__ingested_files + self.__failed_files}/{total_files} files. '
+                    f'ingested: {self.__ingested_files}. failed: {self.__failed_files}. '
+                    f'throughput: {self.__ingested_files / duration:.2f} files/s, {self.__ingested_bytes / duration / 1024 / 1024:.2f} MB/s')
+        return
+
+    def start(self, s3_files: list):
+        """
+        :param s3_files: list - [(s3_url, size in bytes, etag)]
+        :return: tuple - (number of ingested files, number of failed files)
+        """
+        checkpoint = self.__read_checkpoint()
+        pending_files = [k for k in s3_files if k[0] not in checkpoint]
+        if len(pending_files) < len(s3_files):
+            LOGGER.info(f'skipping {len(s3_files) - len(pending_files)} files in checkpoint: {self.__checkpoint_file}')
+        new_files, changed_files = self.__skip_unchanged(pending_files)
+        pending_files = new_files + changed_files
+        batch_size = max(self.__batch_size, 1)
+        batches = [new_files[i: i + batch_size] for i in range(0, len(new_files), batch_size)]
+        batches.extend([[k] for k in changed_files])  # replaced one by one since the batch endpoint skips ingested files
+        start_time = time.time()
+        last_report_time = start_time
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            for each_future in as_completed([executor.submit(self.__ingest, k) for k in batches]):
+                each_future.result()
+                if time.time() - last_report_time >= self.__report_interval:
+                    self.__report(len(pending_files), start_time)
+                    last_report_time = time.time()
+        self.__report(len(pending_files), start_time)
+        return self.__ingested_files, self.__failed_files
@@ -47,6 +47,10 @@ def flask_me():
 
     from gevent.pywsgi import WSGIServer
     from parquet_flask import get_app
+    from parquet_flask.io_logic.spark_warm_up import SparkWarmUp
+    SparkWarmUp().start_in_background()
+    from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+    IngestWorkerPool().start()  # resuming queued ingest jobs
     # get_app().run(host='0.0.0.0', port=9788, threaded=True)
     http_server = WSGIServer(('', 9801), get_app())
     http_server.serve_forever()
@@ -1,4 +1,5 @@
 import base64
+import hmac
 import json
 from typing import Union
 
@@ -32,6 +33,6 @@ class AuthenticatorAwsSecretManager(AuthenticatorAbstract):
             input_auth_value = base64.standard_b64decode(input_auth_cred['Authorization'].encode()).decode()
         except:
             return f'unable to base64 decode the value from Authorization'
-        if input_auth_value != self.__token:
+        if not hmac.compare_digest(input_auth_value.encode(), str(self.__token).encode()):  # constant time comparison
             return f'mismatch incoming base64 token vs existing token'
         return None
@@ -0,0 +1,88 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from threading import Lock, Thread
+from time import time
+from typing import Union
+
+from parquet_flask.authenticator.authenticator_abstract import AuthenticatorAbstract
+from parquet_flask.authenticator.authenticator_factory import AuthenticatorFactory
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CachedAuthenticator(metaclass=Singleton):
+    """
+    Keeping the authenticator with its credentials instead of retrieving them on every request.
+
+    - credentials older than `authentication_cache_ttl_seconds` are refreshed in a background thread while the old ones are still used.
+    - if refreshing fails, the old ones are used till they are older than `authentication_max_stale_seconds`.
+    - after that, they are refreshed before authenticating, and the error is raised if it fails.
+    """
+    def __init__(self):
+        config = Config()
+        self.__authentication_type = config.get_value(Config.authentication_type, AuthenticatorFactory.FILE)
+        self.__cred_name = config.get_value(Config.authentication_key, 'None')
+        self.__ttl = float(config.get_value(Config.authentication_cache_ttl_seconds, '300'))
+        self.__max_stale = float(config.get_value(Config.authentication_max_stale_seconds, '3600'))
+        self.__authenticator = None
+        self.__loaded_time = 0
+        self.__refresh_lock = Lock()
+        self.__is_refreshing = False
+
+    @property
+    def age(self):
+        return time() - self.__loaded_time
+
+    def __load(self):
+        authenticator: AuthenticatorAbstract = AuthenticatorFactory().get_instance(self.__authentication_type)
+        authenticator.get_auth_credentials(self.__cred_name)
+        self.__authenticator = authenticator  # swapped after it is loaded. requests in other threads use either of them
+        self.__loaded_time = time()
+        return
+
+    def __refresh_in_background(self):
+        try:
+            self.__load()
+            LOGGER.debug(f'refreshed authentication credentials')
+        except Exception as e:
+            LOGGER.warning(f'failed to refresh authentication credentials. using the ones from {self.age:.0f} seconds ago: {str(e)}')
+        finally:
+            self.__is_refreshing = False
+        return
+
+    def __start_refreshing(self):
+        with self.__refresh_lock:
+            if self.__is_refreshing:
+                return
+            self.__is_refreshing = True
+        Thread(target=self.__refresh_in_background, daemon=True).start()
+        return
+
+    def authenticate(self, input_auth_cred: dict) -> Union[str, None]:
+        """
+        :param input_auth_cred: dict - request headers
+        :return: str - reason why it is not authenticated. None if it is authenticated
+        """
+        if self.__authenticator is None or self.age > self.__max_stale:
+            with self.__refresh_lock:
+                if self.__authenticator is None or self.age > self.__max_stale:
+                    self.__load()
+        elif self.age > self.__ttl:
+            self.__start_refreshing()
+        return self.__authenticator.authenticate(input_auth_cred)
@@ -0,0 +1,114 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+from threading import RLock, local
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AwsClientCache(metaclass=Singleton):
+    """
+    Process-wide cache of boto3 sessions, clients, and resources.
+
+    - 1 boto3 session per set of credentials (region, access key, secret key, session token).
+    - clients are thread-safe, so they are shared by all threads.
+    - resources are not thread-safe, so they are cached per thread.
+    - when the credentials in the config change (rotation), the session and its clients are re-created,
+      and the ones for the old credentials are dropped.
+    - everything is dropped in a forked child process since connections cannot be shared.
+
+    Without access keys, boto3 uses the default credential chain which refreshes expiring role credentials by itself.
+    """
+    def __init__(self):
+        self.__lock = RLock()
+        self.__pid = os.getpid()
+        self.__sessions = {}
+        self.__clients = {}
+        self.__thread_local = local()
+        self.__boto_config = BotoConfig(max_pool_connections=int(Config().get_value(Config.aws_max_pool_connections, '50')))
+
+    @staticmethod
+    def __get_cred_key(boto3_session: dict):
+        return tuple(sorted(boto3_session.items()))
+
+    def __reset_if_forked(self):
+        if self.__pid == os.getpid():
+            return
+        LOGGER.debug(f'dropping cached aws clients from parent process: {self.__pid}')
+        self.__pid = os.getpid()
+        self.__sessions = {}
+        self.__clients = {}
+        self.__thread_local = local()
+        return
+
+    def __get_session(self, boto3_session: dict):
+        cred_key = self.__get_cred_key(boto3_session)
+        if cred_key in self.__sessions:
+            return self.__sessions[cred_key]
+        region = boto3_session.get('region_name', None)
+        rotated_keys = [k for k in self.__sessions.keys() if dict(k).get('region_name', None) == region]
+        for each_key in rotated_keys:
+            LOGGER.info(f'dropping aws clients for previous credentials in region: {region}')
+            self.__sessions.pop(each_key)
+            for each_client_key in [k for k in self.__clients.keys() if k[0] == each_key]:
+                self.__clients.pop(each_client_key)
+        self.__sessions[cred_key] = boto3.Session(**boto3_session)
+        return self.__sessions[cred_key]
+
+    def get_client(self, service_name: str, boto3_session: dict):
+        """
+        :param service_name: str - s3, dynamodb, secretsmanager, ...
+        :param boto3_session: dict - boto3.Session arguments from AwsCred
+        :return: botocore client
+        """
+        client_key = (self.__get_cred_key(boto3_session), service_name)
+        with self.__lock:
+            self.__reset_if_forked()
+            if client_key not in self.__clients:
+                LOGGER.debug(f'creating aws client: {service_name}')
+                self.__clients[client_key] = self.__get_session(boto3_session).client(service_name, config=self.__boto_config)
+            return self.__clients[client_key]
+
+    def get_resource(self, service_name: str, boto3_session: dict):
+        """
+        :param service_name: str - s3, dynamodb, ...
+        :param boto3_session: dict - boto3.Session arguments from AwsCred
+        :return: boto3 resource for the current thread
+        """
+        resource_key = (self.__get_cred_key(boto3_session), service_name)
+        with self.__lock:
+            self.__reset_if_forked()
+            session = self.__get_session(boto3_session)
+            thread_resources = getattr(self.__thread_local, 'resources', {})
+            if resource_key not in thread_resources or thread_resources[resource_key][0] is not session:
+                LOGGER.debug(f'creating aws resource: {service_name}')
+                thread_resources[resource_key] = (session, session.resource(service_name, config=self.__boto_config))
+                self.__thread_local.resources = thread_resources
+            return thread_resources[resource_key][1]
+
+    def clear(self):
+        with self.__lock:
+            self.__sessions = {}
+            self.__clients = {}
+            self.__thread_local = local()
+        return
@@ -14,8 +14,7 @@
 # limitations under the License.
 import logging
 
-import boto3
-
+from parquet_flask.aws.aws_client_cache import AwsClientCache
 from parquet_flask.utils.config import Config
 
 LOGGER = logging.getLogger(__name__)
@@ -57,7 +56,7 @@ class AwsCred:
         return
 
     def get_resource(self, service_name: str):
-        return boto3.Session(**self.boto3_session).resource(service_name)
+        return AwsClientCache().get_resource(service_name, self.boto3_session)
 
     def get_client(self, service_name: str):
-        return boto3.Session(**self.boto3_session).client(service_name)
+        return AwsClientCache().get_client(service_name, self.boto3_session)
@@ -15,15 +15,22 @@
 
 import decimal
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
+from threading import Event
+from time import sleep
 
 import boto3
 from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 
 from parquet_flask.aws.aws_cred import AwsCred
 
 LOGGER = logging.getLogger(__name__)
 
 VALID_KEY_TYPE = ['S', 'N', 'B']
+BATCH_GET_LIMIT = 100  # max keys per BatchGetItem call
+TRANSACT_WRITE_LIMIT = 100  # max items per TransactWriteItems call
 
 
 class AwsDdbProps:
@@ -214,6 +221,38 @@ class AwsDdb(AwsCred):
             return None
         return self._replace_decimals(item_result['Item'])
 
+    def batch_get_items(self, hash_vals: list, projection_keys: list = None, max_retries=5):
+        """
+        retrieving many items based on hash key with BatchGetItem. only for tables without range key.
+        keys are sent in chunks of 100, and unprocessed keys are retried with exponential backoff.
+
+        https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/dynamodb.html#DynamoDB.ServiceResource.batch_get_item
+        :param hash_vals: list - hash key values. duplicates are removed
+        :param projection_keys: list - attribute names to retrieve. None for all attributes
+        :param max_retries: int - number of retries for unprocessed keys
+        :return: list - found items. missing keys are not included
+        """
+        LOGGER.info(f'retrieving {len(hash_vals)} items from DDB using BatchGetItem')
+        unique_hash_vals = list(dict.fromkeys(hash_vals))  # BatchGetItem rejects duplicated keys
+        all_items = []
+        for i in range(0, len(unique_hash_vals), BATCH_GET_LIMIT):
+            table_request = {'Keys': [{self.__props.hash_key: k} for k in unique_hash_vals[i: i + BATCH_GET_LIMIT]]}
+            if projection_keys is not None:
+                table_request['ProjectionExpression'] = ', '.join([f'#attr{j}' for j in range(len(projection_keys))])
+                table_request['ExpressionAttributeNames'] = {f'#attr{j}': k for j, k in enumerate(projection_keys)}
+            request_items = {self.__props.tbl_name: table_request}
+            for attempt in range(max_retries + 1):
+                item_result = self._ddb_resource.batch_get_item(RequestItems=request_items)
+                all_items.extend(item_result['Responses'].get(self.__props.tbl_name, []))
+                request_items = item_result.get('UnprocessedKeys', {})
+                if len(request_items) < 1:
+                    break
+                if attempt >= max_retries:
+                    raise RuntimeError(f'unable to retrieve all items after {max_retries} retries. unprocessed: {request_items}')
+                LOGGER.debug(f'retrying unprocessed keys. attempt: {attempt + 1}')
+                sleep(0.05 * (2 ** attempt))
+        return self._replace_decimals(all_items)
+
     def delete_one_item(self, hash_val, range_val=None):
         """
 
@@ -263,23 +302,175 @@ class AwsDdb(AwsCred):
         # TODO check result
         return
 
+    def __get_put_condition(self, replace: bool):
+        """
+        same conditions as `add_one_item` for tables without range key
+        """
+        if replace is True:
+            return 'attribute_exists(#hash_key)'
+        return 'attribute_not_exists(#hash_key)'
+
+    def __transact_put_chunk(self, items: list, replace: bool, max_retries: int):
+        serializer = TypeSerializer()
+        transact_items = [{'Put': {
+            'TableName': self.__props.tbl_name,
+            'Item': {k: serializer.serialize(self.__to_ddb_val(v)) for k, v in each_item.items()},
+            'ConditionExpression': self.__get_put_condition(replace),
+            'ExpressionAttributeNames': {'#hash_key': self.__props.hash_key},
+        }} for each_item in items]
+        for attempt in range(max_retries + 1):
+            try:
+                self._ddb_client.transact_write_items(TransactItems=transact_items)
+                return []
+            except self._ddb_client.exceptions.TransactionCanceledException as e:
+                cancel_codes = [k.get('Code', 'None') for k in e.response.get('CancellationReasons', [])]
+                if 'ConditionalCheckFailed' in cancel_codes or 'ValidationError' in cancel_codes:
+                    break  # not retriable. finding failed items one by one
+                error = e
+            except (self._ddb_client.exceptions.ProvisionedThroughputExceededException,
+                    self._ddb_client.exceptions.TransactionInProgressException) as e:
+                error = e
+            if attempt >= max_retries:
+                break
+            LOGGER.debug(f'retrying transaction. attempt: {attempt + 1}. cause: {str(error)}')
+            sleep(0.05 * (2 ** attempt))
+        failed = []
+        for each_item in items:
+            try:
+                self.add_one_item(dict(each_item), each_item[self.__props.hash_key], replace=replace)
+            except Exception as e:
+                failed.append((each_item, str(e)))
+        return failed
+
+    def transact_put_items(self, items: list, replace=False, max_retries=3):
+        """
+        putting many items with TransactWriteItems in chunks of 100. only for tables without range key.
+        each item has the same condition as `add_one_item`: it must exist if replacing, and must not exist if inserting.
+
+        a chunk is retried when it is throttled or in conflict with other transactions.
+        if it still fails, or some conditions are not met, its items are put one by one.
+
+        :param items: list - items with hash key
+        :param replace: bool
+        :param max_retries: int
+        :return: list - [(item, error message)] for failed items
+        """
+        LOGGER.info(f'putting {len(items)} items to DDB using TransactWriteItems')
+        failed = []
+        for i in range(0, len(items), TRANSACT_WRITE_LIMIT):
+            failed.extend(self.__transact_put_chunk(items[i: i + TRANSACT_WRITE_LIMIT], replace, max_retries))
+        return failed
+
     def scan_tbl(self, conditions_dict):
+        """
+        scanning with the legacy ScanFilter. use `scan_items` for FilterExpression, projection, and parallel scan.
+
+        :param conditions_dict: dict - ScanFilter
+        :return: list
+        """
         LOGGER.info('scanning items from DDB using they key')
         current_tbl = self._ddb_resource.Table(self.__props.tbl_name)
-        item_result = current_tbl.scan(
-            Limit=1,
-            ScanFilter=conditions_dict,
-            Select='ALL_ATTRIBUTES')
-        all_results = item_result['Items']
-        while 'LastEvaluatedKey' in item_result and item_result['LastEvaluatedKey'] is not None:  # pagination
-            item_result = current_tbl.scan(
-                Limit=100,
-                ScanFilter=conditions_dict,
-                ExclusiveStartKey=item_result['LastEvaluatedKey'],
-                Select='ALL_ATTRIBUTES')
+        scan_kwargs = {'ScanFilter': conditions_dict, 'Select': 'ALL_ATTRIBUTES'}
+        all_results = []
+        while True:  # pagination. each page is up to 1 MB
+            item_result = current_tbl.scan(**scan_kwargs)
             all_results.extend(item_result['Items'])
+            if item_result.get('LastEvaluatedKey', None) is None:
+                break
+            scan_kwargs['ExclusiveStartKey'] = item_result['LastEvaluatedKey']
         return self._replace_decimals(all_results)
 
+    def __scan_pages(self, scan_kwargs: dict, stop_event: Event = None):
+        scan_kwargs = dict(scan_kwargs)
+        while stop_event is None or not stop_event.is_set():
+            item_result = self._ddb_client.scan(**scan_kwargs)
+            yield item_result['Items']
+            if item_result.get('LastEvaluatedKey', None) is None:
+                return
+            scan_kwargs['ExclusiveStartKey'] = item_result['LastEvaluatedKey']
+        return
+
+    def __put_until_stopped(self, page_queue: Queue, val, stop_event: Event):
+        while not stop_event.is_set():
+            try:
+                page_queue.put(val, timeout=1)
+                return
+            except Full:
+                continue
+        return
+
+    def __scan_segment(self, scan_kwargs: dict, page_queue: Queue, stop_event: Event):
+        try:
+            for each_page in self.__scan_pages(scan_kwargs, stop_event):
+                self.__put_until_stopped(page_queue, each_page, stop_event)
+            self.__put_until_stopped(page_queue, None, stop_event)  # this segment is finished
+        except Exception as e:
+            self.__put_until_stopped(page_queue, e, stop_event)
+        return
+
+    def __scan_pages_in_parallel(self, scan_kwargs: dict, total_segments: int):
+        """
+        pages from all segments are yielded in the order they arrive.
+        if the caller stops early, the segments stop after their current page.
+        """
+        page_queue = Queue(maxsize=total_segments * 2)  # not to keep many pages in memory if the caller is slow
+        stop_event = Event()
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            for segment in range(total_segments):
+                executor.submit(self.__scan_segment, {**scan_kwargs, 'Segment': segment, 'TotalSegments': total_segments}, page_queue, stop_event)
+            try:
+                finished_segments = 0
+                while finished_segments < total_segments:
+                    each_page = page_queue.get()
+                    if each_page is None:
+                        finished_segments += 1
+                        continue
+                    if isinstance(each_page, Exception):
+                        raise each_page
+                    yield each_page
+            finally:
+                stop_event.set()
+        return
+
+    @staticmethod
+    def __to_ddb_val(val):
+        return decimal.Decimal(str(val)) if isinstance(val, float) else val  # TypeSerializer does not accept float
+
+    def scan_items(self, filter_expression: str = None, expression_names: dict = None, expression_vals: dict = None,
+                   projection_keys: list = None, total_segments=1):
+        """
+        scanning the whole table with the maximum page size (1 MB). items are yielded while scanning.
+
+        ddb.scan_items('#ingested_date > :ingested_date', {'#ingested_date': 'ingested_date'}, {':ingested_date': 1640995200000}, ['s3_url', 'uuid'], total_segments=8)
+
+        https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Scan.html#Scan.ParallelScan
+        :param filter_expression: str - FilterExpression. None for all items
+        :param expression_names: dict - {'#created_key': 'created_at'}
+        :param expression_vals: dict - {':created_val': 123}
+        :param projection_keys: list - attribute names to retrieve. None for all attributes
+        :param total_segments: int - number of segments scanned in parallel by a thread pool. 1 for sequential scan
+        :return: generator - items
+        """
+        LOGGER.info(f'scanning items from DDB with {total_segments} segment(s)')
+        scan_kwargs = {'TableName': self.__props.tbl_name}
+        attribute_names = dict(expression_names) if expression_names is not None else {}
+        if filter_expression is not None:
+            scan_kwargs['FilterExpression'] = filter_expression
+        if projection_keys is not None:
+            scan_kwargs['ProjectionExpression'] = ', '.join([f'#proj{i}' for i in range(len(projection_keys))])
+            attribute_names.update({f'#proj{i}': k for i, k in enumerate(projection_keys)})
+        if len(attribute_names) > 0:
+            scan_kwargs['ExpressionAttributeNames'] = attribute_names
+        if expression_vals is not None:
+            serializer = TypeSerializer()
+            scan_kwargs['ExpressionAttributeValues'] = {k: serializer.serialize(self.__to_ddb_val(v)) for k, v in expression_vals.items()}
+        all_pages = self.__scan_pages(scan_kwargs) if total_segments < 2 else self.__scan_pages_in_parallel(scan_kwargs, total_segments)
+        deserializer = TypeDeserializer()
+        for each_page in all_pages:
+            for each_item in each_page:
+                yield self._replace_decimals({k: deserializer.deserialize(v) for k, v in each_item.items()})
+        return
+
     def update_one_item(self, update_expression, expression_names, expression_vals, hash_val, range_val=None, retrieve_new_val=True):
         """
         Usage : increment or decrement
@@ -323,13 +514,36 @@ ddb.update_one_item('SET #created_at_key = #created_at_key + :created_at_val', {
         :return:
         """
         hash_val = [v for v in hash_dict.values()][0]
+        key_condition = boto3.dynamodb.conditions.Key([k for k in hash_dict.keys()][0]).eq(hash_val)
+        return list(self.__query_pages(index_name, key_condition))
+
+    def __query_pages(self, index_name: str, key_condition):
         query_dict = {
             'IndexName': index_name,
             'Select': 'ALL_ATTRIBUTES',  # 'ALL_ATTRIBUTES'|'ALL_PROJECTED_ATTRIBUTES'|'SPECIFIC_ATTRIBUTES'|'COUNT'
-            'Limit': 1,
             'ConsistentRead': False,
-            'KeyConditionExpression': boto3.dynamodb.conditions.Key([k for k in hash_dict.keys()][0]).between(hash_val),
+            'KeyConditionExpression': key_condition,
         }
-        item_result = self._ddb_resource.Table(self.__props.tbl_name).query(**query_dict)
-        updated_result = [self._replace_decimals(k) for k in item_result['Items']]
-        return updated_result
+        current_tbl = self._ddb_resource.Table(self.__props.tbl_name)
+        while True:  # pagination. each page is up to 1 MB
+            item_result = current_tbl.query(**query_dict)
+            for each_item in item_result['Items']:
+                yield self._replace_decimals(each_item)
+            if item_result.get('LastEvaluatedKey', None) is None:
+                return
+            query_dict['ExclusiveStartKey'] = item_result['LastEvaluatedKey']
+
+    def query_index_range(self, index_name: str, hash_key: str, hash_val, range_key: str, range_start, range_end):
+        """
+        querying a secondary index with a hash key and a range of its range key. all pages are retrieved.
+
+        :param index_name: str - name of a secondary index
+        :param hash_key: str
+        :param hash_val: value of hash key
+        :param range_key: str
+        :param range_start: inclusive
+        :param range_end: inclusive
+        :return: generator - items ordered by range key
+        """
+        key_condition = boto3.dynamodb.conditions.Key(hash_key).eq(hash_val) & boto3.dynamodb.conditions.Key(range_key).between(range_start, range_end)
+        return self.__query_pages(index_name, key_condition)
@@ -13,11 +13,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import logging
 import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
+from boto3.s3.transfer import TransferConfig
+
 from parquet_flask.aws.aws_cred import AwsCred
+from parquet_flask.utils.config import Config
 from parquet_flask.utils.file_utils import FileUtils
 
 LOGGER = logging.getLogger(__name__)
@@ -57,6 +64,13 @@ class AwsS3(AwsCred):
             return -1
         return s3_obj_size
 
+    def get_s3_obj_etag_size(self):
+        """
+        :return: tuple - (ETag without quotes, size in bytes)
+        """
+        s3_obj_head = self.__s3_client.head_object(Bucket=self.__target_bucket, Key=self.__target_key)
+        return s3_obj_head['ETag'].strip('"'), int(s3_obj_head['ContentLength'])
+
     def __get_all_s3_files_under(self, bucket, prefix, with_versions=False):
         list_method_name = 'list_object_versions' if with_versions is True else 'list_objects_v2'
         page_key = 'Versions' if with_versions is True else 'Contents'
@@ -77,6 +91,31 @@ class AwsS3(AwsCred):
             if additional_checks(fileObj):
                 yield fileObj['Key'], fileObj['Size']
 
+    def get_child_s3_file_details(self, bucket, prefix, additional_checks=lambda x: True):
+        """
+        same as `get_child_s3_files` with ETag
+
+        :return: generator - (key, size, ETag without quotes)
+        """
+        for fileObj in self.__get_all_s3_files_under(bucket, prefix):
+            if additional_checks(fileObj):
+                yield fileObj['Key'], fileObj['Size'], fileObj['ETag'].strip('"')
+
+    def delete_objects(self, bucket, keys: list):
+        """
+        :param bucket: str
+        :param keys: list - S3 keys. deleted in chunks of 1000 which is the limit of DeleteObjects
+        :return: None
+        """
+        for i in range(0, len(keys), 1000):
+            self.__s3_client.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': k} for k in keys[i: i + 1000]], 'Quiet': True})
+        return
+
+    def get_presigned_url(self, expires_in=3600):
+        return self.__s3_client.generate_presigned_url('get_object',
+                                                       Params={'Bucket': self.__target_bucket, 'Key': self.__target_key},
+                                                       ExpiresIn=expires_in)
+
     def set_s3_url(self, s3_url):
         LOGGER.debug(f'setting s3_url: {s3_url}')
         self.__target_bucket, self.__target_key = self.split_s3_url(s3_url)
@@ -129,14 +168,88 @@ class AwsS3(AwsCred):
         self.__tag_existing_obj(all_tags)
         return True
 
-    def download(self, local_dir, file_name=None):
+    @staticmethod
+    def get_transfer_config():
+        """
+        max_concurrency should not be more than `aws_max_pool_connections`, or the extra threads wait for connections.
+
+        :return: TransferConfig - from `s3_transfer_*` config values
+        """
+        config = Config()
+        part_size = int(config.get_value(Config.s3_transfer_part_size_mb, '32')) * 1024 * 1024
+        return TransferConfig(multipart_threshold=part_size,
+                              multipart_chunksize=part_size,
+                              max_concurrency=int(config.get_value(Config.s3_transfer_max_concurrency, '16')),
+                              io_chunksize=int(config.get_value(Config.s3_transfer_io_chunk_size_kb, '1024')) * 1024)
+
+    def __get_local_file_path(self, local_dir, file_name):
         if not FileUtils.dir_exist(local_dir):
             raise ValueError('missing directory')
         if file_name is None:
             LOGGER.debug(f'setting the downloading filename from target_key: {self.__target_key}')
             file_name = os.path.basename(self.__target_key)
-        local_file_path = os.path.join(local_dir, file_name)
+        return os.path.join(local_dir, file_name)
+
+    def download(self, local_dir, file_name=None):
+        local_file_path = self.__get_local_file_path(local_dir, file_name)
         LOGGER.debug(f'downloading to local_file_path: {local_file_path}')
-        self.__s3_client.download_file(self.__target_bucket, self.__target_key, local_file_path)
+        self.__s3_client.download_file(self.__target_bucket, self.__target_key, local_file_path, Config=self.get_transfer_config())
         LOGGER.debug(f'file downloaded')
         return local_file_path
+
+    def __get_range(self, start, end):
+        return self.__s3_client.get_object(Bucket=self.__target_bucket, Key=self.__target_key, Range=f'bytes={start}-{end}')['Body'].read()
+
+    def download_streaming(self, local_dir, file_name=None):
+        """
+        downloading with concurrent ranged GETs, and processing the parts in order while the others are downloaded.
+        - sha512 is calculated from the downloaded bytes
+        - gzipped files are unzipped on the fly, and only the unzipped file is written
+
+        at most `s3_transfer_max_concurrency` parts are in memory.
+
+        :param local_dir: str
+        :param file_name: str - None to use the S3 file name. `.gz` is removed for gzipped files
+        :return: tuple - (path of downloaded file, sha512 of S3 object)
+        """
+        local_file_path = self.__get_local_file_path(local_dir, file_name)
+        is_gzipped = local_file_path.lower().endswith('.gz')
+        if is_gzipped:
+            local_file_path = local_file_path[:-3]
+        transfer_config = self.get_transfer_config()
+        obj_size = self.get_s3_obj_size()
+        part_size = transfer_config.multipart_chunksize
+        all_ranges = [(k, min(k + part_size, obj_size) - 1) for k in range(0, obj_size, part_size)]
+        LOGGER.debug(f'downloading {len(all_ranges)} parts to local_file_path: {local_file_path}')
+        sha512 = hashlib.sha512()
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if is_gzipped else None  # 16: gzip header
+        with ThreadPoolExecutor(max_workers=transfer_config.max_concurrency) as executor, open(local_file_path, 'wb') as ff:
+            pending_parts = deque()
+            for each_range in all_ranges:
+                pending_parts.append(executor.submit(self.__get_range, *each_range))
+                if len(pending_parts) < transfer_config.max_concurrency:
+                    continue
+                decompressor = self.__write_part(pending_parts.popleft().result(), sha512, decompressor, ff)
+            while len(pending_parts) > 0:
+                decompressor = self.__write_part(pending_parts.popleft().result(), sha512, decompressor, ff)
+            if decompressor is not None:
+                ff.write(decompressor.flush())
+        LOGGER.debug(f'file downloaded')
+        return local_file_path, sha512.hexdigest()
+
+    @staticmethod
+    def __write_part(part_bytes, sha512, decompressor, output_file):
+        """
+        :return: decompressor for the next part. a new one is created for the next member of a multi-member gzip file
+        """
+        sha512.update(part_bytes)
+        if decompressor is None:
+            output_file.write(part_bytes)
+            return None
+        while len(part_bytes) > 0:
+            output_file.write(decompressor.decompress(part_bytes))
+            if not decompressor.eof:
+                break
+            part_bytes = decompressor.unused_data
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        return decompressor
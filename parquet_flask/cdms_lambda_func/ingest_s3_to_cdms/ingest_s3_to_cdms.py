@@ -24,14 +24,55 @@ class IngestS3ToCdms:
         ddb_props.tbl_name = os.environ.get(LambdaFuncEnv.PARQUET_META_TBL_NAME)
         self.__ddb = AwsDdb(ddb_props)
         self.__cdms_domain = os.environ.get(LambdaFuncEnv.CDMS_DOMAIN)
+        self.__http_session = requests
+
+    @property
+    def http_session(self):
+        return self.__http_session
+
+    @http_session.setter
+    def http_session(self, val):
+        """
+        :param val: requests.Session - to reuse connections between calls
+        :return: None
+        """
+        self.__http_session = val
+        return
+
+    def get_existing_records(self, s3_urls: list) -> dict:
+        """
+        retrieving metadata records of many s3 urls with BatchGetItem instead of 1 call per file
+
+        :param s3_urls: list
+        :return: dict - {s3_url: record} for ingested ones
+        """
+        existing_records = self.__ddb.batch_get_items(s3_urls, ['s3_url', 'uuid', 's3_etag', 's3_size'])
+        return {k['s3_url']: k for k in existing_records}
+
+    @staticmethod
+    def is_unchanged(ddb_record: dict, s3_etag: str, s3_size: int) -> bool:
+        """
+        :param ddb_record: dict - metadata record. None if it is not ingested
+        :param s3_etag: str - current ETag of the S3 object
+        :param s3_size: int - current size of the S3 object
+        :return: bool - True if the S3 object is the same as the one which was ingested
+        """
+        if ddb_record is None or ddb_record.get('s3_etag', None) is None:
+            return False
+        return ddb_record['s3_etag'] == s3_etag and ddb_record.get('s3_size', None) == s3_size
 
     def start(self, event):
+        """
+        :param event: dict - {'s3_url': str}. 'ddb_record' can be included if it is already retrieved. None for new files.
+                             'append_delta': True to append only new rows when the file is already ingested
+        :return: requests.Response
+        """
         logging.basicConfig(level=int(os.environ.get(LambdaFuncEnv.LOG_LEVEL, logging.INFO)),
                             format="%(asctime)s [%(levelname)s] [%(name)s::%(lineno)d] %(message)s")
 
         s3_url = event['s3_url']  # TODO how event has s3_url. This is for manual process.
         put_body = {'s3_url': s3_url}
-        ddb_record = self.__ddb.get_one_item(s3_url)
+        ddb_record = event['ddb_record'] if 'ddb_record' in event else self.__ddb.get_one_item(s3_url)
         header = {'Authorization': f'{os.environ.get(LambdaFuncEnv.CDMS_BEARER_TOKEN)}',  # TODO this comes from Secret manager. not directly from env variable
                   'Content-Type': 'application/json'
                   }
@@ -40,11 +81,32 @@ class IngestS3ToCdms:
         else:
             put_url = f'{self.__cdms_domain}/1.0/replace_json_s3'
             put_body['job_id'] = ddb_record['uuid']
+            put_body['append_delta'] = event.get('append_delta', False)
         LOGGER.debug(f'putting {put_body} to {put_url}')
-        result = requests.put(url=put_url,
-                              data=json.dumps(put_body),
-                              headers=header,
-                              verify=False)
+        result = self.__http_session.put(url=put_url,
+                                         data=json.dumps(put_body),
+                                         headers=header,
+                                         verify=False)
         LOGGER.info(f'ingest result: {result.status_code}')
         LOGGER.debug(f'ingest result details: {result.text}')
-        return
+        return result
+
+    def start_batch(self, s3_urls: list):
+        """
+        ingesting many files in 1 spark write. files which are already ingested are skipped by the service.
+
+        :param s3_urls: list - s3 urls of json files
+        :return: requests.Response
+        """
+        header = {'Authorization': f'{os.environ.get(LambdaFuncEnv.CDMS_BEARER_TOKEN)}',
+                  'Content-Type': 'application/json'
+                  }
+        put_url = f'{self.__cdms_domain}/1.0/ingest_json_s3_batch'
+        LOGGER.debug(f'putting {len(s3_urls)} files to {put_url}')
+        result = self.__http_session.put(url=put_url,
+                                         data=json.dumps({'s3_urls': s3_urls}),
+                                         headers=header,
+                                         verify=False)
+        LOGGER.info(f'batch ingest result: {result.status_code}')
+        LOGGER.debug(f'batch ingest result details: {result.text}')
+        return result
@@ -0,0 +1,188 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import datetime, timezone
+from threading import Lock
+from time import time
+
+from parquet_flask.aws.aws_s3 import AwsS3
+from parquet_flask.io_logic.query_v2 import QueryProps
+from parquet_flask.io_logic.query_v4 import QueryV4
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.singleton import Singleton
+from parquet_flask.utils.time_utils import TimeUtils
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncQueryJob(metaclass=Singleton):
+    """
+    Run queries in the background, and spool the whole result set to `query_spool_dir` (local directory or s3a:// url).
+    Each job is written to `<query_spool_dir>/<job_id>`.
+
+    Job status is kept in memory of this process.
+
+    Finished jobs and their spooled results are deleted after `async_query_result_ttl_seconds`.
+    Spooled results without a job (e.g. from before a restart) are deleted when they are older than that.
+    The clean up runs at most once per `CLEAN_UP_INTERVAL` seconds when jobs are submitted or checked.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CLEAN_UP_INTERVAL = 60
+
+    def __init__(self):
+        config = Config()
+        self.__spool_dir = config.get_value(Config.query_spool_dir, '/tmp/parquet_query_spool')
+        self.__spool_dir = self.__spool_dir if not self.__spool_dir.endswith('/') else self.__spool_dir[:-1]
+        self.__url_expiry = int(config.get_value(Config.async_query_url_expiry, '3600'))
+        self.__executor = ThreadPoolExecutor(max_workers=int(config.get_value(Config.async_query_workers, '1')))
+        self.__result_ttl = int(config.get_value(Config.async_query_result_ttl_seconds, '86400'))
+        self.__jobs = {}
+        self.__lock = Lock()
+        self.__last_clean_up = 0
+
+    @property
+    def is_s3_spool(self):
+        return any([self.__spool_dir.startswith(k) for k in ['s3://', 's3a://', 's3s://']])
+
+    def get_output_path(self, job_id):
+        return f'{self.__spool_dir}/{job_id}'
+
+    def __is_kept(self, job_id):
+        with self.__lock:
+            return job_id in self.__jobs
+
+    def __delete_local_spool(self, expiry_time: float):
+        if not FileUtils.dir_exist(self.__spool_dir):
+            return
+        for job_id in os.listdir(self.__spool_dir):
+            output_path = self.get_output_path(job_id)
+            if self.__is_kept(job_id) or os.path.getmtime(output_path) > expiry_time:
+                continue
+            LOGGER.debug(f'deleting expired spool: {output_path}')
+            shutil.rmtree(output_path, ignore_errors=True) if os.path.isdir(output_path) else FileUtils.del_file(output_path)
+        return
+
+    def __delete_s3_spool(self, expiry_time: float):
+        s3 = AwsS3()
+        bucket, prefix = s3.split_s3_url(self.__spool_dir)
+        prefix = f'{prefix}/'
+        expiry_datetime = datetime.fromtimestamp(expiry_time, tz=timezone.utc)
+        expired_keys = [k for k, _ in s3.get_child_s3_files(bucket, prefix, lambda x: x['LastModified'] < expiry_datetime)
+                        if not self.__is_kept(k[len(prefix):].split('/')[0])]
+        LOGGER.debug(f'deleting {len(expired_keys)} expired spool files under {self.__spool_dir}')
+        s3.delete_objects(bucket, expired_keys)
+        return
+
+    def clean_up(self, force=False):
+        """
+        removing finished jobs and spooled results older than `async_query_result_ttl_seconds`
+
+        :param force: bool - run it even if the last one was less than CLEAN_UP_INTERVAL ago
+        :return: None
+        """
+        with self.__lock:
+            if not force and time() - self.__last_clean_up < self.CLEAN_UP_INTERVAL:
+                return
+            self.__last_clean_up = time()
+            expiry_unix = TimeUtils.get_current_time_unix() - self.__result_ttl * 1000
+            expired_jobs = [k for k, v in self.__jobs.items() if v.get('finished_at', expiry_unix) < expiry_unix]
+            for job_id in expired_jobs:
+                self.__jobs.pop(job_id)
+        LOGGER.debug(f'removed {len(expired_jobs)} expired async query jobs')
+        try:  # spool of the jobs which are still kept is not deleted
+            if self.is_s3_spool:
+                self.__delete_s3_spool(time() - self.__result_ttl)
+            else:
+                self.__delete_local_spool(time() - self.__result_ttl)
+        except Exception as e:
+            LOGGER.warning(f'failed to delete expired spool under {self.__spool_dir}: {str(e)}')
+        return
+
+    def __update_job(self, job_id, **kwargs):
+        with self.__lock:
+            self.__jobs[job_id].update(kwargs)
+        return
+
+    def __execute(self, job_id, query_json, output_format):
+        self.__update_job(job_id, status=self.RUNNING, started_at=TimeUtils.get_current_time_unix())
+        try:
+            has_data = QueryV4(QueryProps().from_json(query_json)).spool(self.get_output_path(job_id), output_format)
+            self.__update_job(job_id, status=self.DONE, has_data=has_data, finished_at=TimeUtils.get_current_time_unix())
+        except Exception as e:
+            LOGGER.exception(f'failed to spool query: {job_id}')
+            self.__update_job(job_id, status=self.FAILED, details=str(e), finished_at=TimeUtils.get_current_time_unix())
+        return
+
+    def submit(self, query_json: dict, output_format: str = 'parquet'):
+        """
+        :param query_json: dict - QueryProps json. pagination values are ignored
+        :param output_format: str - one of QueryV4.SPOOL_FORMATS
+        :return: str - job_id
+        """
+        if output_format not in QueryV4.SPOOL_FORMATS:
+            raise ValueError(f'invalid output_format: {output_format}. valid formats: {QueryV4.SPOOL_FORMATS}')
+        self.clean_up()
+        job_id = str(uuid.uuid4())
+        with self.__lock:
+            self.__jobs[job_id] = {
+                'job_id': job_id,
+                'status': self.QUEUED,
+                'format': output_format,
+                'output': self.get_output_path(job_id),
+                'submitted_at': TimeUtils.get_current_time_unix(),
+            }
+        if not self.is_s3_spool:
+            FileUtils.mk_dir_p(self.__spool_dir)
+        self.__executor.submit(self.__execute, job_id, query_json, output_format)
+        return job_id
+
+    def get_status(self, job_id):
+        self.clean_up()
+        with self.__lock:
+            if job_id not in self.__jobs:
+                return None
+            return deepcopy(self.__jobs[job_id])
+
+    def get_result_files(self, job_id):
+        """
+        spark output files of a finished job, excluding markers such as _SUCCESS and .crc
+
+        :param job_id:
+        :return: list - [(file_name, presigned_url)]. presigned_url is None for local spool directory
+        """
+        output_path = self.get_output_path(job_id)
+        if not self.is_s3_spool:
+            if not FileUtils.dir_exist(output_path):
+                return []
+            return [(k, None) for k in sorted(os.listdir(output_path)) if not k.startswith('_') and not k.startswith('.')]
+        s3 = AwsS3()
+        bucket, prefix = s3.split_s3_url(output_path)
+        result_files = []
+        for key, size in s3.get_child_s3_files(bucket, f'{prefix}/'):
+            file_name = os.path.basename(key)
+            if file_name.startswith('_') or file_name.startswith('.'):
+                continue
+            result_files.append((file_name, s3.set_s3_url(f's3://{bucket}/{key}').get_presigned_url(self.__url_expiry)))
+        return result_files
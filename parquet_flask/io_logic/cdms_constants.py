@@ -33,6 +33,7 @@ class CDMSConstants:
     s3_url_key = 's3_url'
     uuid_key = 'uuid'
     ingested_date_key = 'ingested_date'
+    ingested_day_key = 'ingested_day'
     checksum_key = 'checksum'
     file_size_key = 'file_size'
     records_count_key = 'records_count'
@@ -40,5 +41,11 @@ class CDMSConstants:
     job_end_key = 'job_end_time'
     checksum_validation = 'checksum_validation'
     checksum_cause = 'checksum_cause'
+    stage_timings_key = 'stage_timings'
+    batch_size_key = 'batch_size'
+    s3_etag_key = 's3_etag'
+    s3_size_key = 's3_size'
+    appended_records_count_key = 'appended_records_count'
+    download_throughput_key = 'download_throughput_kib_per_s'
 
     missing_depth_value = -99999
@@ -0,0 +1,91 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+from parquet_flask.io_logic.metadata_tbl_factory import MetadataTblFactory
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IngestJobStatus:
+    """
+    Status of an ingest job from the local ingest job queue, or from the metadata table if it is not queued here.
+    Jobs which waited till completion, or ran on another instance, are only in the metadata table.
+
+    Spark writes all records of a job in 1 action, so there is no record level progress.
+    A running job reports the stage it is in (write, metadata) and the timings of the stages which are finished.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    FINAL_STATES = [DONE, FAILED]
+
+    __QUEUE_STATES = {
+        IngestWorkerPool.PENDING: QUEUED,
+        IngestWorkerPool.RUNNING: RUNNING,
+        IngestWorkerPool.DONE: DONE,
+        IngestWorkerPool.FAILED: FAILED,
+    }
+
+    def __init__(self):
+        self.__db_io = None
+
+    def __from_queue(self, state, job: dict):
+        status = {
+            'job_id': job['job_id'],
+            's3_url': job.get('s3_url'),
+            'status': self.__QUEUE_STATES[state],
+            'submitted_at': job.get('submitted_at'),
+            'started_at': job.get('started_at'),
+            'finished_at': job.get('finished_at'),
+            'records_total': job.get('records_total'),
+            'stage_timings': job.get('stage_timings', {}),
+        }
+        if state == IngestWorkerPool.RUNNING:
+            status['stage'] = job.get('stage')
+        if state == IngestWorkerPool.FAILED:
+            status['details'] = job.get('response', {}).get('details')
+        return status
+
+    def __from_metadata_tbl(self, job_id):
+        if self.__db_io is None:
+            self.__db_io = MetadataTblFactory().get_instance()
+        records = self.__db_io.get_by_uuid(job_id)
+        if len(records) < 1:
+            return None
+        record = records[0]
+        return {
+            'job_id': job_id,
+            's3_url': record.get(CDMSConstants.s3_url_key),
+            'status': self.DONE,
+            'started_at': record.get(CDMSConstants.job_start_key),
+            'finished_at': record.get(CDMSConstants.job_end_key),
+            'records_total': record.get(CDMSConstants.records_count_key),
+            'stage_timings': record.get(CDMSConstants.stage_timings_key, {}),
+        }
+
+    def get_status(self, job_id):
+        """
+        :param job_id: str - uuid returned by ingest endpoints
+        :return: dict - None if the job is not found
+        """
+        state, job = IngestWorkerPool().get_job(job_id)
+        if state is not None:
+            return self.__from_queue(state, job)
+        return self.__from_metadata_tbl(job_id)
@@ -14,14 +14,19 @@
 # limitations under the License.
 
 import logging
+from functools import reduce
 
 from pyspark.sql.dataframe import DataFrame
 
 from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.io_logic.job_partition_diff import JobPartitionDiff
+from parquet_flask.io_logic.query_result_cache import QueryResultCache
 from parquet_flask.io_logic.retrieve_spark_session import RetrieveSparkSession
 from parquet_flask.io_logic.sanitize_record import SanitizeRecord
+from parquet_flask.io_logic.spark_config_profiles import SparkConfigProfiles
 from parquet_flask.utils.config import Config
 from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.time_utils import TimeUtils
 
 from pyspark.sql.functions import to_timestamp, year, month, lit
 
@@ -35,8 +40,65 @@ class IngestNewJsonFile:
         self.__app_name = config.get_value('spark_app_name')
         self.__master_spark = config.get_value('master_spark_url')
         self.__mode = 'overwrite' if is_overwriting else 'append'
+        self.__is_change_aware = is_overwriting and config.get_value(Config.replace_change_aware, 'true').strip().lower() == 'true'
         self.__parquet_name = config.get_value('parquet_file_name')
         self.__sanitize_record = True
+        self.__is_appending_delta = False
+        self.__appended_records = 0
+        self.__ingested_partitions = []
+        self.__stage_timings = {}
+        self.__progress_callback = None
+
+    @property
+    def ingested_partitions(self):
+        return self.__ingested_partitions
+
+    @property
+    def stage_timings(self):
+        return self.__stage_timings
+
+    @property
+    def progress_callback(self):
+        return self.__progress_callback
+
+    @progress_callback.setter
+    def progress_callback(self, val):
+        """
+        :param val: callable - accepting {'records_total': int, 'stage': str, 'stage_timings': dict}. `stage` is the one which is starting
+        :return: None
+        """
+        self.__progress_callback = val
+        return
+
+    def __report_progress(self, records_total, stage):
+        if self.__progress_callback is None:
+            return
+        try:
+            self.__progress_callback({
+                'records_total': records_total,
+                'stage': stage,
+                'stage_timings': dict(self.__stage_timings),
+            })
+        except Exception as e:
+            LOGGER.warning(f'failed to report ingest progress. ignoring it: {str(e)}')
+        return
+
+    @property
+    def is_appending_delta(self):
+        return self.__is_appending_delta
+
+    @is_appending_delta.setter
+    def is_appending_delta(self, val):
+        """
+        :param val: bool - True to append only the rows which are not written for the job_id yet
+        :return: None
+        """
+        self.__is_appending_delta = val
+        return
+
+    @property
+    def appended_records(self):
+        return self.__appended_records
 
     @property
     def sanitize_record(self):
@@ -53,6 +115,10 @@ class IngestNewJsonFile:
 
     @staticmethod
     def create_df(spark_session, data_list, job_id, provider, project):
+        return IngestNewJsonFile.create_df_writer(IngestNewJsonFile.create_data_frame(spark_session, data_list, job_id, provider, project))
+
+    @staticmethod
+    def create_data_frame(spark_session, data_list, job_id, provider, project) -> DataFrame:
         LOGGER.debug(f'creating data frame with length {len(data_list)}')
         df = spark_session.createDataFrame(data_list)
         LOGGER.debug(f'adding columns')
@@ -62,19 +128,135 @@ class IngestNewJsonFile:
             .withColumn(CDMSConstants.platform_code_col, df[CDMSConstants.platform_col][CDMSConstants.code_col])\
             .withColumn(CDMSConstants.job_id_col, lit(job_id))\
             .withColumn(CDMSConstants.provider_col, lit(provider))\
-            .withColumn(CDMSConstants.project_col, lit(project))\
-            .repartition(1)  # combine to 1 data frame to increase size
+            .withColumn(CDMSConstants.project_col, lit(project))
             # .withColumn('ingested_date', lit(TimeUtils.get_current_time_str()))
+        return df
+
+    @staticmethod
+    def create_df_writer(df: DataFrame):
         LOGGER.debug(f'create writer')
         all_partitions = [CDMSConstants.provider_col, CDMSConstants.project_col, CDMSConstants.platform_code_col,
                           CDMSConstants.year_col, CDMSConstants.month_col, CDMSConstants.job_id_col]
-        df = df.repartition(1)
+        df = df.repartition(1)  # combine to 1 data frame to increase size
         df_writer = df.write
         LOGGER.debug(f'create partitions')
         df_writer = df_writer.partitionBy(all_partitions)
         LOGGER.debug(f'created partitions')
         return df_writer
 
+    @staticmethod
+    def get_ingested_partitions(input_json: dict) -> list:
+        """
+        :param input_json: dict - in-situ json object with provider, project, and observations
+        :return: list - [(provider, project, platform_code)] touched by this json object
+        """
+        platform_codes = set([k[CDMSConstants.platform_col][CDMSConstants.code_col] for k in input_json[CDMSConstants.observations_key]])
+        return [(input_json[CDMSConstants.provider_col], input_json[CDMSConstants.project_col], k) for k in platform_codes]
+
+    def read_json(self, abs_file_path) -> dict:
+        """
+        :param abs_file_path: str - downloaded in-situ json file
+        :return: dict - in-situ json object. sanitized if `sanitize_record` is True
+        """
+        if not FileUtils.file_exist(abs_file_path):
+            raise ValueError('missing file to ingest it. path: {}'.format(abs_file_path))
+        LOGGER.debug(f'sanitizing the files ? : {self.__sanitize_record}')
+        if self.sanitize_record is True:
+            return SanitizeRecord(Config().get_value('in_situ_schema')).start(abs_file_path)
+        input_json = FileUtils.read_json(abs_file_path)
+        if input_json is None:
+            raise ValueError(f'invalid json file: {abs_file_path}')
+        return input_json
+
+    def write_json_objects(self, input_json_list: list, job_id):
+        """
+        writing 1 or more in-situ json objects in a single spark write.
+        they share `job_id` so that they are combined in the same parquet files.
+
+        :param input_json_list: list - in-situ json objects
+        :param job_id: str
+        :return: int - number of records
+        """
+        spark_session = self.__sss.retrieve_spark_session(self.__app_name, self.__master_spark, profile=SparkConfigProfiles.INGEST)
+        all_df = [self.create_data_frame(spark_session,
+                                         k[CDMSConstants.observations_key],
+                                         job_id,
+                                         k[CDMSConstants.provider_col],
+                                         k[CDMSConstants.project_col]) for k in input_json_list]
+        df = reduce(lambda a, b: a.unionByName(b, allowMissingColumns=True), all_df)  # optional columns differ between files
+        if self.__is_appending_delta:
+            self.__ingested_partitions = self.__append_new_rows(spark_session, df, job_id)
+        elif self.__is_change_aware:
+            self.__ingested_partitions = self.__write_changed_partitions(spark_session, df, job_id)
+        else:
+            self.create_df_writer(df).mode(self.__mode).parquet(self.__parquet_name, compression='GZIP')  # snappy GZIP
+            ingested_partitions = set()
+            for each in input_json_list:
+                ingested_partitions.update(self.get_ingested_partitions(each))
+            self.__ingested_partitions = list(ingested_partitions)
+        LOGGER.debug(f'finished writing parquet')
+        QueryResultCache().invalidate_partitions(self.__ingested_partitions)
+        return sum([len(k[CDMSConstants.observations_key]) for k in input_json_list])
+
+    def __write_changed_partitions(self, spark_session, df: DataFrame, job_id):
+        """
+        overwriting only the partitions whose rows are different from the ones already written for job_id.
+        partitionOverwriteMode=dynamic in the ingest profile leaves the other partitions as they are.
+        partitions which are no longer in the file are deleted.
+
+        :return: list - [(provider, project, platform_code)] which are rewritten or deleted
+        """
+        diff_start_time = TimeUtils.get_current_time_unix()
+        df = df.cache()  # used for both comparison and writing
+        try:
+            job_partition_diff = JobPartitionDiff(spark_session, self.__parquet_name)
+            changed_partitions, removed_partitions = job_partition_diff.diff_partitions(df, job_id)
+            self.__stage_timings['diff'] = TimeUtils.get_current_time_unix() - diff_start_time
+            LOGGER.info(f'{len(changed_partitions)} changed partitions to rewrite, and {len(removed_partitions)} removed partitions to delete for job_id: {job_id}')
+            if len(changed_partitions) > 0:
+                changed_df = job_partition_diff.filter_partitions(df, changed_partitions)
+                self.create_df_writer(changed_df).mode(self.__mode).parquet(self.__parquet_name, compression='GZIP')
+            if len(removed_partitions) > 0:
+                job_partition_diff.delete_partitions(removed_partitions, job_id)
+        finally:
+            df.unpersist()
+        return list(set([tuple(k[:3]) for k in changed_partitions + removed_partitions]))
+
+    def __append_new_rows(self, spark_session, df: DataFrame, job_id):
+        """
+        appending only the rows which are not written for job_id yet. rows removed from the file are not deleted.
+
+        :return: list - [(provider, project, platform_code)] which are appended
+        """
+        diff_start_time = TimeUtils.get_current_time_unix()
+        new_df = JobPartitionDiff(spark_session, self.__parquet_name).get_new_rows(df, job_id).cache()
+        try:
+            self.__appended_records = new_df.count()
+            self.__stage_timings['diff'] = TimeUtils.get_current_time_unix() - diff_start_time
+            LOGGER.info(f'{self.__appended_records} new rows to append for job_id: {job_id}')
+            if self.__appended_records < 1:
+                return []
+            self.create_df_writer(new_df).mode('append').parquet(self.__parquet_name, compression='GZIP')
+            appended_partitions = new_df.select(CDMSConstants.provider_col, CDMSConstants.project_col, CDMSConstants.platform_code_col).distinct().collect()
+        finally:
+            new_df.unpersist()
+        return [tuple(k) for k in appended_partitions]
+
+    def delete_job_rows(self, job_id):
+        """
+        deleting all rows of job_id under the providers and projects of `ingested_partitions`.
+        used to roll back a write whose metadata cannot be saved.
+
+        :param job_id: str
+        :return: int - number of deleted directories
+        """
+        spark_session = self.__sss.retrieve_spark_session(self.__app_name, self.__master_spark, profile=SparkConfigProfiles.INGEST)
+        provider_projects = list(set([tuple(k[:2]) for k in self.__ingested_partitions]))
+        deleted_count = JobPartitionDiff(spark_session, self.__parquet_name).delete_job(provider_projects, job_id)
+        LOGGER.info(f'deleted {deleted_count} partitions of job_id: {job_id}')
+        QueryResultCache().invalidate_partitions(self.__ingested_partitions)
+        return deleted_count
+
     def ingest(self, abs_file_path, job_id):
         """
         This method will assume that incoming file has data with in_situ_schema file.
@@ -85,20 +267,13 @@ class IngestNewJsonFile:
         :param job_id:
         :return: int - number of records
         """
-        if not FileUtils.file_exist(abs_file_path):
-            raise ValueError('missing file to ingest it. path: {}'.format(abs_file_path))
-        LOGGER.debug(f'sanitizing the files ? : {self.__sanitize_record}')
-        if self.sanitize_record is True:
-            input_json = SanitizeRecord(Config().get_value('in_situ_schema')).start(abs_file_path)
-        else:
-            if not FileUtils.file_exist(abs_file_path):
-                raise ValueError('json file does not exist: {}'.format(abs_file_path))
-            input_json = FileUtils.read_json(abs_file_path)
-        df_writer = self.create_df(self.__sss.retrieve_spark_session(self.__app_name, self.__master_spark),
-                                   input_json[CDMSConstants.observations_key],
-                                   job_id,
-                                   input_json[CDMSConstants.provider_col],
-                                   input_json[CDMSConstants.project_col])
-        df_writer.mode(self.__mode).parquet(self.__parquet_name, compression='GZIP')  # snappy GZIP
-        LOGGER.debug(f'finished writing parquet')
-        return len(input_json[CDMSConstants.observations_key])
+        validate_start_time = TimeUtils.get_current_time_unix()
+        input_json = self.read_json(abs_file_path)
+        records_total = len(input_json[CDMSConstants.observations_key])
+        write_start_time = TimeUtils.get_current_time_unix()
+        self.__stage_timings['validate'] = write_start_time - validate_start_time
+        self.__report_progress(records_total, 'write')
+        self.write_json_objects([input_json], job_id)
+        self.__stage_timings['write'] = TimeUtils.get_current_time_unix() - write_start_time
+        self.__report_progress(records_total, 'metadata')
+        return records_total
@@ -0,0 +1,334 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+from multiprocessing import get_context
+from queue import Empty
+from threading import Event, Lock, Thread
+from time import time
+
+from parquet_flask.io_logic.query_result_cache import QueryResultCache
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.singleton import Singleton
+from parquet_flask.utils.time_utils import TimeUtils
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _execute_job(job: dict) -> dict:
+    from parquet_flask.v1.ingest_aws_json import IngestAwsJson  # only needed in worker processes
+    from parquet_flask.v1.ingest_aws_json_batch import IngestAwsJsonBatch
+    if job.get('job_type') == IngestAwsJsonBatch.JOB_TYPE:
+        return IngestAwsJsonBatch.execute_job(job)
+    return IngestAwsJson.execute_job(job)
+
+
+def _worker_loop(task_queue, result_queue):
+    """
+    long running worker process. It keeps its own spark session between jobs.
+    """
+    logging.basicConfig(level=getattr(logging, os.getenv('log_level', 'INFO').upper(), logging.INFO),
+                        format='%(asctime)s [%(levelname)s] [%(name)s::%(lineno)d] %(message)s')
+    while True:
+        job = task_queue.get()
+        if job is None:
+            return
+        try:
+            result_queue.put((job['job_id'], _execute_job(job)))
+        except Exception as e:
+            LOGGER.exception(f'failed to execute ingest job: {job["job_id"]}')
+            result_queue.put((job['job_id'], {'code': 500, 'response': {'message': 'failed to ingest to parquet', 'details': str(e)}}))
+
+
+class IngestWorkerPool(metaclass=Singleton):
+    """
+    Running ingest jobs in a bounded number of worker processes.
+
+    Jobs are JSON files in `ingest_queue_dir`/<state>/<job_id>.json, and they are moved between state directories.
+    Jobs which were running when the server died are queued again at startup.
+
+    A pending job starts only if its estimated memory (file size x `ingest_memory_factor`) fits in the memory budget
+    together with running jobs. One job is always allowed to run so that a large file does not wait forever.
+    Jobs start in submitted order.
+
+    Done and failed jobs are deleted after `ingest_job_retention_seconds`,
+    and only the latest `ingest_job_retention_count` of each state are kept.
+
+    Workers are spawned, not forked, so that they do not share the py4j gateway of the server's spark session.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = [PENDING, RUNNING, DONE, FAILED]
+    DEFAULT_QUEUE_DIR = '/tmp/parquet_ingest_queue'
+    CLEAN_UP_INTERVAL = 60
+
+    def __init__(self):
+        config = Config()
+        self.__queue_dir = config.get_value(Config.ingest_queue_dir, self.DEFAULT_QUEUE_DIR)
+        self.__max_workers = int(config.get_value(Config.ingest_max_workers, '1'))
+        self.__memory_factor = float(config.get_value(Config.ingest_memory_factor, '10'))
+        self.__memory_budget = self.__get_memory_budget(config.get_value(Config.ingest_memory_budget_mb))
+        self.__retention_seconds = float(config.get_value(Config.ingest_job_retention_seconds, str(7 * 24 * 3600)))
+        self.__retention_count = int(config.get_value(Config.ingest_job_retention_count, '1000'))
+        self.__poll_interval = 1.0
+        self.__last_clean_up = 0
+        for each_state in self.STATES:
+            FileUtils.mk_dir_p(os.path.join(self.__queue_dir, each_state))
+        self.__mp_context = get_context('spawn')
+        self.__result_queue = None
+        self.__workers = [None for _ in range(self.__max_workers)]  # {'process', 'task_queue', 'job_id', 'reserved_bytes'}
+        self.__lock = Lock()
+        self.__stop_event = Event()
+        self.__dispatcher = None
+        self.__requeue_running_jobs()
+
+    @staticmethod
+    def __get_memory_budget(possible_budget_mb):
+        if possible_budget_mb is not None:
+            return int(possible_budget_mb) * 1024 * 1024
+        for limit_file in ['/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes']:  # cgroup v2, v1
+            try:
+                with open(limit_file, 'r') as ff:
+                    limit = ff.read().strip()
+                if limit.isdigit() and int(limit) < (1 << 60):  # v1 reports a huge number when it is unlimited
+                    return int(limit) // 2
+            except OSError:
+                pass
+        try:
+            with open('/proc/meminfo', 'r') as ff:
+                for each_line in ff:
+                    if each_line.startswith('MemTotal:'):
+                        return int(each_line.split()[1]) * 1024 // 2
+        except OSError:
+            pass
+        LOGGER.warning('cannot find memory size. not limiting ingest jobs by memory')
+        return None
+
+    @property
+    def memory_budget(self):
+        return self.__memory_budget
+
+    def __get_job_path(self, state, job_id):
+        return os.path.join(self.__queue_dir, state, f'{job_id}.json')
+
+    @staticmethod
+    def __write_json_atomically(job_path, job: dict):
+        FileUtils.write_json(f'{job_path}.tmp', job, overwrite=True)
+        os.replace(f'{job_path}.tmp', job_path)  # readers never see a half written file
+        return
+
+    def __write_job(self, state, job: dict):
+        self.__write_json_atomically(self.__get_job_path(state, job['job_id']), job)
+        return
+
+    @staticmethod
+    def update_running_job(job_id, updates: dict):
+        """
+        updating a running job from its worker process. e.g. progress.
+        It does not create IngestWorkerPool since that would queue running jobs again.
+
+        :param job_id: str
+        :param updates: dict - merged into the job
+        :return: None
+        """
+        queue_dir = Config().get_value(Config.ingest_queue_dir, IngestWorkerPool.DEFAULT_QUEUE_DIR)
+        job_path = os.path.join(queue_dir, IngestWorkerPool.RUNNING, f'{job_id}.json')
+        job = FileUtils.read_json(job_path) if FileUtils.file_exist(job_path) else None
+        if job is None:
+            LOGGER.warning(f'cannot find running ingest job: {job_id} to update')
+            return
+        job.update(updates)
+        IngestWorkerPool.__write_json_atomically(job_path, job)
+        return
+
+    def __move_job(self, job_id, from_state, to_state, updates: dict):
+        job = FileUtils.read_json(self.__get_job_path(from_state, job_id))
+        job.update(updates)
+        self.__write_job(to_state, job)
+        FileUtils.del_file(self.__get_job_path(from_state, job_id))
+        return job
+
+    def __list_jobs(self, state):
+        state_dir = os.path.join(self.__queue_dir, state)
+        job_files = [os.path.join(state_dir, k) for k in os.listdir(state_dir) if k.endswith('.json')]
+        return sorted(job_files, key=lambda k: os.stat(k).st_mtime)
+
+    def __requeue_running_jobs(self):
+        for each_job in self.__list_jobs(self.RUNNING):
+            job_id = os.path.basename(each_job)[:-len('.json')]
+            LOGGER.warning(f'queuing ingest job: {job_id} again as it was running when the server stopped')
+            self.__move_job(job_id, self.RUNNING, self.PENDING, {})
+        return
+
+    def clean_up(self, force=False):
+        """
+        deleting done & failed jobs older than `ingest_job_retention_seconds` or beyond the latest `ingest_job_retention_count`
+
+        :param force: bool - run it even if the last one was less than CLEAN_UP_INTERVAL ago
+        :return: int - number of deleted jobs
+        """
+        if not force and time() - self.__last_clean_up < self.CLEAN_UP_INTERVAL:
+            return 0
+        self.__last_clean_up = time()
+        expiry_time = time() - self.__retention_seconds
+        deleting_jobs = []
+        for each_state in [self.DONE, self.FAILED]:
+            job_files = self.__list_jobs(each_state)  # oldest first
+            excess_count = max(0, len(job_files) - self.__retention_count)
+            deleting_jobs.extend([k for i, k in enumerate(job_files) if i < excess_count or os.stat(k).st_mtime < expiry_time])
+        for each_job in deleting_jobs:
+            FileUtils.del_file(each_job)
+        if len(deleting_jobs) > 0:
+            LOGGER.debug(f'deleted {len(deleting_jobs)} finished ingest jobs')
+        return len(deleting_jobs)
+
+    def submit(self, job: dict) -> str:
+        """
+        :param job: dict - with `job_id` and `file_size`. It is passed to IngestAwsJson.execute_job in a worker process
+        :return: str - job_id
+        """
+        job['submitted_at'] = TimeUtils.get_current_time_unix()
+        self.__write_job(self.PENDING, job)
+        self.start()
+        return job['job_id']
+
+    def get_job(self, job_id):
+        """
+        :param job_id: str
+        :return: tuple - (state, job dict). (None, None) if it is not in the queue
+        """
+        for each_state in self.STATES:
+            job_path = self.__get_job_path(each_state, job_id)
+            if FileUtils.file_exist(job_path):
+                job = FileUtils.read_json(job_path)
+                if job is not None:
+                    return each_state, job
+        return None, None
+
+    def __can_start(self, required_bytes):
+        running_workers = [k for k in self.__workers if k is not None and k['job_id'] is not None]
+        if len(running_workers) < 1 or self.__memory_budget is None:
+            return True
+        return sum([k['reserved_bytes'] for k in running_workers]) + required_bytes <= self.__memory_budget
+
+    def __get_idle_worker(self, worker_index):
+        worker = self.__workers[worker_index]
+        if worker is not None and worker['process'].is_alive():
+            return worker
+        task_queue = self.__mp_context.Queue()
+        process = self.__mp_context.Process(target=_worker_loop, args=(task_queue, self.__result_queue), daemon=True)
+        process.start()
+        LOGGER.debug(f'started ingest worker: {worker_index}. pid: {process.pid}')
+        self.__workers[worker_index] = {'process': process, 'task_queue': task_queue, 'job_id': None, 'reserved_bytes': 0}
+        return self.__workers[worker_index]
+
+    def __dispatch_pending_jobs(self):
+        idle_workers = [i for i, k in enumerate(self.__workers) if k is None or k['job_id'] is None]
+        for each_job in self.__list_jobs(self.PENDING):
+            if len(idle_workers) < 1:
+                return
+            job = FileUtils.read_json(each_job)
+            if job is None:
+                continue
+            required_bytes = int(job.get('file_size', 0) * self.__memory_factor)
+            if not self.__can_start(required_bytes):
+                LOGGER.debug(f'waiting for memory to start ingest job: {job["job_id"]}. required: {required_bytes}')
+                return
+            worker = self.__get_idle_worker(idle_workers.pop(0))
+            job = self.__move_job(job['job_id'], self.PENDING, self.RUNNING, {'started_at': TimeUtils.get_current_time_unix()})
+            worker['job_id'] = job['job_id']
+            worker['reserved_bytes'] = required_bytes
+            worker['task_queue'].put(job)
+        return
+
+    def __finish_job(self, job_id, result: dict):
+        state = self.DONE if result.get('code', 500) < 400 else self.FAILED
+        self.__move_job(job_id, self.RUNNING, state, {
+            'finished_at': TimeUtils.get_current_time_unix(),
+            'code': result.get('code', 500),
+            'response': result.get('response', {}),
+        })
+        LOGGER.debug(f'ingest job: {job_id} is {state}')
+        partitions = result.get('partitions', [])
+        if len(partitions) > 0:  # the worker's cache is not the server's cache
+            QueryResultCache().invalidate_partitions(partitions)
+        return
+
+    def __collect_results(self):
+        while True:
+            try:
+                job_id, result = self.__result_queue.get_nowait()
+            except Empty:
+                return
+            for each_worker in self.__workers:
+                if each_worker is not None and each_worker['job_id'] == job_id:
+                    each_worker['job_id'] = None
+                    each_worker['reserved_bytes'] = 0
+            self.__finish_job(job_id, result)
+        return
+
+    def __check_dead_workers(self):
+        for i, each_worker in enumerate(self.__workers):
+            if each_worker is None or each_worker['process'].is_alive():
+                continue
+            if each_worker['job_id'] is not None:
+                exit_code = each_worker['process'].exitcode
+                LOGGER.error(f'ingest worker: {i} died while running job: {each_worker["job_id"]}. exit code: {exit_code}')
+                self.__finish_job(each_worker['job_id'], {'code': 500, 'response': {
+                    'message': 'failed to ingest to parquet',
+                    'details': f'worker process exited with code: {exit_code}. It might be out of memory',
+                }})
+            self.__workers[i] = None
+        return
+
+    def __run(self):
+        while not self.__stop_event.wait(self.__poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                LOGGER.exception(f'error in ingest job dispatcher')
+        return
+
+    def poll(self):
+        """
+        1 round of the dispatcher: collecting finished jobs, starting pending jobs, and deleting expired jobs.
+        It is called by the dispatcher thread every second.
+
+        :return: None
+        """
+        self.__collect_results()
+        self.__check_dead_workers()
+        self.__dispatch_pending_jobs()
+        self.clean_up()
+        return
+
+    def start(self):
+        with self.__lock:
+            if self.__dispatcher is None:
+                self.__result_queue = self.__mp_context.Queue()
+                self.__dispatcher = Thread(target=self.__run, daemon=True)
+                self.__dispatcher.start()
+        return self
+
+    def stop(self):
+        self.__stop_event.set()
+        for each_worker in self.__workers:
+            if each_worker is not None:
+                each_worker['task_queue'].put(None)
+        return
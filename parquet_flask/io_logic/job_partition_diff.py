@@ -0,0 +1,230 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from functools import reduce
+
+from pyspark.sql.dataframe import DataFrame
+from pyspark.sql.functions import broadcast, col, count, lit, struct, sum as spark_sum, to_json, xxhash64
+from pyspark.sql.utils import AnalysisException
+
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.io_logic.partitioned_parquet_path import PartitionedParquetPath
+
+LOGGER = logging.getLogger(__name__)
+
+
+class JobPartitionDiff:
+    """
+    Comparing a data frame with the rows already written for the same job_id, partition by partition.
+
+    A partition is (provider, project, platform_code, year, month).
+    It is fingerprinted by its row count and the sum of xxhash64 of its rows, so the row order does not matter.
+    If the existing rows cannot be compared (missing, or different columns), all partitions are treated as changed.
+    Partitions which only have existing rows are removed from the file, and they are deleted with `delete_partitions`
+    since dynamic partition overwrite does not touch partitions which are not in the written data frame.
+
+    It also finds rows which are not written yet for appending. A row is identified by (platform_code, time, latitude, longitude, depth)
+    and the hash of all of its data columns, so different observations at the same place and time are different rows.
+    """
+    PARTITION_COLUMNS = [CDMSConstants.provider_col, CDMSConstants.project_col, CDMSConstants.platform_code_col,
+                         CDMSConstants.year_col, CDMSConstants.month_col]
+    NON_DATA_COLUMNS = PARTITION_COLUMNS + [CDMSConstants.job_id_col, CDMSConstants.time_obj_col]
+    ROW_KEY_COLUMNS = [CDMSConstants.platform_code_col, CDMSConstants.time_col, CDMSConstants.lat_col,
+                       CDMSConstants.lon_col, CDMSConstants.depth_col]
+    __ROW_HASH_COL = 'row_hash'
+
+    def __init__(self, spark_session, parquet_name):
+        self.__spark = spark_session
+        self.__parquet_name = parquet_name
+
+    def get_job_path(self, provider, project, job_id) -> str:
+        """
+        glob path of the directories of job_id under all platform codes of a provider and project.
+        all platform codes are listed so that platforms which are no longer in the file are found as well.
+
+        :param provider: str
+        :param project: str
+        :param job_id: str
+        :return: str
+        """
+        job_path = PartitionedParquetPath(self.__parquet_name).set_provider(provider).set_project(project).set_platform('*').generate_path()
+        return f'{job_path}/{CDMSConstants.year_col}=*/{CDMSConstants.month_col}=*/{CDMSConstants.job_id_col}={job_id}'
+
+    def read_job_rows(self, df: DataFrame, job_id):
+        """
+        reading the rows of job_id under the providers and projects in df.
+        only the directories of job_id are listed by using a glob path.
+
+        :param df: DataFrame - created by IngestNewJsonFile.create_data_frame
+        :param job_id: str
+        :return: DataFrame or None if nothing is written for job_id
+        """
+        all_df = []
+        for each_row in df.select(CDMSConstants.provider_col, CDMSConstants.project_col).distinct().collect():
+            job_path = self.get_job_path(each_row[0], each_row[1], job_id)
+            try:
+                all_df.append(self.__spark.read.option('basePath', self.__parquet_name).parquet(job_path))
+            except AnalysisException as e:
+                LOGGER.debug(f'nothing is written for job_id: {job_id} in {job_path}. {str(e)}')
+        if len(all_df) < 1:
+            return None
+        return reduce(lambda a, b: a.unionByName(b, allowMissingColumns=True), all_df)
+
+    def __get_fingerprints(self, df: DataFrame, data_columns: list) -> dict:
+        """
+        :return: dict - {partition values in str: (row count, hash sum, partition values)}
+        """
+        fingerprint_rows = df.withColumn(self.__ROW_HASH_COL, xxhash64(to_json(struct(*data_columns))))\
+            .groupBy(self.PARTITION_COLUMNS)\
+            .agg(count(lit(1)).alias('row_count'), spark_sum(col(self.__ROW_HASH_COL).cast('decimal(38,0)')).alias('hash_sum'))\
+            .collect()
+        fingerprints = {}
+        for each_row in fingerprint_rows:
+            partition_values = tuple([each_row[k] for k in self.PARTITION_COLUMNS])
+            fingerprints[tuple([str(k) for k in partition_values])] = (each_row['row_count'], each_row['hash_sum'], partition_values)
+        return fingerprints
+
+    def __get_partitions(self, df: DataFrame) -> dict:
+        """
+        :return: dict - same format as __get_fingerprints without row count and hash sum. they never match real fingerprints
+        """
+        partitions = {}
+        for each_row in df.select(self.PARTITION_COLUMNS).distinct().collect():
+            partition_values = tuple([each_row[k] for k in self.PARTITION_COLUMNS])
+            partitions[tuple([str(k) for k in partition_values])] = (None, None, partition_values)
+        return partitions
+
+    @staticmethod
+    def is_same_fingerprint(new_fingerprint: tuple, existing_fingerprint: tuple) -> bool:
+        """
+        :param new_fingerprint: tuple - (row count, hash sum, partition values)
+        :param existing_fingerprint: tuple - (row count, hash sum, partition values). None if the partition does not exist
+        :return: bool
+        """
+        if existing_fingerprint is None or existing_fingerprint[0] is None:
+            return False
+        return tuple(new_fingerprint[:2]) == tuple(existing_fingerprint[:2])
+
+    @staticmethod
+    def diff_fingerprints(new_fingerprints: dict, existing_fingerprints: dict) -> tuple:
+        """
+        :param new_fingerprints: dict - {partition values in str: (row count, hash sum, partition values)}
+        :param existing_fingerprints: dict - same format. row count and hash sum are None if they cannot be compared
+        :return: tuple - (changed partition values including new ones, removed partition values which are only in existing_fingerprints)
+        """
+        changed_partitions = [v[2] for k, v in new_fingerprints.items() if not JobPartitionDiff.is_same_fingerprint(v, existing_fingerprints.get(k, None))]
+        removed_partitions = [v[2] for k, v in existing_fingerprints.items() if k not in new_fingerprints]
+        return changed_partitions, removed_partitions
+
+    def diff_partitions(self, df: DataFrame, job_id) -> tuple:
+        """
+        :param df: DataFrame - created by IngestNewJsonFile.create_data_frame. It is better to cache it before calling this
+        :param job_id: str
+        :return: tuple - (changed, removed). lists of partition values (provider, project, platform_code, year, month).
+                         changed: partitions of df which are different from the existing rows. removed: partitions with existing rows only
+        """
+        data_columns = sorted([k for k in df.columns if k not in self.NON_DATA_COLUMNS])
+        new_fingerprints = self.__get_fingerprints(df, data_columns)
+        existing_df = self.read_job_rows(df, job_id)
+        if existing_df is None:
+            LOGGER.debug(f'no existing rows for job_id: {job_id}')
+            return self.diff_fingerprints(new_fingerprints, {})
+        existing_types = {k.name: k.dataType for k in existing_df.schema.fields if k.name not in self.NON_DATA_COLUMNS}
+        if sorted(existing_types.keys()) != data_columns:
+            LOGGER.debug(f'different columns. treating all partitions as changed. {sorted(existing_types.keys())} vs {data_columns}')
+            return self.diff_fingerprints(new_fingerprints, self.__get_partitions(existing_df))
+        try:
+            new_types = {k.name: k.dataType for k in df.schema.fields}
+            typed_df = df.select(self.PARTITION_COLUMNS + [col(k) if new_types[k] == v else col(k).cast(v).alias(k) for k, v in existing_types.items()])
+            new_fingerprints = self.__get_fingerprints(typed_df, data_columns)
+            existing_fingerprints = self.__get_fingerprints(existing_df, data_columns)
+        except Exception:
+            LOGGER.exception(f'unable to compare with existing rows. treating all partitions as changed. job_id: {job_id}')
+            return self.diff_fingerprints(new_fingerprints, self.__get_partitions(existing_df))
+        return self.diff_fingerprints(new_fingerprints, existing_fingerprints)
+
+    def delete_partitions(self, partitions: list, job_id):
+        """
+        deleting the directories of job_id in the given partitions with the hadoop file system of the spark session (local or s3a)
+
+        :param partitions: list - removed partition values from `diff_partitions`
+        :param job_id: str
+        :return: None
+        """
+        jvm = self.__spark.sparkContext._jvm
+        hadoop_conf = self.__spark.sparkContext._jsc.hadoopConfiguration()
+        for provider, project, platform_code, year, month in partitions:
+            job_path = PartitionedParquetPath(self.__parquet_name).set_provider(provider).set_project(project).set_platform(platform_code)\
+                .set_year(year).set_month(month).generate_path()
+            job_path = jvm.org.apache.hadoop.fs.Path(f'{job_path}/{CDMSConstants.job_id_col}={job_id}')
+            LOGGER.debug(f'deleting removed partition: {job_path.toString()}')
+            job_path.getFileSystem(hadoop_conf).delete(job_path, True)
+        return
+
+    def delete_job(self, provider_projects: list, job_id):
+        """
+        deleting the directories of job_id under all platform codes, years, and months of the given providers and projects
+
+        :param provider_projects: list - [(provider, project)]
+        :param job_id: str
+        :return: int - number of deleted directories
+        """
+        jvm = self.__spark.sparkContext._jvm
+        hadoop_conf = self.__spark.sparkContext._jsc.hadoopConfiguration()
+        deleted_count = 0
+        for provider, project in provider_projects:
+            job_path = jvm.org.apache.hadoop.fs.Path(self.get_job_path(provider, project, job_id))
+            file_system = job_path.getFileSystem(hadoop_conf)
+            for each_status in file_system.globStatus(job_path) or []:
+                LOGGER.debug(f'deleting partition of job_id: {each_status.getPath().toString()}')
+                file_system.delete(each_status.getPath(), True)
+                deleted_count += 1
+        return deleted_count
+
+    def get_new_rows(self, df: DataFrame, job_id) -> DataFrame:
+        """
+        exact copies of a written row are not new even if the file has more copies of it than the written rows.
+        all data columns of df are hashed. columns which are new in df are null in the written rows,
+        and columns which are only in the written rows are ignored.
+
+        :param df: DataFrame - created by IngestNewJsonFile.create_data_frame
+        :param job_id: str
+        :return: DataFrame - rows of df which are not written for job_id
+        """
+        existing_df = self.read_job_rows(df, job_id)
+        if existing_df is None:
+            LOGGER.debug(f'no existing rows for job_id: {job_id}')
+            return df
+        new_types = {k.name: k.dataType for k in df.schema.fields}
+        key_columns = [k for k in self.ROW_KEY_COLUMNS if k in new_types]
+        data_columns = sorted([k for k in df.columns if k not in self.NON_DATA_COLUMNS])
+        row_hash = xxhash64(to_json(struct(*data_columns))).alias(self.__ROW_HASH_COL)
+        typed_existing_df = existing_df.select([(col(k) if k in existing_df.columns else lit(None)).cast(new_types[k]).alias(k)
+                                                for k in dict.fromkeys(key_columns + data_columns)])  # partition columns may be inferred in different types
+        existing_keys = typed_existing_df.select(key_columns + [row_hash]).distinct()
+        hashed_df = df.withColumn(self.__ROW_HASH_COL, row_hash)
+        join_condition = reduce(lambda a, b: a & b, [hashed_df[k].eqNullSafe(existing_keys[k]) for k in key_columns + [self.__ROW_HASH_COL]])
+        return hashed_df.join(existing_keys, on=join_condition, how='left_anti').drop(self.__ROW_HASH_COL)
+
+    def filter_partitions(self, df: DataFrame, partitions: list) -> DataFrame:
+        """
+        :param df: DataFrame
+        :param partitions: list - changed partition values from `diff_partitions`
+        :return: DataFrame - rows in the given partitions
+        """
+        partition_df = broadcast(self.__spark.createDataFrame(partitions, df.select(self.PARTITION_COLUMNS).schema))
+        join_condition = reduce(lambda a, b: a & b, [df[k].eqNullSafe(partition_df[k]) for k in self.PARTITION_COLUMNS])
+        return df.join(partition_df, on=join_condition, how='left_semi')
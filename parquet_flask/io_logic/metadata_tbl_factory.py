@@ -0,0 +1,37 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from parquet_flask.io_logic.metadata_tbl_interface import MetadataTblInterface
+from parquet_flask.utils.config import Config
+
+
+class MetadataTblFactory:
+    DDB = 'DDB'
+    SQLITE = 'SQLITE'
+
+    def get_instance(self, class_type: str = None) -> MetadataTblInterface:
+        """
+        :param class_type: str - None to use `metadata_tbl_type` in config. DynamoDB by default
+        :return: MetadataTblInterface
+        """
+        if class_type is None:
+            class_type = Config().get_value(Config.metadata_tbl_type, self.DDB)
+        if class_type == self.DDB:
+            from parquet_flask.io_logic.metadata_tbl_io import MetadataTblIO
+            return MetadataTblIO()
+        if class_type == self.SQLITE:
+            from parquet_flask.io_logic.metadata_tbl_sqlite import MetadataTblSqlite
+            return MetadataTblSqlite()
+        raise ValueError(f'invalid class type: {class_type}')
@@ -25,10 +25,42 @@ class MetadataTblInterface(metaclass=abc.ABCMeta):
     def replace_record(self, new_record):
         return
 
+    def write_records(self, new_records: list, is_replacing: bool) -> list:
+        """
+        inserting or replacing many records. implementations can override it to write them in batches.
+
+        :param new_records: list
+        :param is_replacing: bool - True to replace existing records. False to insert new records
+        :return: list - [{'s3_url': str, 'details': str}] for failed records
+        """
+        failed = []
+        for each_record in new_records:
+            try:
+                self.replace_record(each_record) if is_replacing else self.insert_record(each_record)
+            except Exception as e:
+                failed.append({'s3_url': each_record['s3_url'], 'details': str(e)})
+        return failed
+
+    @abc.abstractmethod
+    def delete_records(self, s3_urls: list):
+        """
+        :param s3_urls: list - records to delete. missing ones are ignored
+        :return: None
+        """
+        return
+
     @abc.abstractmethod
     def get_by_s3_url(self, s3_url):
         return
 
+    @abc.abstractmethod
+    def get_by_s3_urls(self, s3_urls: list) -> dict:
+        """
+        :param s3_urls: list
+        :return: dict - {s3_url: record} for ingested ones
+        """
+        return
+
     @abc.abstractmethod
     def get_by_uuid(self, uuid):
         return
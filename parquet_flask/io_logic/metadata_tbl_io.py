@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime, timedelta
+
 from parquet_flask.aws.aws_ddb import AwsDdb, AwsDdbProps
 from parquet_flask.io_logic.cdms_constants import CDMSConstants
 from parquet_flask.io_logic.metadata_tbl_interface import MetadataTblInterface
@@ -32,12 +34,14 @@ class MetadataTblIO(MetadataTblInterface):
         Table settings
         s3_url as primary key
         secondary index: uuid
+        secondary index: ingested_day (yyyy-mm-dd in UTC) with ingested_date as range key
     """
     def __init__(self):
         ddb_props = AwsDdbProps()
         ddb_props.hash_key = CDMSConstants.s3_url_key
         ddb_props.tbl_name = Config().get_value(Config.parquet_metadata_tbl)
         self.__uuid_index = 'uuid-index'
+        self.__ingested_day_index = 'ingested_day-index'
         self.__ddb = AwsDdb(ddb_props)
 
     def insert_record(self, new_record):
@@ -48,11 +52,45 @@ class MetadataTblIO(MetadataTblInterface):
         self.__ddb.add_one_item(new_record, new_record[CDMSConstants.s3_url_key], replace=True)
         return
 
+    def write_records(self, new_records: list, is_replacing: bool) -> list:
+        """
+        writing with conditional transactions of up to 100 records instead of 1 put per record.
+        if a transaction is cancelled, its records are written one by one to find the failed ones.
+        """
+        failed = []
+        for failed_record, error in self.__ddb.transact_put_items(new_records, replace=is_replacing):
+            failed.append({CDMSConstants.s3_url_key: failed_record[CDMSConstants.s3_url_key], 'details': error})
+        return failed
+
+    def delete_records(self, s3_urls: list):
+        for each_s3_url in s3_urls:
+            self.__ddb.delete_one_item(each_s3_url)
+        return
+
     def get_by_s3_url(self, s3_url):
         return self.__ddb.get_one_item(s3_url)
 
+    def get_by_s3_urls(self, s3_urls: list) -> dict:
+        return {k[CDMSConstants.s3_url_key]: k for k in self.__ddb.batch_get_items(s3_urls)}
+
     def get_by_uuid(self, uuid):
         return self.__ddb.get_from_index(self.__uuid_index, {CDMSConstants.uuid_key: uuid})
 
     def query_by_date_range(self, start_time, end_time):
-        raise NotImplementedError('cannot implement range query to the primary key in DDB')
+        """
+        querying 1 ingested_day partition per day between start_time and end_time.
+        records without ingested_day (ingested before it was added) are not found.
+
+        :param start_time: int - unix timestamp in milliseconds. inclusive
+        :param end_time: int - unix timestamp in milliseconds. inclusive
+        :return: list - records ordered by ingested_date
+        """
+        all_records = []
+        current_day = datetime.utcfromtimestamp(start_time / 1000).date()
+        end_day = datetime.utcfromtimestamp(end_time / 1000).date()
+        while current_day <= end_day:
+            all_records.extend(self.__ddb.query_index_range(self.__ingested_day_index,
+                                                            CDMSConstants.ingested_day_key, current_day.strftime('%Y-%m-%d'),
+                                                            CDMSConstants.ingested_date_key, start_time, end_time))
+            current_day += timedelta(days=1)
+        return all_records
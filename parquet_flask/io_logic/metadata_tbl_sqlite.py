@@ -0,0 +1,162 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import sqlite3
+
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.io_logic.metadata_tbl_interface import MetadataTblInterface
+from parquet_flask.utils.config import Config
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MetadataTblSqlite(MetadataTblInterface):
+    """
+    Metadata table in a local SQLite file for deployments and tests without AWS.
+
+    Table columns
+        - s3_url (primary key)
+        - uuid (indexed)
+        - ingested_date (indexed)
+        - record: whole record in JSON
+
+    WAL journal mode lets ingest worker processes read while another one is writing.
+    """
+    DEFAULT_PATH = '/tmp/parquet_metadata_tbl.sqlite'
+    __TBL_NAME = 'parquet_metadata'
+    __MAX_VARIABLES = 500  # below SQLITE_MAX_VARIABLE_NUMBER of old sqlite versions
+
+    def __init__(self, db_path=None):
+        self.__db_path = db_path if db_path is not None else Config().get_value(Config.metadata_tbl_sqlite_path, self.DEFAULT_PATH)
+        self.__create_table()
+
+    def __connect(self):
+        connection = sqlite3.connect(self.__db_path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def __create_table(self):
+        with self.__connect() as connection:
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {self.__TBL_NAME} ('
+                               f'{CDMSConstants.s3_url_key} TEXT PRIMARY KEY, '
+                               f'{CDMSConstants.uuid_key} TEXT, '
+                               f'{CDMSConstants.ingested_date_key} INTEGER, '
+                               f'record TEXT NOT NULL)')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {self.__TBL_NAME}_{CDMSConstants.uuid_key} '
+                               f'ON {self.__TBL_NAME} ({CDMSConstants.uuid_key})')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {self.__TBL_NAME}_{CDMSConstants.ingested_date_key} '
+                               f'ON {self.__TBL_NAME} ({CDMSConstants.ingested_date_key})')
+        connection.close()
+        return
+
+    @staticmethod
+    def __to_row(new_record: dict):
+        return (json.dumps(new_record), new_record.get(CDMSConstants.uuid_key, None),
+                new_record.get(CDMSConstants.ingested_date_key, None), new_record[CDMSConstants.s3_url_key])
+
+    def __insert(self, connection, new_record: dict):
+        try:
+            connection.execute(f'INSERT INTO {self.__TBL_NAME} (record, {CDMSConstants.uuid_key}, {CDMSConstants.ingested_date_key}, {CDMSConstants.s3_url_key}) '
+                               f'VALUES (?, ?, ?, ?)', self.__to_row(new_record))
+        except sqlite3.IntegrityError:
+            raise ValueError(f'record already exists: {new_record[CDMSConstants.s3_url_key]}')
+        return
+
+    def __replace(self, connection, new_record: dict):
+        cursor = connection.execute(f'UPDATE {self.__TBL_NAME} SET record = ?, {CDMSConstants.uuid_key} = ?, {CDMSConstants.ingested_date_key} = ? '
+                                    f'WHERE {CDMSConstants.s3_url_key} = ?', self.__to_row(new_record))
+        if cursor.rowcount < 1:
+            raise ValueError(f'record does not exist: {new_record[CDMSConstants.s3_url_key]}')
+        return
+
+    def __select(self, where_clause: str, params: tuple):
+        connection = self.__connect()
+        try:
+            rows = connection.execute(f'SELECT record FROM {self.__TBL_NAME} WHERE {where_clause}', params).fetchall()
+        finally:
+            connection.close()
+        return [json.loads(k[0]) for k in rows]
+
+    def insert_record(self, new_record):
+        connection = self.__connect()
+        try:
+            with connection:
+                self.__insert(connection, new_record)
+        finally:
+            connection.close()
+        return
+
+    def replace_record(self, new_record):
+        connection = self.__connect()
+        try:
+            with connection:
+                self.__replace(connection, new_record)
+        finally:
+            connection.close()
+        return
+
+    def write_records(self, new_records: list, is_replacing: bool) -> list:
+        """
+        writing all records in 1 transaction. failed records are skipped.
+        """
+        failed = []
+        connection = self.__connect()
+        try:
+            with connection:
+                for each_record in new_records:
+                    try:
+                        self.__replace(connection, each_record) if is_replacing else self.__insert(connection, each_record)
+                    except ValueError as e:
+                        failed.append({CDMSConstants.s3_url_key: each_record[CDMSConstants.s3_url_key], 'details': str(e)})
+        finally:
+            connection.close()
+        return failed
+
+    def delete_records(self, s3_urls: list):
+        connection = self.__connect()
+        try:
+            with connection:
+                for i in range(0, len(s3_urls), self.__MAX_VARIABLES):
+                    chunk = s3_urls[i: i + self.__MAX_VARIABLES]
+                    connection.execute(f'DELETE FROM {self.__TBL_NAME} WHERE {CDMSConstants.s3_url_key} IN ({", ".join(["?"] * len(chunk))})', tuple(chunk))
+        finally:
+            connection.close()
+        return
+
+    def get_by_s3_url(self, s3_url):
+        records = self.__select(f'{CDMSConstants.s3_url_key} = ?', (s3_url,))
+        return records[0] if len(records) > 0 else None
+
+    def get_by_s3_urls(self, s3_urls: list) -> dict:
+        all_records = {}
+        for i in range(0, len(s3_urls), self.__MAX_VARIABLES):
+            chunk = s3_urls[i: i + self.__MAX_VARIABLES]
+            records = self.__select(f'{CDMSConstants.s3_url_key} IN ({", ".join(["?"] * len(chunk))})', tuple(chunk))
+            all_records.update({k[CDMSConstants.s3_url_key]: k for k in records})
+        return all_records
+
+    def get_by_uuid(self, uuid):
+        return self.__select(f'{CDMSConstants.uuid_key} = ?', (uuid,))
+
+    def query_by_date_range(self, start_time, end_time):
+        """
+        :param start_time: int - unix timestamp in milliseconds. inclusive
+        :param end_time: int - unix timestamp in milliseconds. inclusive
+        :return: list - records ordered by ingested_date
+        """
+        return self.__select(f'{CDMSConstants.ingested_date_key} BETWEEN ? AND ? ORDER BY {CDMSConstants.ingested_date_key}',
+                             (start_time, end_time))
@@ -0,0 +1,118 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from threading import Lock
+
+import gevent
+from gevent.lock import BoundedSemaphore
+
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryAdmissionControl(metaclass=Singleton):
+    """
+    Limiting the number of queries running on the shared spark session.
+
+    - at most `query_max_concurrent_jobs` queries are running.
+    - at most `query_max_queued_jobs` queries are waiting for `query_admission_wait_seconds` to start.
+    - everything else is rejected straight away so that the caller can return 429.
+
+    It also picks the spark fair scheduler pool for each query based on its estimated scan size.
+
+    The server is a gevent WSGIServer without monkey patching, so every request runs on 1 thread.
+    Waiting for a slot yields to other requests with a gevent semaphore,
+    and admitted queries are run with `execute` in the gevent threadpool so that spark calls do not block the event loop.
+    """
+    INTERACTIVE_POOL = 'interactive'
+    BULK_POOL = 'bulk'
+
+    def __init__(self):
+        config = Config()
+        self.__max_concurrent_jobs = int(config.get_value(Config.query_max_concurrent_jobs, '4'))
+        self.__max_queued_jobs = int(config.get_value(Config.query_max_queued_jobs, '8'))
+        self.__wait_seconds = float(config.get_value(Config.query_admission_wait_seconds, '10'))
+        self.__bulk_partition_threshold = int(config.get_value(Config.query_bulk_partition_threshold, '48'))
+        self.__bulk_page_size_threshold = int(config.get_value(Config.query_bulk_page_size_threshold, '10000'))
+        self.__semaphore = BoundedSemaphore(self.__max_concurrent_jobs)
+        self.__lock = Lock()
+        self.__running_jobs = 0
+        self.__queued_jobs = 0
+
+    @property
+    def running_jobs(self):
+        return self.__running_jobs
+
+    @property
+    def queued_jobs(self):
+        return self.__queued_jobs
+
+    def get_scheduler_pool(self, parquet_names: list, page_size: int) -> str:
+        """
+        estimating scan size from the number of partitioned parquet paths.
+        an empty list means the query cannot be narrowed down to partitions, and the whole parquet is scanned.
+
+        :param parquet_names: list - PartitionedParquetPath generated by ParquetQueryConditionManagementV3
+        :param page_size: int - number of rows to retrieve
+        :return: str - spark scheduler pool name
+        """
+        if len(parquet_names) < 1 or len(parquet_names) > self.__bulk_partition_threshold:
+            return self.BULK_POOL
+        if page_size > self.__bulk_page_size_threshold:
+            return self.BULK_POOL
+        return self.INTERACTIVE_POOL
+
+    def acquire(self) -> bool:
+        """
+        :return: bool - False if the query is rejected. release() must be called if it is True
+        """
+        with self.__lock:
+            if self.__running_jobs >= self.__max_concurrent_jobs and self.__queued_jobs >= self.__max_queued_jobs:
+                LOGGER.warning(f'rejecting query. running: {self.__running_jobs}. queued: {self.__queued_jobs}')
+                return False
+            self.__queued_jobs += 1
+        try:
+            is_acquired = self.__semaphore.acquire(timeout=self.__wait_seconds)
+        finally:
+            with self.__lock:
+                self.__queued_jobs -= 1
+        if not is_acquired:
+            LOGGER.warning(f'rejecting query after waiting for {self.__wait_seconds} seconds')
+            return False
+        with self.__lock:
+            self.__running_jobs += 1
+        return True
+
+    def execute(self, func, *args, **kwargs):
+        """
+        running a blocking call (e.g. QueryV4.search) in the gevent threadpool.
+        The calling greenlet waits for it while other requests keep running.
+
+        :param func: callable
+        :return: result of func. its exception is re-raised
+        """
+        threadpool = gevent.get_hub().threadpool
+        if threadpool.maxsize < self.__max_concurrent_jobs + 1:  # 1 more for other users of the hub threadpool such as DNS resolver
+            threadpool.maxsize = self.__max_concurrent_jobs + 1
+        return threadpool.apply(func, args, kwargs)
+
+    def release(self):
+        with self.__lock:
+            self.__running_jobs -= 1
+        self.__semaphore.release()
+        return
@@ -0,0 +1,69 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from prometheus_client import CollectorRegistry, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+from parquet_flask.io_logic.query_timing import QueryTiming
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryMetrics(metaclass=Singleton):
+    """
+    Prometheus histograms of query timings, exported by the `metrics` endpoint.
+    """
+    CONTENT_TYPE = CONTENT_TYPE_LATEST
+    __DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float('inf'))
+    __FILE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, float('inf'))
+    __BYTE_BUCKETS = (2 ** 20, 2 ** 24, 2 ** 27, 2 ** 30, 2 ** 33, 2 ** 36, float('inf'))
+
+    def __init__(self):
+        self.__registry = CollectorRegistry()
+        self.__phase_seconds = Histogram('parquet_query_phase_seconds', 'duration of each query phase',
+                                         ['endpoint', 'phase'], buckets=self.__DURATION_BUCKETS, registry=self.__registry)
+        self.__total_seconds = Histogram('parquet_query_seconds', 'duration of query requests',
+                                         ['endpoint', 'status'], buckets=self.__DURATION_BUCKETS, registry=self.__registry)
+        self.__files_scanned = Histogram('parquet_query_files_scanned', 'number of parquet files under the read paths',
+                                         ['endpoint'], buckets=self.__FILE_BUCKETS, registry=self.__registry)
+        self.__bytes_read = Histogram('parquet_query_bytes_read', 'input bytes of spark stages of a query',
+                                      ['endpoint'], buckets=self.__BYTE_BUCKETS, registry=self.__registry)
+
+    def observe(self, endpoint: str, status_code: int, timing: QueryTiming):
+        """
+        :param endpoint: str - namespace of the query endpoint
+        :param status_code: int - HTTP status code of the response
+        :param timing: QueryTiming
+        :return: None
+        """
+        try:
+            for phase_name, duration in timing.phases.items():
+                self.__phase_seconds.labels(endpoint, phase_name).observe(duration)
+            self.__total_seconds.labels(endpoint, str(status_code)).observe(timing.total)
+            if timing.files_scanned is not None:
+                self.__files_scanned.labels(endpoint).observe(timing.files_scanned)
+            if timing.bytes_read is not None:
+                self.__bytes_read.labels(endpoint).observe(timing.bytes_read)
+        except Exception as e:
+            LOGGER.warning(f'failed to record query metrics for {endpoint}. {str(e)}')
+        return
+
+    def export(self) -> bytes:
+        """
+        :return: bytes - prometheus text format
+        """
+        return generate_latest(self.__registry)
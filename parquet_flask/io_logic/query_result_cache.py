@@ -0,0 +1,159 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+from collections import OrderedDict
+from copy import deepcopy
+from threading import Lock
+from time import time
+
+from parquet_flask.io_logic.partitioned_parquet_path import PartitionedParquetPath
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.general_utils import GeneralUtils
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryResultCache(metaclass=Singleton):
+    """
+    LRU cache of query result pages.
+
+    Each entry is tagged with the (provider, project, platform_code) partitions it was read from.
+    A `None` in a tag means the query was not narrowed on that level, and it matches any value.
+    Ingesting or replacing data under a partition evicts every page tagged with it.
+
+    Only complete pages are cached. Pages flagged `partial` are never stored,
+    so the request deadline (timeout) is not part of the key.
+    partial_result stays in the key since its complete pages skip the total count (total: -1).
+    """
+    __LIST_KEYS = ['platform_code', 'columns', 'variable']
+    __EXCLUDED_KEYS = ['timeout']
+
+    def __init__(self):
+        config = Config()
+        self.__max_entries = int(config.get_value(Config.query_cache_max_entries, '256'))
+        self.__max_bytes = int(config.get_value(Config.query_cache_max_bytes, str(64 * 2**20)))
+        self.__ttl = float(config.get_value(Config.query_cache_ttl_seconds, '300'))
+        self.__lock = Lock()
+        self.__entries = OrderedDict()  # key -> (expiry, size, tags, result)
+        self.__current_bytes = 0
+
+    @property
+    def is_enabled(self):
+        return self.__max_entries > 0 and self.__max_bytes > 0 and self.__ttl > 0
+
+    @property
+    def current_bytes(self):
+        return self.__current_bytes
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @staticmethod
+    def gen_key(query_json: dict) -> str:
+        """
+        normalizing the query so that the same query with different ordering of list items generate the same key.
+        pagination cursors (start_from, min_time, marker_platform_code) are part of query_json.
+        timeout is excluded since it does not change a complete page.
+
+        :param query_json: dict - query body which is passed to QueryProps
+        :return: str - sha256 of normalized query
+        """
+        normalized_query = {}
+        for k, v in query_json.items():
+            if k in QueryResultCache.__EXCLUDED_KEYS:
+                continue
+            normalized_query[k] = sorted(v) if k in QueryResultCache.__LIST_KEYS and isinstance(v, list) else v
+        return GeneralUtils.gen_sha_256_json_obj(normalized_query)
+
+    @staticmethod
+    def gen_partition_tags(parquet_names: list) -> list:
+        if len(parquet_names) < 1:
+            return [(None, None, None)]  # reading from the base parquet path
+        tags = set()
+        for each in parquet_names:
+            each: PartitionedParquetPath = each
+            tags.add((each.provider, each.project, each.platform))
+        return list(tags)
+
+    @staticmethod
+    def __is_tag_matched(tag: tuple, partition: tuple) -> bool:
+        return all([k is None or v is None or str(k) == str(v) for k, v in zip(tag, partition)])
+
+    def __remove(self, key):
+        expiry, size, tags, result = self.__entries.pop(key)
+        self.__current_bytes -= size
+        return
+
+    def __evict_expired(self, current_time):
+        expired_keys = [k for k, v in self.__entries.items() if v[0] < current_time]
+        for each in expired_keys:
+            self.__remove(each)
+        return
+
+    def get(self, key):
+        if not self.is_enabled:
+            return None
+        with self.__lock:
+            if key not in self.__entries:
+                return None
+            if self.__entries[key][0] < time():
+                LOGGER.debug(f'cached page expired: {key}')
+                self.__remove(key)
+                return None
+            self.__entries.move_to_end(key)
+            return deepcopy(self.__entries[key][3])
+
+    def put(self, key, result: dict, tags: list):
+        if not self.is_enabled:
+            return False
+        if result.get('partial', False) is not False:
+            LOGGER.debug(f'not caching a partial page: {key}')
+            return False
+        size = len(json.dumps(result, default=str))
+        if size > self.__max_bytes:
+            LOGGER.debug(f'not caching a page larger than the cache. size: {size}')
+            return False
+        current_time = time()
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__evict_expired(current_time)
+            while len(self.__entries) >= self.__max_entries or self.__current_bytes + size > self.__max_bytes:
+                self.__remove(next(iter(self.__entries)))  # least recently used
+            self.__entries[key] = (current_time + self.__ttl, size, tags, deepcopy(result))
+            self.__current_bytes += size
+        return True
+
+    def invalidate_partitions(self, partitions: list):
+        """
+        :param partitions: list - [(provider, project, platform_code)] which have new data
+        :return: int - number of evicted pages
+        """
+        with self.__lock:
+            evicting_keys = [k for k, v in self.__entries.items()
+                             if any([self.__is_tag_matched(each_tag, each_partition) for each_tag in v[2] for each_partition in partitions])]
+            for each in evicting_keys:
+                self.__remove(each)
+        LOGGER.debug(f'evicted {len(evicting_keys)} cached pages for partitions: {partitions}')
+        return len(evicting_keys)
+
+    def invalidate_all(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__current_bytes = 0
+        return
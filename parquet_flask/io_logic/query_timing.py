@@ -0,0 +1,164 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryTiming:
+    """
+    Collecting durations of the phases of 1 query request, and what spark did for it.
+
+    Phases used by the query endpoints and QueryV4:
+        - cache: looking up the result page cache
+        - admission: waiting in QueryAdmissionControl
+        - planning: ParquetQueryConditionManagementV3
+        - session: retrieving the spark session
+        - read_plan: creating data frames for the partitioned paths
+        - filter: adding conditions and sorting (lazy)
+        - count: counting the total
+        - retrieval: collecting the page
+
+    Durations of the same phase are added up, e.g. when spark session is rebuilt and the query is retried.
+    """
+    TOTAL = 'total'
+    __SPARK_UI_TIMEOUT = 1
+
+    def __init__(self):
+        self.__start_time = perf_counter()
+        self.__end_time = None
+        self.__phases = {}
+        self.__spark_job_ids = []
+        self.__files_scanned = None
+        self.__bytes_read = None
+
+    @property
+    def phases(self):
+        return self.__phases
+
+    @property
+    def spark_job_ids(self):
+        return self.__spark_job_ids
+
+    @property
+    def files_scanned(self):
+        return self.__files_scanned
+
+    @files_scanned.setter
+    def files_scanned(self, val):
+        """
+        :param val: int - number of parquet files under the read paths
+        :return: None
+        """
+        self.__files_scanned = val
+        return
+
+    @property
+    def bytes_read(self):
+        return self.__bytes_read
+
+    @property
+    def total(self):
+        return (perf_counter() if self.__end_time is None else self.__end_time) - self.__start_time
+
+    def finish(self):
+        """
+        stopping the total duration. calling it again does nothing
+        """
+        if self.__end_time is None:
+            self.__end_time = perf_counter()
+        return self
+
+    def add_phase(self, name: str, duration: float):
+        """
+        :param name: str - phase name
+        :param duration: float - seconds
+        :return: None
+        """
+        self.__phases[name] = self.__phases.get(name, 0) + duration
+        return
+
+    @contextmanager
+    def phase(self, name: str):
+        start_time = perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_phase(name, perf_counter() - start_time)
+
+    @staticmethod
+    def __to_ms(seconds: float):
+        return round(seconds * 1000, 3)
+
+    def __get_stage_input_bytes(self, spark_context, stage_ids: list):
+        """
+        input bytes are not exposed by the python status tracker, so they are read from the REST API of the spark UI.
+        stages finished a moment ago may not be updated there yet, so it is the lower bound.
+        """
+        if spark_context.uiWebUrl is None:
+            return None
+        total_bytes = 0
+        for each_stage_id in stage_ids:
+            response = requests.get(f'{spark_context.uiWebUrl}/api/v1/applications/{spark_context.applicationId}/stages/{each_stage_id}',
+                                    timeout=self.__SPARK_UI_TIMEOUT)
+            if response.status_code != 200:
+                continue
+            total_bytes += sum([k.get('inputBytes', 0) for k in response.json()])  # 1 item per stage attempt
+        return total_bytes
+
+    def collect_spark_stats(self, spark_context, job_group: str):
+        """
+        :param spark_context: SparkContext
+        :param job_group: str - job group of the query
+        :return: None
+        """
+        try:
+            status_tracker = spark_context.statusTracker()
+            self.__spark_job_ids = sorted(status_tracker.getJobIdsForGroup(job_group))
+            stage_ids = set()
+            for each_job_id in self.__spark_job_ids:
+                job_info = status_tracker.getJobInfo(each_job_id)
+                if job_info is not None:
+                    stage_ids.update(job_info.stageIds)
+            self.__bytes_read = self.__get_stage_input_bytes(spark_context, sorted(stage_ids))
+        except Exception as e:
+            LOGGER.warning(f'failed to collect spark stats for job group: {job_group}. {str(e)}')
+        return
+
+    def to_dict(self) -> dict:
+        """
+        :return: dict - durations in milliseconds
+        """
+        return {
+            'phases': {k: self.__to_ms(v) for k, v in self.__phases.items()},
+            self.TOTAL: self.__to_ms(self.total),
+            'spark_job_ids': self.__spark_job_ids,
+            'files_scanned': self.__files_scanned,
+            'bytes_read': self.__bytes_read,
+        }
+
+    def to_server_timing(self) -> str:
+        """
+        :return: str - value of `Server-Timing` HTTP header. https://www.w3.org/TR/server-timing/
+        """
+        all_metrics = [f'{k};dur={self.__to_ms(v)}' for k, v in self.__phases.items()]
+        all_metrics.append(f'{self.TOTAL};dur={self.__to_ms(self.total)}')
+        return ', '.join(all_metrics)
+
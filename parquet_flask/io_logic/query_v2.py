@@ -47,6 +47,8 @@ QUERY_PROPS_SCHEMA = {
         'max_time': {'type': 'string'},
         'min_lat_lon': {'type': 'array', 'items': {'type': 'number'}, 'minItems': 2, 'maxItems': 2},
         'max_lat_lon': {'type': 'array', 'items': {'type': 'number'}, 'minItems': 2, 'maxItems': 2},
+        'timeout': {'type': 'number', 'exclusiveMinimum': 0},
+        'partial_result': {'type': 'boolean'},
     },
     'required': ['start_from', 'size', 'min_depth', 'max_depth', 'min_time', 'max_time', 'min_lat_lon', 'max_lat_lon'],
 }
@@ -70,6 +72,8 @@ class QueryProps:
         self.__start_at = 0
         self.__size = 0
         self.__columns = []
+        self.__timeout = None
+        self.__partial_result = False
 
     @property
     def marker_platform_code(self):
@@ -146,6 +150,10 @@ class QueryProps:
             self.variable = input_json['variable']
         if 'marker_platform_code' in input_json:
             self.marker_platform_code = input_json['marker_platform_code']
+        if 'timeout' in input_json:
+            self.timeout = input_json['timeout']
+        if 'partial_result' in input_json:
+            self.partial_result = input_json['partial_result']
         return self
 
     @property
@@ -291,6 +299,32 @@ class QueryProps:
         self.__size = val
         return
 
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    @timeout.setter
+    def timeout(self, val):
+        """
+        :param val: float - seconds. None for no request deadline
+        :return: None
+        """
+        self.__timeout = val
+        return
+
+    @property
+    def partial_result(self):
+        return self.__partial_result
+
+    @partial_result.setter
+    def partial_result(self, val):
+        """
+        :param val: bool - True to return rows retrieved so far when timeout passes instead of failing
+        :return: None
+        """
+        self.__partial_result = val
+        return
+
     @property
     def columns(self):
         return self.__columns
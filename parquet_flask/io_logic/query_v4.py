@@ -14,6 +14,8 @@
 # limitations under the License.
 import logging
 from datetime import datetime
+from time import perf_counter, time
+from uuid import uuid4
 
 import pyspark.sql.functions as F
 from pyspark.sql.session import SparkSession
@@ -24,7 +26,11 @@ from pyspark.sql.types import Row
 from parquet_flask.io_logic.cdms_schema import CdmsSchema
 from parquet_flask.io_logic.parquet_query_condition_management_v3 import ParquetQueryConditionManagementV3
 from parquet_flask.io_logic.partitioned_parquet_path import PartitionedParquetPath
+from parquet_flask.io_logic.query_admission_control import QueryAdmissionControl
+from parquet_flask.io_logic.query_timing import QueryTiming
 from parquet_flask.io_logic.query_v2 import QueryProps
+from parquet_flask.io_logic.query_watchdog import QueryWatchdog
+from parquet_flask.io_logic.spark_config_profiles import SparkConfigProfiles
 from parquet_flask.io_logic.cdms_constants import CDMSConstants
 from parquet_flask.utils.config import Config
 from parquet_flask.utils.general_utils import GeneralUtils
@@ -33,6 +39,8 @@ LOGGER = logging.getLogger(__name__)
 
 
 class QueryV4:
+    SPOOL_FORMATS = ['parquet', 'ndjson']
+
     def __init__(self, props=QueryProps()):
         self.__props = props
         config = Config()
@@ -42,19 +50,92 @@ class QueryV4:
         self.__parquet_name = self.__parquet_name if not self.__parquet_name.endswith('/') else self.__parquet_name[:-1]
         self.__missing_depth_value = CDMSConstants.missing_depth_value
         self.__conditions = []
+        self.__parquet_names = []
+        self.__max_duration = int(config.get_value(Config.query_max_duration_seconds, '300'))
+        self.__disconnect_check = None
+        self.__server_deadline = None
+        self.__request_deadline = None
+        self.__is_partial = False
+        self.__timing = QueryTiming()
+        self.__is_collecting_scan_stats = config.get_value(Config.query_scan_stats, 'false').strip().lower() == 'true'  # spark UI calls per stage are on the request path
+        self.__session_requested_time = None
         self.__sorting_columns = [CDMSConstants.time_col, CDMSConstants.platform_code_col, CDMSConstants.depth_col, CDMSConstants.lat_col, CDMSConstants.lon_col]
         self.__set_missing_depth_val()
 
+    @property
+    def parquet_names(self):
+        """
+        partitioned parquet paths used in the last search. empty list if the base parquet path is read
+        """
+        return self.__parquet_names
+
+    @property
+    def disconnect_check(self):
+        return self.__disconnect_check
+
+    @disconnect_check.setter
+    def disconnect_check(self, val):
+        """
+        :param val: callable - returns True if the client is no longer waiting for the result
+        :return: None
+        """
+        self.__disconnect_check = val
+        return
+
+    @property
+    def timing(self):
+        return self.__timing
+
+    @timing.setter
+    def timing(self, val):
+        """
+        :param val: QueryTiming - collector shared with the caller to include its own phases
+        :return: None
+        """
+        self.__timing = val
+        return
+
+    def __set_deadlines(self):
+        """
+        - server deadline: `query_max_duration_seconds` from the config. spark jobs are cancelled when it passes.
+        - request deadline: `timeout` from the request. spark jobs are cancelled when it passes unless partial result is requested.
+            for partial result, rows retrieved so far are returned.
+        """
+        begin_time = time()
+        self.__server_deadline = None if self.__max_duration < 1 else begin_time + self.__max_duration
+        self.__request_deadline = None if self.__props.timeout is None else begin_time + self.__props.timeout
+        self.__is_partial = False
+        return
+
+    def __get_watchdog_deadline(self):
+        if self.__props.partial_result is True or self.__request_deadline is None:
+            return self.__server_deadline
+        if self.__server_deadline is None:
+            return self.__request_deadline
+        return min(self.__server_deadline, self.__request_deadline)
+
+    def __is_past_request_deadline(self):
+        return self.__request_deadline is not None and time() > self.__request_deadline
+
+    def __check_request_deadline(self, next_step: str):
+        if self.__props.partial_result is True or not self.__is_past_request_deadline():
+            return
+        raise TimeoutError(f'query exceeded {self.__props.timeout} seconds before {next_step}')
+
+    def __get_timeout_message(self):
+        if self.__request_deadline is not None and (self.__server_deadline is None or self.__request_deadline < self.__server_deadline):
+            return f'query exceeded {self.__props.timeout} seconds'
+        return f'query exceeded {self.__max_duration} seconds'
+
     def __set_missing_depth_val(self):
         possible_missing_depth = Config().get_value(Config.missing_depth_value)
         if GeneralUtils.is_int(possible_missing_depth):
             self.__missing_depth_value = int(possible_missing_depth)
         return
 
-    def __retrieve_spark(self):
+    def __execute_with_retry(self, func, profile):
         from parquet_flask.io_logic.retrieve_spark_session import RetrieveSparkSession
-        spark = RetrieveSparkSession().retrieve_spark_session(self.__app_name, self.__master_spark)
-        return spark
+        return RetrieveSparkSession().execute_with_retry(self.__app_name, self.__master_spark, func, profile=profile)
 
     def get_unioned_read_df(self, condition_manager: ParquetQueryConditionManagementV3, spark: SparkSession) -> DataFrame:
         if len(condition_manager.parquet_names) < 1:
@@ -107,15 +188,34 @@ class QueryV4:
                 break
         if new_index < 0:
             raise ValueError(f'cannot find existing row. It should not happen.')
+        if self.__props.partial_result is True:
+            return self.__collect_till_deadline(query_result, self.__props.size, new_index + 1)
         result_page = query_result.take(self.__props.size + new_index + 1)
         result_tail = result_page[new_index + 1:]
         return result_tail
 
+    def __collect_till_deadline(self, query_result: DataFrame, row_count: int, skip_count: int = 0):
+        """
+        streaming rows to the driver instead of collecting them at once, so that it can stop at the request deadline.
+        """
+        result = []
+        for i, each_row in enumerate(query_result.limit(skip_count + row_count).toLocalIterator()):
+            if i < skip_count:
+                continue
+            result.append(each_row)
+            if len(result) < row_count and self.__is_past_request_deadline():
+                LOGGER.debug(f'returning partial result after {len(result)} rows')
+                self.__is_partial = True
+                break
+        return result
+
     def __get_page(self, query_result: DataFrame, total_result: int):
         if self.__props.size == 0:
             return []
         if self.__props.marker_platform_code is not None:  # pagination new logic
             return self.__get_nth_first_page(query_result)
+        if self.__props.partial_result is True:
+            return self.__collect_till_deadline(query_result, self.__props.size, self.__props.start_at)
         if total_result < 0:
             raise ValueError('total_result is not calculated for old pagination logic. This should not happen. Something has horribly gone wrong')
         # result = self.__get_paged_result_v2(query_result)
@@ -125,22 +225,98 @@ class QueryV4:
         if self.__props.marker_platform_code is not None:
             LOGGER.debug(f'not counting total since this is an Nth page')
             return -1
+        if self.__props.partial_result is True:
+            LOGGER.debug(f'not counting total since partial result is requested')
+            return -1
         LOGGER.debug(f'counting total')
         return int(query_result.count())
 
-    def search(self, spark_session=None):
-        LOGGER.debug(f'<delay_check> query_v4_search started')
+    def __select_columns(self, query_result: DataFrame, condition_manager: ParquetQueryConditionManagementV3) -> DataFrame:
+        if len(condition_manager.columns) > 0:
+            return query_result.select(condition_manager.columns)
+        removing_cols = [CDMSConstants.time_obj_col, CDMSConstants.year_col, CDMSConstants.month_col]
+        return query_result.drop(*removing_cols)
+
+    def spool(self, output_path: str, output_format: str = 'parquet', spark_session=None):
+        """
+        write the whole result set to `output_path` instead of returning a page.
+        rows are not sorted, and pagination props are ignored.
+
+        :param output_path: str - local directory or s3a:// url. it is overwritten if it exists
+        :param output_format: str - `parquet` or `ndjson`
+        :param spark_session:
+        :return: bool - False if there is nothing to read
+        """
+        if output_format not in self.SPOOL_FORMATS:
+            raise ValueError(f'invalid output_format: {output_format}. valid formats: {self.SPOOL_FORMATS}')
         condition_manager = ParquetQueryConditionManagementV3(self.__parquet_name, self.__missing_depth_value, self.__props)
         condition_manager.manage_query_props()
+        self.__parquet_names = condition_manager.parquet_names
+        if spark_session is not None:
+            return self.__spool(spark_session, condition_manager, output_path, output_format)
+        return self.__execute_with_retry(lambda spark: self.__spool(spark, condition_manager, output_path, output_format), SparkConfigProfiles.BULK_QUERY)
+
+    def __spool(self, spark: SparkSession, condition_manager: ParquetQueryConditionManagementV3, output_path: str, output_format: str):
+        spark.sparkContext.setLocalProperty('spark.scheduler.pool', QueryAdmissionControl.BULK_POOL)
+        read_df: DataFrame = self.get_unioned_read_df(condition_manager, spark)
+        if read_df is None:
+            LOGGER.debug(f'nothing to spool to {output_path}')
+            return False
+        query_result = self.__select_columns(read_df.where(' AND '.join(condition_manager.conditions)), condition_manager)
+        df_writer = query_result.write.mode('overwrite')
+        if output_format == 'ndjson':
+            df_writer.json(output_path, compression='gzip')
+        else:
+            df_writer.parquet(output_path, compression='GZIP')
+        LOGGER.debug(f'finished spooling to {output_path}')
+        return True
+
+    def search(self, spark_session=None):
+        LOGGER.debug(f'<delay_check> query_v4_search started')
+        with self.__timing.phase('planning'):
+            condition_manager = ParquetQueryConditionManagementV3(self.__parquet_name, self.__missing_depth_value, self.__props)
+            condition_manager.manage_query_props()
+        self.__parquet_names = condition_manager.parquet_names
+        self.__set_deadlines()
 
-        conditions = ' AND '.join(condition_manager.conditions)
         query_begin_time = datetime.now()
         LOGGER.debug(f'<delay_check> query begins at {query_begin_time}')
-        spark = self.__retrieve_spark() if spark_session is None else spark_session
+        scheduler_pool = QueryAdmissionControl().get_scheduler_pool(condition_manager.parquet_names, self.__props.size)
+        LOGGER.debug(f'using spark scheduler pool: {scheduler_pool}')
+        self.__session_requested_time = perf_counter()
+        if spark_session is not None:
+            return self.__search_in_session(spark_session, condition_manager, scheduler_pool, query_begin_time)
+        profile = SparkConfigProfiles.BULK_QUERY if scheduler_pool == QueryAdmissionControl.BULK_POOL else SparkConfigProfiles.INTERACTIVE_QUERY
+        return self.__execute_with_retry(lambda spark: self.__search_in_session(spark, condition_manager, scheduler_pool, query_begin_time), profile)
+
+    def __search_in_session(self, spark: SparkSession, condition_manager: ParquetQueryConditionManagementV3, scheduler_pool: str, query_begin_time):
         created_spark_session_time = datetime.now()
+        self.__timing.add_phase('session', perf_counter() - self.__session_requested_time)
         LOGGER.debug(f'<delay_check>spark session created at {created_spark_session_time}. duration: {created_spark_session_time - query_begin_time}')
+        spark.sparkContext.setLocalProperty('spark.scheduler.pool', scheduler_pool)
+        job_group = f'query_v4_{uuid4()}'
+        spark.sparkContext.setJobGroup(job_group, f'QueryV4 search. page size: {self.__props.size}', True)
+        with QueryWatchdog(spark.sparkContext, job_group, self.__get_watchdog_deadline(), self.__disconnect_check) as watchdog:
+            try:
+                return self.__search(spark, condition_manager, created_spark_session_time, query_begin_time)
+            except Exception as e:
+                if watchdog.cancel_reason == QueryWatchdog.DEADLINE:
+                    raise TimeoutError(self.__get_timeout_message()) from e
+                if watchdog.cancel_reason == QueryWatchdog.DISCONNECTED:
+                    raise ConnectionAbortedError('client disconnected before query finished') from e
+                raise
+            finally:
+                self.__session_requested_time = perf_counter()  # session time of a retry starts after this attempt
+                if self.__is_collecting_scan_stats:
+                    self.__timing.collect_spark_stats(spark.sparkContext, job_group)
+
+    def __search(self, spark: SparkSession, condition_manager: ParquetQueryConditionManagementV3, created_spark_session_time, query_begin_time):
+        conditions = ' AND '.join(condition_manager.conditions)
         LOGGER.debug(f'__parquet_name: {condition_manager.parquet_name}')
-        read_df: DataFrame = self.get_unioned_read_df(condition_manager, spark)
+        with self.__timing.phase('read_plan'):
+            read_df: DataFrame = self.get_unioned_read_df(condition_manager, spark)
+            if read_df is not None and self.__is_collecting_scan_stats:
+                self.__timing.files_scanned = len(read_df.inputFiles())
         if read_df is None:
             return {
                 'total': 0,
@@ -148,12 +324,15 @@ class QueryV4:
             }
         read_df_time = datetime.now()
         LOGGER.debug(f'<delay_check> parquet read created at {read_df_time}. duration: {read_df_time - created_spark_session_time}')
-        query_result = read_df.where(conditions)
-        query_result = query_result.sort(self.__get_sorting_params(query_result))
+        with self.__timing.phase('filter'):
+            query_result = read_df.where(conditions)
+            query_result = query_result.sort(self.__get_sorting_params(query_result))
         query_time = datetime.now()
         LOGGER.debug(f'<delay_check> parquet read filtered at {query_time}. duration: {query_time - read_df_time}')
         LOGGER.debug(f'<delay_check> total duration: {query_time - query_begin_time}')
-        total_result = self.__get_total_count(query_result)
+        self.__check_request_deadline('counting total')
+        with self.__timing.phase('count'):
+            total_result = self.__get_total_count(query_result)
         LOGGER.debug(f'<delay_check> total calc count duration: {datetime.now() - query_time}')
         if self.__props.size < 1:
             LOGGER.debug(f'returning only the size: {total_result}')
@@ -163,18 +342,19 @@ class QueryV4:
             }
         query_time = datetime.now()
         # result = query_result.withColumn('_id', F.monotonically_increasing_id())
-        removing_cols = [CDMSConstants.time_obj_col, CDMSConstants.year_col, CDMSConstants.month_col]
         # result = result.where(F.col('_id').between(self.__props.start_at, self.__props.start_at + self.__props.size)).drop(*removing_cols)
-        if len(condition_manager.columns) > 0:
-            query_result = query_result.select(condition_manager.columns)
-        else:
-            query_result = query_result.drop(*removing_cols)
+        query_result = self.__select_columns(query_result, condition_manager)
         LOGGER.debug(f'<delay_check> returning size : {total_result}')
-        result = self.__get_page(query_result, total_result)
+        self.__check_request_deadline('retrieving page')
+        with self.__timing.phase('retrieval'):
+            result = self.__get_page(query_result, total_result)
         query_result.unpersist()
         LOGGER.debug(f'<delay_check> total retrieval duration: {datetime.now() - query_time}')
         # spark.stop()
-        return {
+        search_result = {
             'total': total_result,
             'results': [k.asDict() for k in result],
         }
+        if self.__props.partial_result is True:
+            search_result['partial'] = self.__is_partial
+        return search_result
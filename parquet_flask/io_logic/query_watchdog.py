@@ -0,0 +1,99 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from threading import Event, Thread
+from time import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class QueryWatchdog:
+    """
+    Cancelling the spark job group of a query when the deadline passes or when the client goes away.
+
+    It runs in a separate thread since the thread running the query is blocked by spark actions.
+    """
+    DEADLINE = 'deadline'
+    DISCONNECTED = 'disconnected'
+
+    def __init__(self, spark_context, job_group: str, deadline=None, disconnect_check=None, poll_interval=1.0):
+        """
+        :param spark_context: SparkContext
+        :param job_group: str - job group set by `setJobGroup` in the query thread
+        :param deadline: float - unix timestamp in seconds. None for no deadline
+        :param disconnect_check: callable - returns True if the client is no longer connected. None for no check
+        :param poll_interval: float - seconds between checks
+        """
+        self.__spark_context = spark_context
+        self.__job_group = job_group
+        self.__deadline = deadline
+        self.__disconnect_check = disconnect_check
+        self.__poll_interval = poll_interval
+        self.__stop_event = Event()
+        self.__thread = None
+        self.__cancel_reason = None
+
+    @property
+    def cancel_reason(self):
+        return self.__cancel_reason
+
+    @property
+    def is_cancelled(self):
+        return self.__cancel_reason is not None
+
+    def __is_disconnected(self):
+        try:
+            return self.__disconnect_check()
+        except Exception as e:
+            LOGGER.debug(f'error while checking client connection. ignoring it: {str(e)}')
+            return False
+
+    def __cancel(self, reason):
+        self.__cancel_reason = reason
+        LOGGER.warning(f'cancelling spark job group: {self.__job_group}. reason: {reason}')
+        try:
+            self.__spark_context.cancelJobGroup(self.__job_group)
+        except Exception as e:
+            LOGGER.exception(f'failed to cancel spark job group: {self.__job_group}')
+        return
+
+    def __watch(self):
+        while not self.__stop_event.wait(self.__poll_interval):
+            if self.__deadline is not None and time() > self.__deadline:
+                self.__cancel(self.DEADLINE)
+                return
+            if self.__disconnect_check is not None and self.__is_disconnected():
+                self.__cancel(self.DISCONNECTED)
+                return
+        return
+
+    def start(self):
+        if self.__deadline is None and self.__disconnect_check is None:
+            return self
+        self.__thread = Thread(target=self.__watch, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop_event.set()
+        return
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
@@ -14,11 +14,15 @@
 # limitations under the License.
 import json
 import logging
+import os
 from socket import gethostbyname, gethostname
+from threading import RLock
+from time import time
 
-from pyspark import SparkConf
+from pyspark import SparkConf, SparkContext
 from pyspark.sql import SparkSession
 
+from parquet_flask.io_logic.spark_config_profiles import SparkConfigProfiles
 from parquet_flask.io_logic.spark_constants import SparkConstants
 from parquet_flask.utils.config import Config
 from parquet_flask.utils.singleton import Singleton
@@ -27,9 +31,28 @@ LOGGER = logging.getLogger(__name__)
 
 
 class RetrieveSparkSession(metaclass=Singleton):
+    """
+    Caching spark sessions per app name and master.
+
+    A cached session is checked before it is returned. If it is stopped (executors lost, master restarted, JVM died),
+    it is re-created under a lock so that concurrent requests do not build several sessions.
+
+    Sessions for named config profiles (check SparkConfigProfiles) are created from the cached session with `newSession()`.
+    They share its SparkContext, but have their own runtime SQL config.
+
+    `get_session_metrics` does not take the lock. It is called by health checks on the gevent server thread,
+    which must not wait for a session build that may take minutes.
+    """
+    CREATING = 'creating'
+    ALIVE = 'alive'
+    DEAD = 'dead'
 
     def __init__(self):
         self.__sparks = {}
+        self.__profile_sparks = {}  # session_key -> {profile_name: SparkSession}
+        self.__lock = RLock()
+        self.__session_stats = {}  # session_key -> {'created_at': float, 'rebuild_count': int}
+        self.__creating_keys = set()
         self.__spark_config = {
             'spark.executor.cores': '1',  # fixing to 1 core for now
             'spark.driver.port': '50243',  # a random port.
@@ -37,6 +60,8 @@ class RetrieveSparkSession(metaclass=Singleton):
             'spark.hadoop.fs.s3a.impl': 'org.apache.hadoop.fs.s3a.S3AFileSystem',
             SparkConstants.CRED_PROVIDER_KEY: SparkConstants.SIMPLE_CRED,  # should be overridden
             'spark.hadoop.fs.s3a.connection.ssl.enabled': 'true',
+            'spark.scheduler.mode': 'FAIR',  # pools are set per query. check QueryAdmissionControl
+            'spark.scheduler.allocation.file': os.path.join(os.path.dirname(__file__), 'spark_fair_scheduler.xml'),
 
             # old configs. no longer needs to be used
             # 'spark.driver.extraJavaOptions': '-Dcom.amazonaws.services.s3.enableV4=true',
@@ -76,13 +101,126 @@ class RetrieveSparkSession(metaclass=Singleton):
         LOGGER.info(f'not setting aws cred ENV values as {SparkConstants.CRED_PROVIDER_KEY} = {self.__spark_config[SparkConstants.CRED_PROVIDER_KEY]}')
         return
 
-    def retrieve_spark_session(self, app_name, master_spark, ram='1024m') -> SparkSession:
+    @staticmethod
+    def is_session_alive(spark: SparkSession) -> bool:
+        """
+        asking the JVM through the py4j gateway. a stopped context or an unreachable gateway means it is dead.
+
+        :param spark: SparkSession
+        :return: bool
+        """
+        try:
+            return not spark.sparkContext._jsc.sc().isStopped()
+        except Exception as e:
+            LOGGER.warning(f'failed to check spark session. assuming it is dead: {str(e)}')
+            return False
+
+    def __discard_session(self, session_key):
+        spark = self.__sparks.pop(session_key)
+        self.__profile_sparks.pop(session_key, None)
+        try:
+            spark.stop()
+        except Exception as e:
+            LOGGER.warning(f'failed to stop dead spark session. resetting py4j gateway: {str(e)}')
+            SparkContext._gateway = None  # gateway to a dead JVM cannot be reused. a new one is launched by the next SparkContext
+            SparkContext._jvm = None
+        return
+
+    def __get_session_status(self, session_key, sparks: dict, creating_keys: set):
+        if session_key in creating_keys:
+            return self.CREATING
+        if session_key in sparks and self.is_session_alive(sparks[session_key]):
+            return self.ALIVE
+        return self.DEAD
+
+    def get_session_metrics(self) -> dict:
+        """
+        reading copies of the current state without the lock. a session which is being built is reported as `creating`.
+
+        :return: dict
+        """
+        now = time()
+        creating_keys = set(self.__creating_keys)
+        sparks = dict(self.__sparks)
+        session_stats = {k: dict(v) for k, v in dict(self.__session_stats).items()}
+        sessions = []
+        for k in sorted(set(session_stats.keys()) | creating_keys):
+            stats = session_stats.get(k, {'rebuild_count': 0})
+            status = self.__get_session_status(k, sparks, creating_keys)
+            sessions.append({
+                'session_key': k,
+                'status': status,
+                'is_alive': status == self.ALIVE,
+                'age_seconds': now - stats['created_at'] if 'created_at' in stats else None,
+                'rebuild_count': stats['rebuild_count'],
+            })
+        return {
+            'sessions': sessions,
+            'total_rebuild_count': sum([k['rebuild_count'] for k in sessions]),
+        }
+
+    def execute_with_retry(self, app_name, master_spark, func, ram='1024m', profile=None):
+        """
+        running `func(spark)`. If it fails because the session died, it is re-run once with a new session.
+        failures on a live session are raised as they are.
+
+        :param app_name:
+        :param master_spark:
+        :param func: callable - accepting SparkSession
+        :param ram:
+        :param profile: str - name of SparkConfigProfiles. None to use the shared session
+        :return: whatever `func` returns
+        """
+        spark = self.retrieve_spark_session(app_name, master_spark, ram, profile)
+        try:
+            return func(spark)
+        except Exception as e:
+            if self.is_session_alive(spark):
+                raise
+            LOGGER.warning(f'spark session died while executing. retrying once with a new session. error: {str(e)}')
+        return func(self.retrieve_spark_session(app_name, master_spark, ram, profile))
+
+    def __get_profile_session(self, session_key, profile) -> SparkSession:
+        profile_sparks = self.__profile_sparks.setdefault(session_key, {})
+        if profile in profile_sparks:
+            return profile_sparks[profile]
+        profile_spark = self.__sparks[session_key].newSession()
+        for k, v in SparkConfigProfiles().get_profile(profile).items():
+            if profile_spark.conf.isModifiable(k):
+                profile_spark.conf.set(k, v)
+            else:
+                LOGGER.debug(f'{k} in profile: {profile} cannot be changed at runtime. It is applied only when this profile creates the SparkContext')
+        profile_sparks[profile] = profile_spark
+        return profile_spark
+
+    def retrieve_spark_session(self, app_name, master_spark, ram='1024m', profile=None) -> SparkSession:
         session_key = '{}__{}'.format(app_name, master_spark)
-        if session_key in self.__sparks:
-            return self.__sparks[session_key]
+        with self.__lock:
+            if session_key in self.__sparks and not self.is_session_alive(self.__sparks[session_key]):
+                LOGGER.warning(f'spark session: {session_key} is no longer alive. re-creating it')
+                self.__discard_session(session_key)
+                self.__session_stats[session_key]['rebuild_count'] += 1
+            if session_key not in self.__sparks:
+                self.__creating_keys.add(session_key)
+                try:
+                    self.__sparks[session_key] = self.__create_spark_session(app_name, master_spark, ram, profile)
+                finally:
+                    self.__creating_keys.discard(session_key)
+                if session_key not in self.__session_stats:
+                    self.__session_stats[session_key] = {'rebuild_count': 0}
+                self.__session_stats[session_key]['created_at'] = time()
+            if profile is None:
+                return self.__sparks[session_key]
+            return self.__get_profile_session(session_key, profile)
+
+    def __create_spark_session(self, app_name, master_spark, ram, profile=None) -> SparkSession:
         conf = SparkConf()
         for k, v in self.__spark_config.items():
             conf.set(k, v)
+        if profile is not None:
+            for k, v in SparkConfigProfiles().get_profile(profile).items():
+                if not k.startswith('spark.sql.'):  # runtime SQL config is set on the profile session so that it does not leak into the shared one
+                    conf.set(k, v)
         """
         spark.executor.memory                   3072m
 spark.hadoop.fs.s3a.impl                org.apache.hadoop.fs.s3a.S3AFileSystem
@@ -97,11 +235,13 @@ spark.hadoop.fs.s3n.impl                org.apache.hadoop.fs.s3native.NativeS3Fi
         self.__add_aws_cred(conf)
         # conf.set('spark.default.parallelism', '10')
         # conf.set('spark.hadoop.fs.s3a.endpoint', 's3.us-gov-west-1.amazonaws.com')
-        self.__sparks[session_key] = SparkSession.builder.appName(app_name).config(conf=conf).master(master_spark).getOrCreate()
-        return self.__sparks[session_key]
+        return SparkSession.builder.appName(app_name).config(conf=conf).master(master_spark).getOrCreate()
 
     def stop_spark_session(self, app_name, master_spark):
         session_key = '{}__{}'.format(app_name, master_spark)
-        if session_key in self.__sparks:
-            self.__sparks.pop(session_key).stop()
+        with self.__lock:
+            if session_key in self.__sparks:
+                self.__sparks.pop(session_key).stop()
+                self.__profile_sparks.pop(session_key, None)
+                self.__session_stats.pop(session_key, None)
         return
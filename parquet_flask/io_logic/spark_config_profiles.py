@@ -0,0 +1,97 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+from copy import deepcopy
+
+from parquet_flask.utils.config import Config
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SparkConfigProfiles:
+    """
+    Named spark SQL settings for different kinds of jobs sharing one SparkContext.
+
+    Each profile is applied to its own `SparkSession.newSession()` so that settings do not leak between jobs.
+    Only runtime SQL settings can differ between those sessions.
+    Other settings in a profile take effect only if that profile creates the SparkContext (e.g. in an ingest process).
+
+    Settings can be overridden with `spark_config_profiles` config: {"<profile>": {"<spark key>": "<value>"}}
+    """
+    INTERACTIVE_QUERY = 'interactive-query'
+    BULK_QUERY = 'bulk-query'
+    INGEST = 'ingest'
+    COMPACTION = 'compaction'
+
+    DEFAULT_PROFILES = {
+        INTERACTIVE_QUERY: {  # small partition-pruned scans. avoid scheduling hundreds of tiny tasks
+            'spark.sql.shuffle.partitions': '8',
+            'spark.sql.adaptive.enabled': 'true',
+            'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+            'spark.sql.files.maxPartitionBytes': '33554432',
+            'spark.sql.autoBroadcastJoinThreshold': '10485760',
+        },
+        BULK_QUERY: {  # wide scans and spooling
+            'spark.sql.shuffle.partitions': '200',
+            'spark.sql.adaptive.enabled': 'true',
+            'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+            'spark.sql.adaptive.skewJoin.enabled': 'true',
+            'spark.sql.files.maxPartitionBytes': '134217728',
+        },
+        INGEST: {
+            'spark.sql.sources.partitionOverwriteMode': 'dynamic',
+            'spark.sql.shuffle.partitions': '16',
+            'spark.sql.adaptive.enabled': 'true',
+            'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+            'spark.sql.adaptive.advisoryPartitionSizeInBytes': '134217728',
+        },
+        COMPACTION: {
+            'spark.sql.sources.partitionOverwriteMode': 'dynamic',
+            'spark.sql.shuffle.partitions': '64',
+            'spark.sql.adaptive.enabled': 'true',
+            'spark.sql.adaptive.coalescePartitions.enabled': 'true',
+            'spark.sql.adaptive.advisoryPartitionSizeInBytes': '268435456',
+            'spark.sql.files.maxPartitionBytes': '268435456',
+        },
+    }
+
+    def __init__(self):
+        self.__profiles = deepcopy(self.DEFAULT_PROFILES)
+        self.__load_overrides()
+
+    def __load_overrides(self):
+        possible_overrides = Config().get_value(Config.spark_config_profiles, '{}')
+        try:
+            overrides = json.loads(possible_overrides)
+        except:
+            LOGGER.exception(f'Not loading spark config profiles. unable to convert to JSON object. {possible_overrides}.')
+            return self
+        for profile_name, profile_config in overrides.items():
+            if profile_name not in self.__profiles:
+                LOGGER.warning(f'ignoring unknown spark config profile: {profile_name}')
+                continue
+            self.__profiles[profile_name].update(profile_config)
+        return self
+
+    @property
+    def profile_names(self):
+        return list(self.__profiles.keys())
+
+    def get_profile(self, profile_name: str) -> dict:
+        if profile_name not in self.__profiles:
+            raise ValueError(f'unknown spark config profile: {profile_name}. valid profiles: {self.profile_names}')
+        return deepcopy(self.__profiles[profile_name])
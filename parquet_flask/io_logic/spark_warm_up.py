@@ -0,0 +1,113 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from copy import deepcopy
+from threading import Thread
+from time import sleep, time
+
+from parquet_flask.io_logic.cdms_schema import CdmsSchema
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.singleton import Singleton
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SparkWarmUp(metaclass=Singleton):
+    """
+    Creating the spark session and reading the parquet once before serving queries,
+    so that the first user request does not pay for resolving `spark.jars.packages` and starting executors.
+
+    Failed attempts (e.g. spark master is not up yet) are retried with exponential backoff
+    up to `spark_warm_up_max_backoff_seconds` between attempts till it succeeds.
+    A missing parquet path (nothing is ingested yet) means the session is ready with nothing to warm.
+    """
+    NOT_STARTED = 'not_started'
+    WARMING_UP = 'warming_up'
+    READY = 'ready'
+    INITIAL_BACKOFF = 1
+
+    def __init__(self):
+        config = Config()
+        self.__app_name = config.get_value(Config.spark_app_name)
+        self.__master_spark = config.get_value(Config.master_spark_url)
+        self.__warm_up_path = config.get_value(Config.spark_warm_up_path, config.get_value(Config.parquet_file_name))
+        self.__is_enabled = config.get_value(Config.spark_warm_up, 'true').strip().lower() == 'true'
+        self.__max_backoff = float(config.get_value(Config.spark_warm_up_max_backoff_seconds, '60'))
+        self.__status = self.NOT_STARTED if self.__is_enabled else self.READY
+        self.__timings = {}
+        self.__error = None
+        self.__attempts = 0
+
+    @property
+    def is_ready(self):
+        return self.__status == self.READY
+
+    def get_status(self):
+        status = {
+            'status': self.__status,
+            'timings': deepcopy(self.__timings),
+            'attempts': self.__attempts,
+        }
+        if self.__error is not None:
+            status['details'] = self.__error
+        return status
+
+    @staticmethod
+    def __is_missing_path(error: Exception):
+        from pyspark.sql.utils import AnalysisException
+        return isinstance(error, AnalysisException) and 'Path does not exist' in str(error)
+
+    def __warm_up(self):
+        from parquet_flask.io_logic.retrieve_spark_session import RetrieveSparkSession
+        start_time = time()
+        spark = RetrieveSparkSession().retrieve_spark_session(self.__app_name, self.__master_spark)
+        session_time = time()
+        self.__timings['spark_session'] = session_time - start_time
+        LOGGER.info(f'warm up: spark session created in {self.__timings["spark_session"]} s')
+        try:
+            spark.read.schema(CdmsSchema.ALL_SCHEMA).parquet(self.__warm_up_path).limit(1).collect()
+        except Exception as e:
+            if not self.__is_missing_path(e):
+                raise e
+            LOGGER.info(f'warm up: parquet path does not exist. nothing to read: {self.__warm_up_path}')
+        self.__timings['parquet_read'] = time() - session_time
+        self.__timings['total'] = time() - start_time
+        LOGGER.info(f'warm up: parquet read in {self.__timings["parquet_read"]} s. total: {self.__timings["total"]} s')
+        return
+
+    def start(self):
+        if not self.__is_enabled:
+            LOGGER.info('spark warm up is disabled')
+            return self
+        self.__status = self.WARMING_UP
+        backoff = self.INITIAL_BACKOFF
+        while True:
+            self.__attempts += 1
+            try:
+                self.__warm_up()
+                break
+            except Exception as e:
+                LOGGER.exception(f'failed to warm up spark session. attempt: {self.__attempts}. retrying in {backoff} s')
+                self.__error = str(e)
+            sleep(backoff)
+            backoff = min(backoff * 2, self.__max_backoff)
+        self.__error = None
+        self.__status = self.READY
+        return self
+
+    def start_in_background(self):
+        Thread(target=self.start, daemon=True).start()
+        return self
@@ -0,0 +1,65 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ClientConnection:
+    """
+    Checking whether the HTTP client of the current WSGI request is still connected.
+
+    The socket is found from `werkzeug.socket` (werkzeug dev server) or from `wsgi.input` (gevent WSGIServer).
+    It is duplicated so that it can be checked from another thread without touching the server's socket object.
+    """
+    def __init__(self, environ: dict):
+        self.__socket = None
+        client_socket = self.__find_socket(environ)
+        if client_socket is None:
+            LOGGER.debug('cannot find client socket in WSGI environ. not checking disconnection')
+            return
+        try:
+            self.__socket = socket.fromfd(client_socket.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+        except Exception as e:
+            LOGGER.debug(f'cannot duplicate client socket. not checking disconnection: {str(e)}')
+
+    @staticmethod
+    def __find_socket(environ: dict):
+        if 'werkzeug.socket' in environ:
+            return environ['werkzeug.socket']
+        rfile = getattr(environ.get('wsgi.input'), 'rfile', None)
+        return getattr(getattr(rfile, 'raw', None), '_sock', None)
+
+    @property
+    def is_checkable(self):
+        return self.__socket is not None
+
+    def is_disconnected(self) -> bool:
+        if self.__socket is None:
+            return False
+        try:
+            return len(self.__socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)) == 0  # empty read means EOF
+        except BlockingIOError:
+            return False  # connected. nothing to read
+        except OSError:
+            return True
+
+    def close(self):
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+        return
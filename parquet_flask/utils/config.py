@@ -34,6 +34,43 @@ class Config(metaclass=Singleton):
     authentication_type = 'authentication_type'
     authentication_key = 'authentication_key'
     flask_prefix = 'flask_prefix'
+    query_cache_max_entries = 'query_cache_max_entries'
+    query_cache_max_bytes = 'query_cache_max_bytes'
+    query_cache_ttl_seconds = 'query_cache_ttl_seconds'
+    query_spool_dir = 'query_spool_dir'
+    async_query_workers = 'async_query_workers'
+    async_query_url_expiry = 'async_query_url_expiry'
+    async_query_result_ttl_seconds = 'async_query_result_ttl_seconds'
+    query_max_concurrent_jobs = 'query_max_concurrent_jobs'
+    query_max_queued_jobs = 'query_max_queued_jobs'
+    query_admission_wait_seconds = 'query_admission_wait_seconds'
+    query_bulk_partition_threshold = 'query_bulk_partition_threshold'
+    query_bulk_page_size_threshold = 'query_bulk_page_size_threshold'
+    query_max_duration_seconds = 'query_max_duration_seconds'
+    query_scan_stats = 'query_scan_stats'
+    spark_warm_up = 'spark_warm_up'
+    spark_warm_up_path = 'spark_warm_up_path'
+    spark_warm_up_max_backoff_seconds = 'spark_warm_up_max_backoff_seconds'
+    spark_config_profiles = 'spark_config_profiles'
+    ingest_queue_dir = 'ingest_queue_dir'
+    ingest_max_workers = 'ingest_max_workers'
+    ingest_memory_factor = 'ingest_memory_factor'
+    ingest_memory_budget_mb = 'ingest_memory_budget_mb'
+    ingest_job_retention_seconds = 'ingest_job_retention_seconds'
+    ingest_job_retention_count = 'ingest_job_retention_count'
+    ingest_status_max_wait_seconds = 'ingest_status_max_wait_seconds'
+    ingest_batch_max_files = 'ingest_batch_max_files'
+    ingest_batch_download_workers = 'ingest_batch_download_workers'
+    replace_change_aware = 'replace_change_aware'
+    aws_max_pool_connections = 'aws_max_pool_connections'
+    authentication_cache_ttl_seconds = 'authentication_cache_ttl_seconds'
+    authentication_max_stale_seconds = 'authentication_max_stale_seconds'
+    s3_transfer_part_size_mb = 's3_transfer_part_size_mb'
+    s3_transfer_max_concurrency = 's3_transfer_max_concurrency'
+    s3_transfer_io_chunk_size_kb = 's3_transfer_io_chunk_size_kb'
+    s3_download_streaming = 's3_download_streaming'
+    metadata_tbl_type = 'metadata_tbl_type'
+    metadata_tbl_sqlite_path = 'metadata_tbl_sqlite_path'
 
     def __init__(self):
         self.__keys = [
@@ -51,6 +88,43 @@ class Config(metaclass=Singleton):
             Config.aws_access_key_id,
             Config.aws_secret_access_key,
             Config.aws_session_token,
+            Config.query_cache_max_entries,
+            Config.query_cache_max_bytes,
+            Config.query_cache_ttl_seconds,
+            Config.query_spool_dir,
+            Config.async_query_workers,
+            Config.async_query_url_expiry,
+            Config.async_query_result_ttl_seconds,
+            Config.query_max_concurrent_jobs,
+            Config.query_max_queued_jobs,
+            Config.query_admission_wait_seconds,
+            Config.query_bulk_partition_threshold,
+            Config.query_bulk_page_size_threshold,
+            Config.query_max_duration_seconds,
+            Config.query_scan_stats,
+            Config.spark_warm_up,
+            Config.spark_warm_up_path,
+            Config.spark_warm_up_max_backoff_seconds,
+            Config.spark_config_profiles,
+            Config.ingest_queue_dir,
+            Config.ingest_max_workers,
+            Config.ingest_memory_factor,
+            Config.ingest_memory_budget_mb,
+            Config.ingest_job_retention_seconds,
+            Config.ingest_job_retention_count,
+            Config.ingest_status_max_wait_seconds,
+            Config.ingest_batch_max_files,
+            Config.ingest_batch_download_workers,
+            Config.replace_change_aware,
+            Config.aws_max_pool_connections,
+            Config.authentication_cache_ttl_seconds,
+            Config.authentication_max_stale_seconds,
+            Config.s3_transfer_part_size_mb,
+            Config.s3_transfer_max_concurrency,
+            Config.s3_transfer_io_chunk_size_kb,
+            Config.s3_download_streaming,
+            Config.metadata_tbl_type,
+            Config.metadata_tbl_sqlite_path,
         ]
         self.__validate()
 
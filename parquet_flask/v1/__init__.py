@@ -19,10 +19,15 @@ from flask_restx import Api
 from .insitu_query_swagger import api as apidocs
 from .cdms_schema import api as cdms_schema_api
 from .ingest_json_s3 import api as ingest_parquet_json_s3
+from .ingest_json_s3_batch import api as ingest_parquet_json_s3_batch
 from .replace_json_s3 import api as replace_parquet_json_s3
 from .query_data import api as query_data
 from .query_data_doms import api as query_data_doms
 from .query_data_doms_custom_pagination import api as query_data_doms_custom_pagination
+from .query_data_doms_async import api as query_data_doms_async
+from .health import api as health
+from .ingest_status import api as ingest_status
+from .metrics import api as metrics
 from ..utils.config import Config
 
 _version = "1.0"
@@ -43,7 +48,12 @@ api = Api(blueprint,
 # Register namespaces
 api.add_namespace(cdms_schema_api)
 api.add_namespace(ingest_parquet_json_s3)
+api.add_namespace(ingest_parquet_json_s3_batch)
 api.add_namespace(replace_parquet_json_s3)
 api.add_namespace(query_data)
 api.add_namespace(query_data_doms)
 api.add_namespace(query_data_doms_custom_pagination)
+api.add_namespace(query_data_doms_async)
+api.add_namespace(health)
+api.add_namespace(ingest_status)
+api.add_namespace(metrics)
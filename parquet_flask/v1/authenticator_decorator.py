@@ -2,19 +2,14 @@ from functools import wraps
 
 from flask import request
 
-from parquet_flask.authenticator.authenticator_abstract import AuthenticatorAbstract
-from parquet_flask.authenticator.authenticator_factory import AuthenticatorFactory
-from parquet_flask.utils.config import Config
+from parquet_flask.authenticator.cached_authenticator import CachedAuthenticator
 
 
 def authenticator_decorator(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        config: Config = Config()
-        authenticator: AuthenticatorAbstract = AuthenticatorFactory().get_instance(config.get_value(config.authentication_type, AuthenticatorFactory.FILE))
         try:
-            authenticator.get_auth_credentials(config.get_value(config.authentication_key, 'None'))
-            auth_result = authenticator.authenticate(request.headers)
+            auth_result = CachedAuthenticator().authenticate(request.headers)
             if auth_result is not None:
                 return {'message': auth_result}, 403
         except Exception as e:
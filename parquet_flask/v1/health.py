@@ -0,0 +1,45 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from flask_restx import Resource, Namespace
+
+from parquet_flask.io_logic.retrieve_spark_session import RetrieveSparkSession
+from parquet_flask.io_logic.spark_warm_up import SparkWarmUp
+
+api = Namespace('health', description="Liveness and readiness probes")
+LOGGER = logging.getLogger(__name__)
+
+
+@api.route('/liveness', methods=["get"], strict_slashes=False)
+class Liveness(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    def get(self):
+        return {'status': 'alive'}, 200
+
+
+@api.route('/readiness', methods=["get"], strict_slashes=False)
+class Readiness(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    def get(self):
+        warm_up = SparkWarmUp()
+        status = warm_up.get_status()
+        status['spark_sessions'] = RetrieveSparkSession().get_session_metrics()
+        return status, 200 if warm_up.is_ready else 503
@@ -16,12 +16,13 @@
 import logging
 import os
 import uuid
-from multiprocessing.context import Process
 
 from parquet_flask.aws.aws_s3 import AwsS3
 from parquet_flask.io_logic.cdms_constants import CDMSConstants
 from parquet_flask.io_logic.ingest_new_file import IngestNewJsonFile
-from parquet_flask.io_logic.metadata_tbl_io import MetadataTblIO
+from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+from parquet_flask.io_logic.metadata_tbl_factory import MetadataTblFactory
+from parquet_flask.utils.config import Config
 from parquet_flask.utils.file_utils import FileUtils
 from parquet_flask.utils.time_utils import TimeUtils
 
@@ -35,6 +36,7 @@ class IngestAwsJsonProps:
         self.__uuid = str(uuid.uuid4())
         self.__working_dir = f'/tmp/{str(uuid.uuid4())}'
         self.__is_replacing = False
+        self.__is_appending = False
         self.__is_sanitizing = True
         self.__wait_till_complete = True
 
@@ -90,6 +92,19 @@ class IngestAwsJsonProps:
         self.__is_replacing = val
         return
 
+    @property
+    def is_appending(self):
+        return self.__is_appending
+
+    @is_appending.setter
+    def is_appending(self, val):
+        """
+        :param val: bool - True to append only new rows to an existing job. is_replacing must be True as well
+        :return: None
+        """
+        self.__is_appending = val
+        return
+
     @property
     def working_dir(self):
         return self.__working_dir
@@ -138,7 +153,63 @@ class IngestAwsJson:
         self.__file_sha512 = None
         self.__sha512_result = None
         self.__sha512_cause = None
-        self.__db_io = MetadataTblIO()
+        self.__s3_etag = None
+        self.__s3_size = None
+        self.__download_throughput = None
+        self.__ingested_partitions = []
+        self.__appended_records = None
+        self.__stage_timings = {}
+        self.__progress_callback = None
+        self.__db_io = MetadataTblFactory().get_instance()
+
+    def __to_job(self):
+        return {
+            'job_id': self.__props.uuid,
+            's3_url': self.__props.s3_url,
+            'working_dir': self.__props.working_dir,
+            'is_replacing': self.__props.is_replacing,
+            'is_appending': self.__props.is_appending,
+            'is_sanitizing': self.__props.is_sanitizing,
+            'saved_file_name': self.__saved_file_name,
+            'file_size': FileUtils.get_size(self.__saved_file_name),
+            'ingested_date': self.__ingested_date,
+            'file_sha512': self.__file_sha512,
+            'sha512_result': self.__sha512_result,
+            'sha512_cause': self.__sha512_cause,
+            's3_etag': self.__s3_etag,
+            's3_size': self.__s3_size,
+            'download_throughput': self.__download_throughput,
+            'stage_timings': self.__stage_timings,
+        }
+
+    @staticmethod
+    def execute_job(job: dict) -> dict:
+        """
+        ingesting a downloaded file queued by `ingest` in an IngestWorkerPool worker process
+
+        :param job: dict - created by `__to_job`
+        :return: dict - {'response': dict, 'code': int, 'partitions': [(provider, project, platform_code)]}
+        """
+        props = IngestAwsJsonProps()
+        props.uuid = job['job_id']
+        props.s3_url = job['s3_url']
+        props.working_dir = job['working_dir']
+        props.is_replacing = job['is_replacing']
+        props.is_appending = job.get('is_appending', False)
+        props.is_sanitizing = job['is_sanitizing']
+        ingest_aws_json = IngestAwsJson(props)
+        ingest_aws_json.__saved_file_name = job['saved_file_name']
+        ingest_aws_json.__ingested_date = job['ingested_date']
+        ingest_aws_json.__file_sha512 = job['file_sha512']
+        ingest_aws_json.__sha512_result = job['sha512_result']
+        ingest_aws_json.__sha512_cause = job['sha512_cause']
+        ingest_aws_json.__s3_etag = job.get('s3_etag', None)
+        ingest_aws_json.__s3_size = job.get('s3_size', None)
+        ingest_aws_json.__download_throughput = job.get('download_throughput', None)
+        ingest_aws_json.__stage_timings = job.get('stage_timings', {})
+        ingest_aws_json.__progress_callback = lambda progress: IngestWorkerPool.update_running_job(job['job_id'], progress)
+        response, code = ingest_aws_json.__execute_ingest_data()
+        return {'response': response, 'code': code, 'partitions': ingest_aws_json.__ingested_partitions}
 
     def __get_s3_sha512(self):
         """
@@ -171,27 +242,62 @@ class IngestAwsJson:
         self.__sha512_cause = f'mismatched sha512: {s3_sha512} vs {self.__file_sha512}'
         return
 
+    @property
+    def saved_file_name(self):
+        return self.__saved_file_name
+
+    @property
+    def file_sha512(self):
+        return self.__file_sha512
+
+    @property
+    def sha512_result(self):
+        return self.__sha512_result
+
+    def create_metadata_record(self, num_records, start_time, end_time, stage_timings: dict) -> dict:
+        return {
+            CDMSConstants.s3_url_key: self.__props.s3_url,
+            CDMSConstants.uuid_key: self.__props.uuid,
+            CDMSConstants.ingested_date_key: self.__ingested_date,
+            CDMSConstants.ingested_day_key: TimeUtils.get_time_str(self.__ingested_date, '%Y-%m-%d'),
+            CDMSConstants.file_size_key: FileUtils.get_size(self.__saved_file_name),
+            CDMSConstants.checksum_key: self.__file_sha512,
+            CDMSConstants.checksum_validation: self.__sha512_result,
+            CDMSConstants.checksum_cause: self.__sha512_cause,
+            CDMSConstants.s3_etag_key: self.__s3_etag,
+            CDMSConstants.s3_size_key: self.__s3_size,
+            CDMSConstants.download_throughput_key: self.__download_throughput,
+            CDMSConstants.job_start_key: start_time,
+            CDMSConstants.job_end_key: end_time,
+            CDMSConstants.records_count_key: num_records,
+            CDMSConstants.stage_timings_key: stage_timings,
+        }
+
+    def __report_progress(self, progress: dict):
+        progress['stage_timings'] = {**self.__stage_timings, **progress['stage_timings']}
+        self.__progress_callback(progress)
+        return
+
     def __execute_ingest_data(self):
         try:
             LOGGER.debug(f'ingesting file: {self.__saved_file_name}')
             start_time = TimeUtils.get_current_time_unix()
-            ingest_new_file = IngestNewJsonFile(self.__props.is_replacing)
+            ingest_new_file = IngestNewJsonFile(self.__props.is_replacing and not self.__props.is_appending)
+            ingest_new_file.is_appending_delta = self.__props.is_appending
             ingest_new_file.sanitize_record = self.__props.is_sanitizing
+            if self.__progress_callback is not None:
+                ingest_new_file.progress_callback = self.__report_progress
             num_records = ingest_new_file.ingest(self.__saved_file_name, self.__props.uuid)
+            self.__ingested_partitions = ingest_new_file.ingested_partitions
+            self.__stage_timings.update(ingest_new_file.stage_timings)
             end_time = TimeUtils.get_current_time_unix()
             LOGGER.debug(f'uploading to metadata table')
-            new_record = {
-                CDMSConstants.s3_url_key: self.__props.s3_url,
-                CDMSConstants.uuid_key: self.__props.uuid,
-                CDMSConstants.ingested_date_key: self.__ingested_date,
-                CDMSConstants.file_size_key: FileUtils.get_size(self.__saved_file_name),
-                CDMSConstants.checksum_key: self.__file_sha512,
-                CDMSConstants.checksum_validation: self.__sha512_result,
-                CDMSConstants.checksum_cause: self.__sha512_cause,
-                CDMSConstants.job_start_key: start_time,
-                CDMSConstants.job_end_key: end_time,
-                CDMSConstants.records_count_key: num_records,
-            }
+            new_record = self.create_metadata_record(num_records, start_time, end_time, self.__stage_timings)
+            if self.__props.is_appending:
+                self.__appended_records = ingest_new_file.appended_records
+                existing_record = self.__db_io.get_by_s3_url(self.__props.s3_url)
+                new_record[CDMSConstants.records_count_key] = existing_record.get(CDMSConstants.records_count_key, 0) + ingest_new_file.appended_records
+                new_record[CDMSConstants.appended_records_count_key] = ingest_new_file.appended_records
             if self.__props.is_replacing:
                 self.__db_io.replace_record(new_record)
             else:
@@ -209,10 +315,56 @@ class IngestAwsJson:
             LOGGER.debug(f'deleting error file')
             FileUtils.del_file(self.__saved_file_name)
             return {'message': 'failed to ingest to parquet', 'details': str(e)}, 500
+        response = {'message': 'ingested', 'job_id': self.__props.uuid}
+        if self.__appended_records is not None:
+            response['appended_records'] = self.__appended_records
         if self.__sha512_result is True:
-            return {'message': 'ingested', 'job_id': self.__props.uuid}, 201
-        return {'message': 'ingested, different sha512', 'cause': self.__sha512_cause,
-                'job_id': self.__props.uuid}, 203
+            return response, 201
+        return {**response, 'message': 'ingested, different sha512', 'cause': self.__sha512_cause}, 203
+
+    def download(self):
+        """
+        - download s3 file
+        - unzip if needed
+        - compare its checksum with the one in S3
+
+        with `s3_download_streaming`, the file is downloaded with concurrent ranged GETs,
+        and the checksum and unzipping are done while downloading.
+
+        :return: str - path of downloaded file
+        """
+        s3 = AwsS3().set_s3_url(self.__props.s3_url)
+        LOGGER.debug(f'downloading s3 file: {self.__props.uuid}')
+        download_start_time = TimeUtils.get_current_time_unix()
+        if self.__s3_etag is None:
+            self.__s3_etag, self.__s3_size = s3.get_s3_obj_etag_size()
+        FileUtils.mk_dir_p(self.__props.working_dir)
+        if Config().get_value(Config.s3_download_streaming, 'false').strip().lower() == 'true':
+            self.__saved_file_name, self.__file_sha512 = s3.download_streaming(self.__props.working_dir)
+        else:
+            self.__saved_file_name = s3.download(self.__props.working_dir)
+            self.__file_sha512 = FileUtils.get_checksum(self.__saved_file_name)
+            if self.__saved_file_name.lower().endswith('.gz'):
+                LOGGER.debug(f's3 file is in gzipped form. unzipping. {self.__saved_file_name}')
+                self.__saved_file_name = FileUtils.gunzip_file_os(self.__saved_file_name)
+        self.__stage_timings['download'] = TimeUtils.get_current_time_unix() - download_start_time
+        self.__download_throughput = int(self.__s3_size / 1024 / max(self.__stage_timings['download'] / 1000, 0.001))  # KiB/s
+        LOGGER.debug(f'downloaded {self.__s3_size} bytes in {self.__stage_timings["download"]} ms. {self.__download_throughput} KiB/s')
+        self.__compare_sha512(self.__get_s3_sha512())
+        return self.__saved_file_name
+
+    def __is_s3_obj_unchanged(self, existing_record: dict):
+        """
+        comparing ETag & size of the S3 object with the ones stored when it was ingested.
+        records ingested before they were stored are treated as changed.
+
+        :param existing_record: dict - metadata record
+        :return: bool
+        """
+        if existing_record.get(CDMSConstants.s3_etag_key, None) is None:
+            return False
+        self.__s3_etag, self.__s3_size = AwsS3().set_s3_url(self.__props.s3_url).get_s3_obj_etag_size()
+        return existing_record[CDMSConstants.s3_etag_key] == self.__s3_etag and existing_record.get(CDMSConstants.s3_size_key, None) == self.__s3_size
 
     def ingest(self):
         """
@@ -236,21 +388,24 @@ class IngestAwsJson:
                 LOGGER.error(f'unable to ingest file as it is already ingested. {self.__props.s3_url}. ingested record: {existing_record}')
                 return {'message': 'unable to ingest file as it is already ingested'}, 500
 
-            s3 = AwsS3().set_s3_url(self.__props.s3_url)
-            LOGGER.debug(f'downloading s3 file: {self.__props.uuid}')
-            FileUtils.mk_dir_p(self.__props.working_dir)
-            self.__saved_file_name = s3.download(self.__props.working_dir)
-            self.__file_sha512 = FileUtils.get_checksum(self.__saved_file_name)
-            if self.__saved_file_name.lower().endswith('.gz'):
-                LOGGER.debug(f's3 file is in gzipped form. unzipping. {self.__saved_file_name}')
-                self.__saved_file_name = FileUtils.gunzip_file_os(self.__saved_file_name)
-            self.__compare_sha512(self.__get_s3_sha512())
+            if existing_record is not None and existing_record.get(CDMSConstants.batch_size_key, 1) > 1:
+                LOGGER.error(f'unable to replace file as it is ingested in a batch. {self.__props.s3_url}. ingested record: {existing_record}')
+                return {'message': 'unable to replace file as it is ingested in a batch. replace the whole batch with ingest_json_s3_batch',
+                        'job_id': existing_record[CDMSConstants.uuid_key]}, 500
+
+            if existing_record is not None and self.__is_s3_obj_unchanged(existing_record):
+                LOGGER.info(f'skip replacing as S3 ETag & size are unchanged. {self.__props.s3_url}')
+                return {'message': 'unchanged since it was ingested. skipped', 'job_id': existing_record[CDMSConstants.uuid_key]}, 200
+
+            self.download()
+            if existing_record is not None and existing_record.get(CDMSConstants.checksum_key, None) == self.__file_sha512:
+                LOGGER.info(f'skip replacing as sha512 is unchanged. {self.__props.s3_url}')
+                FileUtils.del_file(self.__saved_file_name)
+                return {'message': 'unchanged since it was ingested. skipped', 'job_id': existing_record[CDMSConstants.uuid_key]}, 200
             if self.__props.wait_till_complete is True:
                 return self.__execute_ingest_data()
             else:
-                bg_process = Process(target=self.__execute_ingest_data, args=())
-                bg_process.daemon = True
-                bg_process.start()
+                IngestWorkerPool().submit(self.__to_job())
                 return {'message': 'ingesting. Not waiting.', 'job_id': self.__props.uuid}, 204
         except Exception as e:
             LOGGER.debug(f'deleting error file')
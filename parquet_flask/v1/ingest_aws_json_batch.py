@@ -0,0 +1,379 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from parquet_flask.aws.aws_s3 import AwsS3
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.io_logic.ingest_new_file import IngestNewJsonFile
+from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+from parquet_flask.io_logic.metadata_tbl_factory import MetadataTblFactory
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.time_utils import TimeUtils
+from parquet_flask.v1.ingest_aws_json import IngestAwsJsonProps, IngestAwsJson
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IngestAwsJsonBatchProps:
+    def __init__(self):
+        self.__s3_urls = []
+        self.__uuid = str(uuid.uuid4())
+        self.__working_dir = f'/tmp/{str(uuid.uuid4())}'
+        self.__is_replacing = False
+        self.__is_sanitizing = True
+        self.__wait_till_complete = True
+        self.__total_size = 0
+
+    @property
+    def s3_urls(self):
+        return self.__s3_urls
+
+    @s3_urls.setter
+    def s3_urls(self, val):
+        """
+        :param val: list
+        :return: None
+        """
+        self.__s3_urls = val
+        return
+
+    @property
+    def uuid(self):
+        return self.__uuid
+
+    @uuid.setter
+    def uuid(self, val):
+        """
+        :param val:
+        :return: None
+        """
+        self.__uuid = val
+        return
+
+    @property
+    def working_dir(self):
+        return self.__working_dir
+
+    @working_dir.setter
+    def working_dir(self, val):
+        """
+        :param val:
+        :return: None
+        """
+        self.__working_dir = val
+        return
+
+    @property
+    def is_replacing(self):
+        return self.__is_replacing
+
+    @is_replacing.setter
+    def is_replacing(self, val):
+        """
+        :param val:
+        :return: None
+        """
+        self.__is_replacing = val
+        return
+
+    @property
+    def is_sanitizing(self):
+        return self.__is_sanitizing
+
+    @is_sanitizing.setter
+    def is_sanitizing(self, val):
+        """
+        :param val:
+        :return: None
+        """
+        self.__is_sanitizing = val
+        return
+
+    @property
+    def wait_till_complete(self):
+        return self.__wait_till_complete
+
+    @wait_till_complete.setter
+    def wait_till_complete(self, val):
+        """
+        :param val:
+        :return: None
+        """
+        self.__wait_till_complete = val
+        return
+
+    @property
+    def total_size(self):
+        return self.__total_size
+
+    @total_size.setter
+    def total_size(self, val):
+        """
+        :param val: int - total size of S3 files in bytes if it is known. used to estimate memory of async jobs. HEAD requests are used if it is 0
+        :return: None
+        """
+        self.__total_size = val
+        return
+
+
+class IngestAwsJsonBatch:
+    """
+    Ingesting many S3 files in 1 spark write.
+
+    Files are downloaded and parsed concurrently, and written with the same job_id so that
+    files in the same partition end up in the same parquet file. There is still 1 metadata record per S3 file.
+    Since they share the job_id, they can only be replaced together.
+
+    Rows of different files cannot be told apart once they are written. If any metadata record of a new batch fails,
+    the whole batch is rolled back (parquet rows of the job_id and the written metadata records) so that it can be retried.
+    A replaced batch cannot be rolled back. Files whose records fail keep their old records, and replacing them again overwrites the same job_id.
+    """
+    JOB_TYPE = 'batch'
+
+    def __init__(self, props=IngestAwsJsonBatchProps()):
+        self.__props = props
+        self.__workers = int(Config().get_value(Config.ingest_batch_download_workers, '8'))
+        self.__db_io = MetadataTblFactory().get_instance()
+        self.__ingested_partitions = []
+        self.__stage_timings = {}
+        self.__progress_callback = None
+
+    def __to_job(self):
+        return {
+            'job_type': self.JOB_TYPE,
+            'job_id': self.__props.uuid,
+            's3_urls': self.__props.s3_urls,
+            'working_dir': self.__props.working_dir,
+            'is_replacing': self.__props.is_replacing,
+            'is_sanitizing': self.__props.is_sanitizing,
+            'file_size': self.__props.total_size,
+        }
+
+    @staticmethod
+    def execute_job(job: dict) -> dict:
+        """
+        ingesting a batch queued by `ingest` in an IngestWorkerPool worker process
+
+        :param job: dict - created by `__to_job`
+        :return: dict - {'response': dict, 'code': int, 'partitions': [(provider, project, platform_code)]}
+        """
+        props = IngestAwsJsonBatchProps()
+        props.uuid = job['job_id']
+        props.s3_urls = job['s3_urls']
+        props.working_dir = job['working_dir']
+        props.is_replacing = job['is_replacing']
+        props.is_sanitizing = job['is_sanitizing']
+        ingest_batch = IngestAwsJsonBatch(props)
+        ingest_batch.__progress_callback = lambda progress: IngestWorkerPool.update_running_job(job['job_id'], progress)
+        response, code = ingest_batch.__execute_ingest_data()
+        return {'response': response, 'code': code, 'partitions': ingest_batch.__ingested_partitions}
+
+    def __report_progress(self, records_total, stage):
+        if self.__progress_callback is None:
+            return
+        self.__progress_callback({
+            'records_total': records_total,
+            'stage': stage,
+            'stage_timings': dict(self.__stage_timings),
+        })
+        return
+
+    def __download(self, index, s3_url):
+        props = IngestAwsJsonProps()
+        props.s3_url = s3_url
+        props.uuid = self.__props.uuid
+        props.working_dir = os.path.join(self.__props.working_dir, str(index))  # different prefixes may have the same file name
+        ingest_aws_json = IngestAwsJson(props)
+        ingest_aws_json.download()
+        return ingest_aws_json
+
+    def __run_concurrently(self, func, inputs: dict):
+        """
+        :param func: callable
+        :param inputs: dict - {s3_url: tuple of func arguments}
+        :return: tuple - ({s3_url: result}, [{'s3_url': str, 'details': str}])
+        """
+        succeeded, failed = {}, []
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = {k: executor.submit(func, *v) for k, v in inputs.items()}
+            for s3_url, each_future in futures.items():
+                try:
+                    succeeded[s3_url] = each_future.result()
+                except Exception as e:
+                    LOGGER.exception(f'failed to process: {s3_url}')
+                    failed.append({'s3_url': s3_url, 'details': str(e)})
+        return succeeded, failed
+
+    @staticmethod
+    def __get_s3_size(s3_url):
+        return AwsS3().set_s3_url(s3_url).get_s3_obj_etag_size()[1]
+
+    def __get_total_size(self):
+        """
+        HEAD requests for the sizes of s3 files which are not listed with their sizes.
+        files which cannot be found are counted as 0 bytes. their download fails in the job.
+
+        :return: int - total size in bytes
+        """
+        sizes, failed = self.__run_concurrently(self.__get_s3_size, {k: (k,) for k in self.__props.s3_urls})
+        if len(failed) > 0:
+            LOGGER.warning(f'unable to get sizes of {len(failed)} s3 files. {failed}')
+        return sum(sizes.values())
+
+    def __execute_ingest_data(self):
+        start_time = TimeUtils.get_current_time_unix()
+        ingest_new_file = IngestNewJsonFile(self.__props.is_replacing)
+        ingest_new_file.sanitize_record = self.__props.is_sanitizing
+        downloaded, download_failed = self.__run_concurrently(self.__download, {k: (i, k) for i, k in enumerate(self.__props.s3_urls)})
+        validate_start_time = TimeUtils.get_current_time_unix()
+        self.__stage_timings['download'] = validate_start_time - start_time
+        input_jsons, parse_failed = self.__run_concurrently(lambda ingest_aws_json: ingest_new_file.read_json(ingest_aws_json.saved_file_name),
+                                                            {k: (v,) for k, v in downloaded.items()})
+        failed = download_failed + parse_failed
+        parsed = [(downloaded[k], v) for k, v in input_jsons.items()]  # (IngestAwsJson, input_json)
+        if self.__props.is_replacing and len(failed) > 0:
+            self.__delete_files(downloaded)
+            return {'message': 'failed to replace batch. all files are needed to replace a batch', 'job_id': self.__props.uuid, 'failed': failed}, 500
+        if len(parsed) < 1:
+            self.__delete_files(downloaded)
+            return {'message': 'failed to ingest to parquet', 'job_id': self.__props.uuid, 'failed': failed}, 500
+        if self.__props.is_replacing and self.__is_unchanged(downloaded):
+            LOGGER.info(f'skip replacing batch as sha512 of all files are unchanged. {self.__props.uuid}')
+            self.__delete_files(downloaded)
+            return {'message': 'unchanged since it was ingested. skipped', 'job_id': self.__props.uuid}, 200
+        write_start_time = TimeUtils.get_current_time_unix()
+        self.__stage_timings['validate'] = write_start_time - validate_start_time
+        records_total = sum([len(k[1][CDMSConstants.observations_key]) for k in parsed])
+        self.__report_progress(records_total, 'write')
+        metadata_failed = []
+        try:
+            ingest_new_file.write_json_objects([k[1] for k in parsed], self.__props.uuid)
+            self.__ingested_partitions = ingest_new_file.ingested_partitions
+            end_time = TimeUtils.get_current_time_unix()
+            self.__stage_timings['write'] = end_time - write_start_time
+            self.__report_progress(records_total, 'metadata')
+            LOGGER.debug(f'uploading {len(parsed)} records to metadata table')
+            new_records = []
+            for ingest_aws_json, input_json in parsed:
+                new_record = ingest_aws_json.create_metadata_record(len(input_json[CDMSConstants.observations_key]), start_time, end_time, self.__stage_timings)
+                new_record[CDMSConstants.batch_size_key] = len(parsed)
+                new_records.append(new_record)
+            metadata_failed = self.__db_io.write_records(new_records, self.__props.is_replacing)
+            if len(metadata_failed) > 0:
+                LOGGER.error(f'failed to write {len(metadata_failed)} metadata records for batch: {self.__props.uuid}. {metadata_failed}')
+                if not self.__props.is_replacing:
+                    self.__roll_back(ingest_new_file, new_records, metadata_failed)
+                    return {'message': 'failed to write metadata. batch is rolled back', 'job_id': self.__props.uuid, 'failed': failed + metadata_failed}, 500
+                failed.extend(metadata_failed)
+        except Exception as e:
+            LOGGER.exception(f'failed to ingest batch: {self.__props.uuid}')
+            return {'message': 'failed to ingest to parquet', 'job_id': self.__props.uuid, 'details': str(e)}, 500
+        finally:
+            self.__delete_files(downloaded)
+        response = {
+            'message': 'ingested',
+            'job_id': self.__props.uuid,
+            'ingested': len(parsed) - len(metadata_failed),
+            'records_count': records_total,
+            'different_sha512': [k for k in input_jsons.keys() if downloaded[k].sha512_result is not True],
+            'failed': failed,
+        }
+        return response, 201 if len(failed) < 1 else 207
+
+    def __roll_back(self, ingest_new_file: IngestNewJsonFile, new_records: list, metadata_failed: list):
+        """
+        deleting parquet rows of the batch and its written metadata records
+
+        :param ingest_new_file: IngestNewJsonFile - which wrote the batch
+        :param new_records: list - metadata records of the batch
+        :param metadata_failed: list - [{'s3_url': str, 'details': str}] which are not written
+        :return: None
+        """
+        LOGGER.warning(f'rolling back batch: {self.__props.uuid}')
+        ingest_new_file.delete_job_rows(self.__props.uuid)
+        failed_s3_urls = set([k[CDMSConstants.s3_url_key] for k in metadata_failed])
+        self.__db_io.delete_records([k[CDMSConstants.s3_url_key] for k in new_records if k[CDMSConstants.s3_url_key] not in failed_s3_urls])
+        return
+
+    def __is_unchanged(self, downloaded: dict):
+        """
+        :param downloaded: dict - {s3_url: IngestAwsJson}
+        :return: bool - True if sha512 of all files are the same as the ones in metadata tbl
+        """
+        existing_records = self.__db_io.get_by_s3_urls(list(downloaded.keys()))
+        return all([existing_records.get(k, {}).get(CDMSConstants.checksum_key, None) == v.file_sha512 for k, v in downloaded.items()])
+
+    def __delete_files(self, downloaded: dict):
+        for ingest_aws_json in downloaded.values():
+            if ingest_aws_json.saved_file_name is not None:
+                FileUtils.del_file(ingest_aws_json.saved_file_name)
+        return
+
+    def __validate_existing_records(self):
+        """
+        new files which are already ingested are skipped.
+        a batch can be replaced only if all of its files are replaced together.
+
+        :return: tuple - (list of skipped s3 urls, error message or None)
+        """
+        found_records = self.__db_io.get_by_s3_urls(self.__props.s3_urls)
+        existing_records = {k: found_records.get(k, None) for k in self.__props.s3_urls}
+        if self.__props.is_replacing is False:
+            skipped = [k for k, v in existing_records.items() if v is not None]
+            self.__props.s3_urls = [k for k, v in existing_records.items() if v is None]
+            return skipped, None
+        for s3_url, existing_record in existing_records.items():
+            if existing_record is None:
+                return [], f'unable to replace file as it is new. {s3_url}'
+            if existing_record[CDMSConstants.uuid_key] != self.__props.uuid:
+                return [], f'file is not ingested in job_id: {self.__props.uuid}. {s3_url}'
+            if existing_record.get(CDMSConstants.batch_size_key, 1) != len(self.__props.s3_urls):
+                return [], f'all {existing_record.get(CDMSConstants.batch_size_key, 1)} files in the batch need to be replaced together'
+        return [], None
+
+    def ingest(self):
+        """
+        - skip files which are already ingested
+        - download & parse s3 files concurrently
+        - ingest all of them to parquet in 1 write
+        - update to metadata tbl. 1 record per s3 file
+        - delete local files
+
+        :return: tuple - (json object, return code)
+        """
+        try:
+            self.__props.s3_urls = list(dict.fromkeys(self.__props.s3_urls))  # removing duplicates while keeping the order
+            skipped, error_message = self.__validate_existing_records()
+            if error_message is not None:
+                LOGGER.error(error_message)
+                return {'message': error_message}, 500
+            if len(self.__props.s3_urls) < 1:
+                return {'message': 'all files are already ingested', 'skipped': skipped}, 200
+            if self.__props.wait_till_complete is not True:
+                if self.__props.total_size < 1:
+                    self.__props.total_size = self.__get_total_size()  # for memory-aware admission of the worker pool
+                IngestWorkerPool().submit(self.__to_job())
+                return {'message': 'ingesting. Not waiting.', 'job_id': self.__props.uuid, 'skipped': skipped}, 202
+            response, code = self.__execute_ingest_data()
+            response['skipped'] = skipped
+            return response, code
+        except Exception as e:
+            LOGGER.exception(f'failed to ingest batch')
+            return {'message': 'failed to ingest to parquet', 'details': str(e)}, 500
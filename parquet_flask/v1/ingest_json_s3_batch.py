@@ -0,0 +1,98 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from flask_restx import Resource, Namespace, fields
+from flask import request
+
+from parquet_flask.aws.aws_s3 import AwsS3
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.general_utils import GeneralUtils
+from parquet_flask.v1.authenticator_decorator import authenticator_decorator
+from parquet_flask.v1.ingest_aws_json_batch import IngestAwsJsonBatchProps, IngestAwsJsonBatch
+
+api = Namespace('ingest_json_s3_batch', description="Ingesting many JSON files in 1 spark write")
+LOGGER = logging.getLogger(__name__)
+
+query_model = api.model('ingest_json_s3_batch', {
+    's3_urls': fields.List(fields.String, required=False, example=['s3://<bucket>/<key1>', 's3://<bucket>/<key2>']),
+    's3_prefix': fields.String(required=False, example='s3://<bucket>/<prefix>'),
+    'job_id': fields.String(required=False, example='sample-uuid', description='job_id of a batch to replace all of its files'),
+    'sanitize_record': fields.Boolean(required=False, example='True', default=True),
+    'wait_till_finish': fields.Boolean(required=False, example='True', default=True),
+})
+
+_QUERY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        's3_urls': {'type': 'array', 'items': {'type': 'string'}, 'minItems': 1},
+        's3_prefix': {'type': 'string'},
+        'job_id': {'type': 'string'},
+        'sanitize_record': {'type': 'boolean'},
+        'wait_till_finish': {'type': 'boolean'},
+    },
+    'oneOf': [
+        {'required': ['s3_urls']},
+        {'required': ['s3_prefix']},
+    ],
+}
+
+
+@api.route('', methods=["put"])
+class IngestParquetBatch(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    @staticmethod
+    def __list_s3_files(s3_prefix):
+        s3 = AwsS3()
+        bucket, key_prefix = s3.split_s3_url(s3_prefix)
+        s3_files = [(f's3://{bucket}/{key}', size) for key, size in s3.get_child_s3_files(bucket, key_prefix, lambda x: x['Key'].endswith('.json') or x['Key'].endswith('.json.gz'))]
+        return [k[0] for k in s3_files], sum([k[1] for k in s3_files])
+
+    @api.expect(fields=query_model)
+    @authenticator_decorator
+    def put(self):
+        """
+        s3_urls: list of files, or s3_prefix: all .json and .json.gz files under it.
+        job_id: to replace a batch. all files of the batch are needed.
+
+        :return:
+        """
+        payload = request.get_json()
+        is_valid, json_error = GeneralUtils.is_json_valid(payload, _QUERY_SCHEMA)
+        if not is_valid:
+            return {'message': 'invalid request body', 'details': str(json_error)}, 400
+        props = IngestAwsJsonBatchProps()
+        try:
+            if 's3_prefix' in payload:
+                props.s3_urls, props.total_size = self.__list_s3_files(payload['s3_prefix'])
+            else:
+                props.s3_urls = payload['s3_urls']
+        except Exception as e:
+            LOGGER.exception(f'failed to list s3 files')
+            return {'message': 'failed to list s3 files', 'details': str(e)}, 500
+        max_files = int(Config().get_value(Config.ingest_batch_max_files, '500'))
+        if len(props.s3_urls) < 1:
+            return {'message': 'no s3 files to ingest'}, 400
+        if len(props.s3_urls) > max_files:
+            return {'message': f'too many files in 1 batch: {len(props.s3_urls)}. max: {max_files}'}, 400
+        if 'job_id' in payload:
+            props.uuid = payload['job_id']
+            props.is_replacing = True
+        props.is_sanitizing = payload['sanitize_record'] if 'sanitize_record' in payload else True
+        props.wait_till_complete = payload['wait_till_finish'] if 'wait_till_finish' in payload else True
+        return IngestAwsJsonBatch(props).ingest()
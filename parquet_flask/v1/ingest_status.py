@@ -0,0 +1,56 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from time import time
+
+import gevent
+from flask_restx import Resource, Namespace
+from flask import request
+
+from parquet_flask.io_logic.ingest_job_status import IngestJobStatus
+from parquet_flask.utils.config import Config
+from parquet_flask.utils.general_utils import GeneralUtils
+from parquet_flask.v1.authenticator_decorator import authenticator_decorator
+
+api = Namespace('ingest_status', description="Status of ingest jobs")
+LOGGER = logging.getLogger(__name__)
+
+
+@api.route('/<job_id>', methods=["get"])
+class IngestStatus(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    @api.param('wait', 'seconds to wait for the job to finish before returning. Default: 0', type=float)
+    @authenticator_decorator
+    def get(self, job_id):
+        max_wait = float(Config().get_value(Config.ingest_status_max_wait_seconds, '30'))
+        wait = request.args.get('wait', '0')
+        if not GeneralUtils.is_float(wait, accept_nan=False) or float(wait) < 0:
+            return {'message': 'invalid wait', 'details': f'wait must be a non-negative number. {wait}'}, 400
+        deadline = time() + min(float(wait), max_wait)
+        try:
+            ingest_job_status = IngestJobStatus()
+            status = ingest_job_status.get_status(job_id)
+            while status is not None and status['status'] not in IngestJobStatus.FINAL_STATES and time() < deadline:
+                gevent.sleep(1)  # letting other requests run while waiting. queued & running status is read from local files
+                status = ingest_job_status.get_status(job_id)
+        except Exception as e:
+            LOGGER.exception(f'failed to retrieve ingest status for job_id: {job_id}')
+            return {'message': 'failed to retrieve ingest status', 'details': str(e)}, 500
+        if status is None:
+            return {'message': f'ingest job not found: {job_id}'}, 404
+        return status, 200
@@ -17,11 +17,14 @@ import logging
 from copy import deepcopy
 
 from flask_restx import Resource, Namespace, fields
-from flask import request
+from flask import g, request
 
+from parquet_flask.io_logic.query_admission_control import QueryAdmissionControl
 from parquet_flask.io_logic.query_v2 import QueryProps, QUERY_PROPS_SCHEMA
 from parquet_flask.io_logic.query_v4 import QueryV4
+from parquet_flask.utils.client_connection import ClientConnection
 from parquet_flask.utils.general_utils import GeneralUtils
+from parquet_flask.v1.query_timing_decorator import query_timing_decorator
 
 api = Namespace('query_data_doms', description="Querying data")
 LOGGER = logging.getLogger(__name__)
@@ -39,6 +42,7 @@ query_model = api.model('query_data_doms', {
     'columns': fields.String(required=False, example='latitudes, longitudes'),
     'variable': fields.String(required=False, example='air_pressure, relative_humidity'),
     'bbox': fields.String(required=True, example='-45, 175, -30, 180'),  # west, south, east, north
+    'timeout': fields.Float(required=False, example=30, description='seconds to wait for the result before giving up'),
 })
 
 
@@ -92,8 +96,20 @@ class IngestParquet(Resource):
         if not is_valid:
             return {'message': 'invalid request body', 'details': str(json_error)}, 400
         try:
-            query = QueryV4(QueryProps().from_json(payload))
-            result_set = query.search()
+            admission_control = QueryAdmissionControl()
+            with g.query_timing.phase('admission'):
+                is_admitted = admission_control.acquire()
+            if not is_admitted:
+                return {'message': 'too many concurrent queries. try again later'}, 429, {'Retry-After': '10'}
+            client_connection = ClientConnection(request.environ)
+            try:
+                query = QueryV4(QueryProps().from_json(payload))
+                query.disconnect_check = client_connection.is_disconnected
+                query.timing = g.query_timing
+                result_set = admission_control.execute(query.search)
+            finally:
+                client_connection.close()
+                admission_control.release()
             LOGGER.debug(f'search params: {payload}b')
             page_info = self.__calculate_4_ranges(result_set['total'])
             result_set['last'] = f'{request.base_url}?{self.__replace_start_from(page_info["last"])}'
@@ -101,11 +117,18 @@ class IngestParquet(Resource):
             result_set['next'] = f'{request.base_url}?{self.__replace_start_from(page_info["next"])}'
             result_set['prev'] = f'{request.base_url}?{self.__replace_start_from(page_info["prev"])}'
             return result_set, 200
+        except TimeoutError as e:
+            LOGGER.warning(f'query is cancelled. cause: {str(e)}')
+            return {'message': 'query timed out', 'details': str(e)}, 504
+        except ConnectionAbortedError as e:
+            LOGGER.warning(f'query is cancelled. cause: {str(e)}')
+            return {'message': 'query is cancelled', 'details': str(e)}, 499
         except Exception as e:
             LOGGER.exception(f'failed to query parquet. cause: {str(e)}')
             return {'message': 'failed to query parquet', 'details': str(e)}, 500
 
     @api.expect()
+    @query_timing_decorator('query_data_doms')
     def get(self):
         self.__start_from = int(request.args.get('startIndex', '0'))
         self.__size = int(request.args.get('itemsPerPage', '10'))
@@ -135,4 +158,6 @@ class IngestParquet(Resource):
             query_json['columns'] = [k.strip() for k in request.args.get('columns').split(',')]
         if 'variable' in request.args and request.args.get('variable').strip() != '':
             query_json['variable'] = [k.strip() for k in request.args.get('variable').split(',')]
+        if 'timeout' in request.args:
+            query_json['timeout'] = float(request.args.get('timeout'))
         return self.__execute_query(query_json)
@@ -0,0 +1,128 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+from flask_restx import Resource, Namespace, fields
+from flask import request, send_from_directory
+
+from parquet_flask.io_logic.async_query_job import AsyncQueryJob
+from parquet_flask.io_logic.query_v2 import QUERY_PROPS_SCHEMA
+from parquet_flask.utils.general_utils import GeneralUtils
+
+api = Namespace('query_data_doms_async', description="Querying large result sets in the background")
+LOGGER = logging.getLogger(__name__)
+
+query_model = api.model('query_data_doms_async', {
+    'minDepth': fields.Float(required=True, example=-65.34),
+    'maxDepth': fields.Float(required=True, example=-65.34),
+    'startTime': fields.String(required=True, example='2020-01-01T00:00:00Z'),
+    'endTime': fields.String(required=True, example='2020-01-31T00:00:00Z'),
+    'platform': fields.String(required=True, example='30,3B'),
+    'provider': fields.Integer(required=True, example=0),
+    'project': fields.Integer(required=True, example=0),
+    'columns': fields.String(required=False, example='latitudes, longitudes'),
+    'variable': fields.String(required=False, example='air_pressure, relative_humidity'),
+    'bbox': fields.String(required=True, example='-45, 175, -30, 180'),  # west, south, east, north
+    'format': fields.String(required=False, example='parquet', description='parquet or ndjson'),
+})
+
+
+@api.route('', methods=["get"], strict_slashes=False)
+@api.route('/', methods=["get"], strict_slashes=False)
+class SubmitAsyncQuery(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    @api.expect()
+    def get(self):
+        query_json = {
+            'start_from': 0,
+            'size': 0,
+        }
+        if 'startTime' in request.args:
+            query_json['min_time'] = request.args.get('startTime')
+        if 'endTime' in request.args:
+            query_json['max_time'] = request.args.get('endTime')
+
+        if 'minDepth' in request.args:
+            query_json['min_depth'] = float(request.args.get('minDepth'))
+        if 'maxDepth' in request.args:
+            query_json['max_depth'] = float(request.args.get('maxDepth'))
+
+        if 'bbox' in request.args:
+            bounding_box = GeneralUtils.gen_float_list_from_comma_sep_str(request.args.get('bbox'), 4)
+            query_json['min_lat_lon'] = [bounding_box[1], bounding_box[0]]
+            query_json['max_lat_lon'] = [bounding_box[3], bounding_box[2]]
+        if 'platform' in request.args:
+            query_json['platform_code'] = [k.strip() for k in request.args.get('platform').strip().split(',')]
+            query_json['platform_code'].sort()
+        if 'provider' in request.args:
+            query_json['provider'] = request.args.get('provider')
+        if 'project' in request.args:
+            query_json['project'] = request.args.get('project')
+        if 'columns' in request.args and request.args.get('columns').strip() != '':
+            query_json['columns'] = [k.strip() for k in request.args.get('columns').split(',')]
+        if 'variable' in request.args and request.args.get('variable').strip() != '':
+            query_json['variable'] = [k.strip() for k in request.args.get('variable').split(',')]
+        is_valid, json_error = GeneralUtils.is_json_valid(query_json, QUERY_PROPS_SCHEMA)
+        if not is_valid:
+            return {'message': 'invalid request body', 'details': str(json_error)}, 400
+        try:
+            job_id = AsyncQueryJob().submit(query_json, request.args.get('format', 'parquet'))
+        except ValueError as e:
+            return {'message': 'invalid request', 'details': str(e)}, 400
+        except Exception as e:
+            LOGGER.exception(f'failed to submit async query. cause: {str(e)}')
+            return {'message': 'failed to submit async query', 'details': str(e)}, 500
+        return {'message': 'query submitted', 'job_id': job_id, 'status': f'{request.base_url.rstrip("/")}/{job_id}'}, 202
+
+
+@api.route('/<string:job_id>', methods=["get"])
+class AsyncQueryStatus(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    @api.expect()
+    def get(self, job_id):
+        async_query_job = AsyncQueryJob()
+        job_status = async_query_job.get_status(job_id)
+        if job_status is None:
+            return {'message': f'unknown job_id: {job_id}'}, 404
+        if job_status['status'] != AsyncQueryJob.DONE:
+            return job_status, 200
+        try:
+            job_status['files'] = [{'name': file_name, 'url': f'{request.base_url}/files/{file_name}' if presigned_url is None else presigned_url}
+                                   for file_name, presigned_url in async_query_job.get_result_files(job_id)]
+        except Exception as e:
+            LOGGER.exception(f'failed to list result files for {job_id}. cause: {str(e)}')
+            return {'message': 'failed to list result files', 'details': str(e)}, 500
+        return job_status, 200
+
+
+@api.route('/<string:job_id>/files/<string:file_name>', methods=["get"])
+class AsyncQueryResultFile(Resource):
+    def __init__(self, api=None, *args, **kwargs):
+        super().__init__(api, args, kwargs)
+
+    @api.expect()
+    def get(self, job_id, file_name):
+        async_query_job = AsyncQueryJob()
+        job_status = async_query_job.get_status(job_id)
+        if job_status is None or job_status['status'] != AsyncQueryJob.DONE:
+            return {'message': f'no result for job_id: {job_id}'}, 404
+        if async_query_job.is_s3_spool:
+            return {'message': 'result files are stored in S3. use the urls from the job status'}, 400
+        return send_from_directory(async_query_job.get_output_path(job_id), file_name, as_attachment=True)
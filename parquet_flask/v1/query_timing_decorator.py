@@ -0,0 +1,51 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from functools import wraps
+
+from flask import g, request
+
+from parquet_flask.io_logic.query_metrics import QueryMetrics
+from parquet_flask.io_logic.query_timing import QueryTiming
+
+
+def query_timing_decorator(endpoint: str):
+    """
+    Timing the whole request with `g.query_timing` which the endpoint passes to QueryV4.
+
+    - `Server-Timing` header is added to every response.
+    - `_timings` is added to the response body when `timings=true` is in the query string.
+    - timings are recorded in QueryMetrics.
+
+    :param endpoint: str - endpoint label in the metrics
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            timing = QueryTiming()
+            g.query_timing = timing
+            result = f(*args, **kwargs)
+            result = result if isinstance(result, tuple) else (result,)
+            body = result[0]
+            status_code = result[1] if len(result) > 1 else 200
+            headers = result[2] if len(result) > 2 else {}
+            timing.finish()
+            QueryMetrics().observe(endpoint, status_code, timing)
+            headers = {**headers, 'Server-Timing': timing.to_server_timing()}
+            if request.args.get('timings', 'false').strip().lower() == 'true' and isinstance(body, dict):
+                body = {**body, '_timings': timing.to_dict()}  # body may be the cached page. not modifying it
+            return body, status_code, headers
+        return decorated_function
+    return decorator
@@ -29,6 +29,7 @@ query_model = api.model('replace_json_s3', {
     's3_url': fields.String(required=True, example='s3://<bucket>/<key>'),
     'job_id': fields.String(required=True, example='sample-uuid'),
     'sanitize_record': fields.Boolean(required=False, example='True', default=True),
+    'append_delta': fields.Boolean(required=False, example='False', default=False),
     'wait_till_finish': fields.Boolean(required=False, example='True', default=True),
 })
 
@@ -38,6 +39,7 @@ _QUERY_SCHEMA = {
         's3_url': {'type': 'string'},
         'job_id': {'type': 'string'},
         'sanitize_record': {'type': 'boolean'},
+        'append_delta': {'type': 'boolean'},
         'wait_till_finish': {'type': 'boolean'},
     },
     'required': ['s3_url', 'job_id'],
@@ -55,6 +57,10 @@ class IngestParquet(Resource):
         """
         s3://ecsv-h5-data-v1/INDEX/GALILEO/filenames.txt.gz
 
+        append_delta: append only new rows of a growing file instead of rewriting it.
+        a row is skipped only if it is an exact copy of a written row: same platform code, time, latitude, longitude, depth,
+        and the same hash of all data columns. columns which are new in the file count as null in the written rows.
+
         :return:
         """
         payload = request.get_json()
@@ -65,6 +71,7 @@ class IngestParquet(Resource):
         props.s3_url = payload['s3_url']
         props.uuid = payload['job_id']
         props.is_replacing = True
+        props.is_appending = payload['append_delta'] if 'append_delta' in payload else False
         props.is_sanitizing = payload['sanitize_record'] if 'sanitize_record' in payload else True
         props.wait_till_complete = payload['wait_till_finish'] if 'wait_till_finish' in payload else True
         return IngestAwsJson(props).ingest()
@@ -38,6 +38,7 @@ install_requires = [
     'fastjsonschema===2.15.1',
     'requests===2.26.0',
     'boto3', 'botocore',
+    'prometheus_client',  # query metrics endpoint
 ]
 
 setup(
@@ -50,4 +51,5 @@ setup(
     python_requires="==3.7",
     license='NONE',
     include_package_data=True,
+    package_data={'parquet_flask.io_logic': ['*.xml']},  # spark.scheduler.allocation.file
 )
@@ -7,10 +7,39 @@ resource "aws_dynamodb_table" "cdms-parquet-metadata-tbl" {
 //  range_key      = "NA"
 
   attribute {
-    name = "UserId"
+    name = "s3_url"
     type = "S"
   }
 
+  attribute {
+    name = "uuid"
+    type = "S"
+  }
+
+  attribute {
+    name = "ingested_day"
+    type = "S"
+  }
+
+  attribute {
+    name = "ingested_date"
+    type = "N"
+  }
+
+  global_secondary_index {
+    name               = "uuid-index"
+    hash_key           = "uuid"
+    projection_type    = "ALL"
+  }
+
+  // ingested_day: yyyy-mm-dd of ingested_date in UTC. range queries by date query 1 partition per day
+  global_secondary_index {
+    name               = "ingested_day-index"
+    hash_key           = "ingested_day"
+    range_key          = "ingested_date"
+    projection_type    = "ALL"
+  }
+
 //  attribute {
 //    name = "NA"
 //    type = "S"
@@ -0,0 +1,164 @@
+import argparse
+import json
+import logging
+import math
+import os
+import tempfile
+import uuid
+
+from tests.bench_mark.func_exec_time_decorator import func_exec_time_decorator
+from tests.bench_mark.synthetic_in_situ import SyntheticInSitu
+
+os.environ.setdefault('master_spark_url', 'local[*]')
+os.environ.setdefault('spark_app_name', 'bench_local_ingest_query')
+os.environ.setdefault('parquet_file_name', '')
+os.environ.setdefault('in_situ_schema', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'in_situ_schema.json'))
+os.environ.setdefault('authentication_type', '')
+os.environ.setdefault('authentication_key', '')
+os.environ.setdefault('parquet_metadata_tbl', '')
+os.environ.setdefault('spark_warm_up', 'false')
+
+from parquet_flask.io_logic.ingest_new_file import IngestNewJsonFile
+from parquet_flask.io_logic.query_v2 import QueryProps
+from parquet_flask.io_logic.query_v4 import QueryV4
+
+
+class BenchLocalIngestQuery:
+    """
+    End-to-end benchmark without the deployed service.
+    Synthetic files are ingested with IngestNewJsonFile, and a fixed query suite is run with QueryV4.
+
+    Parquet root is a local directory, or an s3a:// url on a local S3 stand-in (minio, moto_server, ...) with --s3_endpoint.
+
+    python3 -m tests.bench_mark.bench_local_ingest_query --num_files 10 --records_per_file 20000 --repeat 5
+    aws_access_key_id=minio aws_secret_access_key=minio123 python3 -m tests.bench_mark.bench_local_ingest_query \
+        --parquet_root s3a://bench-mark/parquet --s3_endpoint http://localhost:9000
+    """
+    PLATFORM_CODES = ['30', '31', '41', '42']
+    START_TIME = '2017-01-01T00:00:00Z'
+    END_TIME = '2017-03-31T23:59:59Z'
+
+    def __init__(self, parquet_root: str, num_files: int, records_per_file: int, repeat: int, seed: int = 0):
+        self.__parquet_root = parquet_root
+        self.__num_files = num_files
+        self.__records_per_file = records_per_file
+        self.__repeat = repeat
+        self.__seed = seed
+
+    @staticmethod
+    def percentile(durations: list, pct: float):
+        """
+        nearest-rank percentile
+
+        :param durations: list - seconds
+        :param pct: float - 0 to 100
+        :return: float
+        """
+        sorted_durations = sorted(durations)
+        rank = max(1, math.ceil(pct / 100 * len(sorted_durations)))
+        return sorted_durations[rank - 1]
+
+    def __summarize(self, durations: list, rows: int) -> dict:
+        return {
+            'runs': len(durations),
+            'p50': self.percentile(durations, 50),
+            'p90': self.percentile(durations, 90),
+            'p99': self.percentile(durations, 99),
+            'rows_per_second': rows / max(sum(durations), 1e-6),
+        }
+
+    @staticmethod
+    def __create_props(**kwargs) -> QueryProps:
+        props = QueryProps()
+        props.min_datetime = BenchLocalIngestQuery.START_TIME
+        props.max_datetime = BenchLocalIngestQuery.END_TIME
+        props.size = 100
+        for k, v in kwargs.items():
+            setattr(props, k, v)
+        return props
+
+    def get_query_suite(self) -> dict:
+        """
+        :return: dict - {query name: QueryProps}. each call creates new props since QueryV4 may modify them
+        """
+        return {
+            'one_platform_one_month': self.__create_props(platform_code=['30'], max_datetime='2017-01-31T23:59:59Z', size=20),
+            'all_platforms_bbox': self.__create_props(platform_code=self.PLATFORM_CODES, min_lat_lon=(-45, -90), max_lat_lon=(45, 90)),
+            'variable_depth_count_only': self.__create_props(variable=['relative_humidity'], min_depth=0, max_depth=50, size=0),
+            'deep_page': self.__create_props(platform_code=self.PLATFORM_CODES, start_at=1000, size=100),
+        }
+
+    @func_exec_time_decorator
+    def __ingest_file(self, file_path: str):
+        return IngestNewJsonFile().ingest(file_path, str(uuid.uuid4()))
+
+    @func_exec_time_decorator
+    def __search(self, props: QueryProps):
+        return QueryV4(props).search()
+
+    def ingest(self, tmp_dir: str) -> dict:
+        generator = SyntheticInSitu(platform_codes=self.PLATFORM_CODES, months=3, seed=self.__seed)
+        file_paths = generator.write_files(tmp_dir, self.__num_files, self.__records_per_file)
+        durations = []
+        total_records = 0
+        for each_file in file_paths:
+            records_count, duration, _ = self.__ingest_file(each_file)
+            durations.append(duration)
+            total_records += records_count
+        return self.__summarize(durations, total_records)
+
+    def query(self) -> dict:
+        results = {}
+        for query_name in self.get_query_suite().keys():
+            durations = []
+            returned_rows = 0
+            total = 0
+            for _ in range(self.__repeat):
+                search_result, duration, _ = self.__search(self.get_query_suite()[query_name])
+                durations.append(duration)
+                returned_rows += len(search_result['results'])
+                total = search_result['total']
+            results[query_name] = {**self.__summarize(durations, returned_rows), 'total': total}
+        return results
+
+    def start(self):
+        os.environ['parquet_file_name'] = self.__parquet_root
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = {'ingest': self.ingest(tmp_dir)}
+        QueryV4(self.__create_props(size=0)).search()  # warming up so that the first query run does not pay for it
+        results['query'] = self.query()
+        print(json.dumps(results, indent=4))
+        return results
+
+
+def set_s3_stand_in(s3_endpoint: str):
+    """
+    pointing s3a to a local S3 stand-in. must be called before the spark session is created.
+    """
+    spark_config = json.loads(os.environ.get('spark_config_dict', '{}'))
+    spark_config.update({
+        'spark.hadoop.fs.s3a.endpoint': s3_endpoint,
+        'spark.hadoop.fs.s3a.path.style.access': 'true',
+        'spark.hadoop.fs.s3a.connection.ssl.enabled': str(s3_endpoint.startswith('https://')).lower(),
+    })
+    os.environ['spark_config_dict'] = json.dumps(spark_config)
+    return
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description='ingesting synthetic in-situ files and running a fixed query suite locally')
+    parser.add_argument('--parquet_root', required=False, default=None, help='local directory or s3a:// url. temporary directory if missing')
+    parser.add_argument('--s3_endpoint', required=False, default=None, help='endpoint of local S3 stand-in for s3a:// parquet_root')
+    parser.add_argument('--num_files', required=False, type=int, default=5)
+    parser.add_argument('--records_per_file', required=False, type=int, default=10000)
+    parser.add_argument('--repeat', required=False, type=int, default=5)
+    parser.add_argument('--seed', required=False, type=int, default=0)
+    args = parser.parse_args()
+    if args.s3_endpoint is not None:
+        set_s3_stand_in(args.s3_endpoint)
+    if args.parquet_root is not None:
+        BenchLocalIngestQuery(args.parquet_root, args.num_files, args.records_per_file, args.repeat, args.seed).start()
+    else:
+        with tempfile.TemporaryDirectory() as parquet_dir:
+            BenchLocalIngestQuery(os.path.join(parquet_dir, 'parquet'), args.num_files, args.records_per_file, args.repeat, args.seed).start()
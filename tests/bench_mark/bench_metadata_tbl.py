@@ -0,0 +1,92 @@
+import logging
+import os
+import sys
+import tempfile
+import uuid
+
+from tests.bench_mark.func_exec_time_decorator import func_exec_time_decorator
+
+os.environ['master_spark_url'] = ''
+os.environ['spark_app_name'] = ''
+os.environ['parquet_file_name'] = ''
+os.environ['in_situ_schema'] = ''
+os.environ['authentication_type'] = ''
+os.environ['authentication_key'] = ''
+os.environ.setdefault('parquet_metadata_tbl', '')
+
+from parquet_flask.io_logic.metadata_tbl_factory import MetadataTblFactory
+from parquet_flask.io_logic.metadata_tbl_interface import MetadataTblInterface
+
+
+class BenchMetadataTbl:
+    """
+    Measuring metadata table operations used by ingestion.
+
+    python3 -m tests.bench_mark.bench_metadata_tbl SQLITE 10000
+    parquet_metadata_tbl=cdms_parquet_meta_dev_v1 python3 -m tests.bench_mark.bench_metadata_tbl DDB 500
+    """
+    def __init__(self, db_io: MetadataTblInterface, num_records: int):
+        self.__db_io = db_io
+        self.__num_records = num_records
+        self.__prefix = f's3://bench-mark/{uuid.uuid4()}'
+        self.__start_date = 1640995200000
+        self.__records = [{
+            's3_url': f'{self.__prefix}/{i}.json',
+            'uuid': str(uuid.uuid4()),
+            'ingested_date': self.__start_date + i * 1000,
+            'records_count': 1000,
+            'file_size': 1024,
+        } for i in range(num_records)]
+
+    @func_exec_time_decorator
+    def __insert_one_by_one(self):
+        for each_record in self.__records[:self.__num_records // 2]:
+            self.__db_io.insert_record(each_record)
+        return
+
+    @func_exec_time_decorator
+    def __write_records(self):
+        return self.__db_io.write_records(self.__records[self.__num_records // 2:], False)
+
+    @func_exec_time_decorator
+    def __get_one_by_one(self):
+        return [self.__db_io.get_by_s3_url(k['s3_url']) for k in self.__records]
+
+    @func_exec_time_decorator
+    def __get_by_s3_urls(self):
+        return self.__db_io.get_by_s3_urls([k['s3_url'] for k in self.__records])
+
+    @func_exec_time_decorator
+    def __get_by_uuid(self):
+        return [self.__db_io.get_by_uuid(k['uuid']) for k in self.__records[:100]]
+
+    @func_exec_time_decorator
+    def __query_by_date_range(self):
+        return self.__db_io.query_by_date_range(self.__start_date, self.__start_date + self.__num_records * 100)
+
+    def start(self):
+        half = self.__num_records // 2
+        results = {
+            'insert_one_by_one': (self.__insert_one_by_one()[1], half),
+            'write_records': (self.__write_records()[1], half),
+            'get_one_by_one': (self.__get_one_by_one()[1], self.__num_records),
+            'get_by_s3_urls': (self.__get_by_s3_urls()[1], self.__num_records),
+            'get_by_uuid_x100': (self.__get_by_uuid()[1], 100),
+        }
+        try:
+            range_result, duration, _ = self.__query_by_date_range()
+            results['query_by_date_range'] = (duration, len(range_result))
+        except NotImplementedError:
+            results['query_by_date_range'] = (None, 0)
+        for k, (duration, count) in results.items():
+            print(f'{k}: not supported' if duration is None else f'{k}: {duration:.3f} s. {count / max(duration, 1e-6):.0f} records/s')
+        return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    class_type = sys.argv[1] if len(sys.argv) > 1 else MetadataTblFactory.SQLITE
+    num_records = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ.setdefault('metadata_tbl_sqlite_path', os.path.join(tmp_dir, 'bench_mark.sqlite'))
+        BenchMetadataTbl(MetadataTblFactory().get_instance(class_type), num_records).start()
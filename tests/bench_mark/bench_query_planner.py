@@ -0,0 +1,138 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from time import perf_counter
+
+os.environ.setdefault('master_spark_url', '')
+os.environ.setdefault('spark_app_name', '')
+os.environ.setdefault('parquet_file_name', '')
+os.environ.setdefault('in_situ_schema', '')
+os.environ.setdefault('authentication_type', '')
+os.environ.setdefault('authentication_key', '')
+os.environ.setdefault('parquet_metadata_tbl', '')
+
+from parquet_flask.io_logic.parquet_query_condition_management_v3 import ParquetQueryConditionManagementV3
+from parquet_flask.io_logic.query_admission_control import QueryAdmissionControl
+from parquet_flask.io_logic.query_v2 import QueryProps
+
+
+class BenchQueryPlanner:
+    """
+    Measuring the work done for every query before spark starts:
+    ParquetQueryConditionManagementV3.manage_query_props, PartitionedParquetPath.generate_path, and QueryAdmissionControl.get_scheduler_pool.
+
+    Paths multiply as platforms x months, so the number of generated paths is reported with the timings.
+
+    python3 -m tests.bench_mark.bench_query_planner --iterations 50 --output /tmp/planner_baseline.json
+    python3 -m tests.bench_mark.bench_query_planner --baseline /tmp/planner_baseline.json --tolerance 1.5
+    """
+    BASE_PATH = 's3a://bench-mark/parquet'
+    MISSING_DEPTH = -99999
+
+    @staticmethod
+    def __create_props(num_platforms: int, min_time: str, max_time: str, provider='NCAR', project='ICOADS Release 3.0') -> QueryProps:
+        props = QueryProps()
+        props.provider = provider
+        props.project = project
+        props.platform_code = [str(k) for k in range(num_platforms)]
+        props.variable = ['air_temperature', 'relative_humidity']
+        props.columns = []
+        props.min_datetime = min_time
+        props.max_datetime = max_time
+        props.min_lat_lon = (-45, -90)
+        props.max_lat_lon = (45, 90)
+        props.min_depth = -99
+        props.max_depth = 0
+        props.size = 100
+        return props
+
+    @staticmethod
+    def get_scenarios() -> dict:
+        """
+        :return: dict - {scenario name: (QueryProps, expected number of paths)}
+        """
+        create_props = BenchQueryPlanner.__create_props
+        return {
+            'single_platform_month': (create_props(1, '2018-03-03T00:00:00Z', '2018-03-30T00:00:00Z'), 1),
+            'ten_platforms_year': (create_props(10, '2018-01-01T00:00:00Z', '2018-12-31T23:59:59Z'), 120),
+            'fifty_platforms_decade': (create_props(50, '2010-03-03T00:00:00Z', '2019-10-30T00:00:00Z'), 1400),
+            'two_hundred_platforms_decade': (create_props(200, '2010-03-03T00:00:00Z', '2019-10-30T00:00:00Z'), 5600),
+            'no_provider_decade': (create_props(200, '2010-03-03T00:00:00Z', '2019-10-30T00:00:00Z', provider=None), 0),
+        }
+
+    @staticmethod
+    def plan(props: QueryProps):
+        """
+        :return: tuple - (list of generated paths, scheduler pool)
+        """
+        condition_manager = ParquetQueryConditionManagementV3(BenchQueryPlanner.BASE_PATH, BenchQueryPlanner.MISSING_DEPTH, props)
+        condition_manager.manage_query_props()
+        paths = condition_manager.stringify_parquet_names()
+        scheduler_pool = QueryAdmissionControl().get_scheduler_pool(condition_manager.parquet_names, props.size)
+        return paths, scheduler_pool
+
+    def __init__(self, iterations: int):
+        self.__iterations = iterations
+
+    def run_scenario(self, props: QueryProps) -> dict:
+        durations = []
+        paths = []
+        for _ in range(self.__iterations):
+            start_time = perf_counter()
+            paths, _ = self.plan(props)
+            durations.append(perf_counter() - start_time)
+        durations = sorted(durations)
+        return {
+            'paths': len(paths),
+            'min_ms': durations[0] * 1000,
+            'median_ms': durations[len(durations) // 2] * 1000,
+            'max_ms': durations[-1] * 1000,
+        }
+
+    def start(self) -> dict:
+        results = {}
+        for scenario_name, (props, _) in self.get_scenarios().items():
+            results[scenario_name] = self.run_scenario(props)
+            print(f'{scenario_name}: {results[scenario_name]["paths"]} paths. median: {results[scenario_name]["median_ms"]:.3f} ms. '
+                  f'min: {results[scenario_name]["min_ms"]:.3f} ms. max: {results[scenario_name]["max_ms"]:.3f} ms')
+        return results
+
+    @staticmethod
+    def compare(results: dict, baseline: dict, tolerance: float) -> list:
+        """
+        :param results: dict - from `start`
+        :param baseline: dict - from an earlier `start`
+        :param tolerance: float - allowed ratio of median time against the baseline
+        :return: list - regression messages. empty if nothing regressed
+        """
+        regressions = []
+        for scenario_name, result in results.items():
+            if scenario_name not in baseline:
+                continue
+            if result['paths'] != baseline[scenario_name]['paths']:
+                regressions.append(f'{scenario_name}: paths changed from {baseline[scenario_name]["paths"]} to {result["paths"]}')
+            if result['median_ms'] > baseline[scenario_name]['median_ms'] * tolerance:
+                regressions.append(f'{scenario_name}: median slowed from {baseline[scenario_name]["median_ms"]:.3f} ms to {result["median_ms"]:.3f} ms')
+        return regressions
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description='measuring query planning time and number of generated paths')
+    parser.add_argument('--iterations', required=False, type=int, default=20)
+    parser.add_argument('--output', required=False, default=None, help='json file to save results as a baseline')
+    parser.add_argument('--baseline', required=False, default=None, help='json file from an earlier --output to compare with')
+    parser.add_argument('--tolerance', required=False, type=float, default=1.5, help='allowed ratio of median time against the baseline')
+    args = parser.parse_args()
+    bench_results = BenchQueryPlanner(args.iterations).start()
+    if args.output is not None:
+        with open(args.output, 'w') as ff:
+            json.dump(bench_results, ff, indent=4)
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as ff:
+            all_regressions = BenchQueryPlanner.compare(bench_results, json.load(ff), args.tolerance)
+        for each in all_regressions:
+            print(f'REGRESSION: {each}')
+        sys.exit(1 if len(all_regressions) > 0 else 0)
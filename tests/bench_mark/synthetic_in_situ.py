@@ -0,0 +1,72 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+
+class SyntheticInSitu:
+    """
+    Generating in-situ json files which are valid against in_situ_schema.json.
+
+    Values are random, but reproducible with the same seed.
+    Observations are spread over `platform_codes` and `months` months from `start_time`, so that they land in
+    platform_codes x months partitions like real files.
+    """
+    VARIABLES = {
+        'air_temperature': (-30.0, 40.0),
+        'relative_humidity': (0.0, 100.0),
+        'sea_surface_temperature': (-2.0, 32.0),
+        'sea_water_salinity': (30.0, 38.0),
+        'wind_speed': (0.0, 40.0),
+    }
+    DEPTHS = [-99999.0, 0.0, 5.0, 10.0, 50.0, 100.0]
+
+    def __init__(self, provider='BENCH_MARK', project='BENCH_MARK_PROJECT', platform_codes=('30', '41', '42'),
+                 start_time=datetime(2017, 1, 1), months=3, seed=0):
+        self.__provider = provider
+        self.__project = project
+        self.__platform_codes = list(platform_codes)
+        self.__start_time = start_time
+        self.__months = months
+        self.__random = random.Random(seed)
+
+    def __random_time(self):
+        month_offset = self.__random.randrange(self.__months)
+        year = self.__start_time.year + (self.__start_time.month - 1 + month_offset) // 12
+        month = (self.__start_time.month - 1 + month_offset) % 12 + 1
+        obs_time = datetime(year, month, 1) + timedelta(seconds=self.__random.randrange(28 * 24 * 3600))
+        return obs_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def __generate_observation(self):
+        observation = {
+            'time': self.__random_time(),
+            'latitude': round(self.__random.uniform(-90, 90), 3),
+            'longitude': round(self.__random.uniform(-180, 180), 3),
+            'depth': self.__random.choice(self.DEPTHS),
+            'platform': {'code': self.__random.choice(self.__platform_codes)},
+        }
+        for k, (min_val, max_val) in self.VARIABLES.items():
+            if self.__random.random() < 0.2:  # real files have sparse variables
+                continue
+            observation[k] = round(self.__random.uniform(min_val, max_val), 2)
+            observation[f'{k}_quality'] = self.__random.choice([1, 1, 1, 2, 3])
+        return observation
+
+    def generate(self, num_records: int) -> dict:
+        return {
+            'provider': self.__provider,
+            'project': self.__project,
+            'observations': [self.__generate_observation() for _ in range(num_records)],
+        }
+
+    def write_files(self, output_dir: str, num_files: int, records_per_file: int) -> list:
+        """
+        :return: list - absolute paths of written json files
+        """
+        file_paths = []
+        for i in range(num_files):
+            file_path = os.path.join(output_dir, f'{self.__provider}_{i:05d}.json')
+            with open(file_path, 'w') as ff:
+                json.dump(self.generate(records_per_file), ff)
+            file_paths.append(file_path)
+        return file_paths
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from threading import Lock
+from unittest.mock import patch
+
+import requests
+
+from parquet_cli.ingest_s3.ingest_s3_runner import IngestS3Runner
+
+
+class MockResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.__body = body if body is not None else {}
+        self.text = str(self.__body)
+
+    def json(self):
+        return self.__body
+
+
+class MockIngester:
+    """
+    responses are popped from `responses[s3_url]` for each attempt. 201 when there is none left.
+    """
+    existing_records = {}
+    responses = {}
+    calls = []
+    lock = Lock()
+
+    def __init__(self):
+        self.http_session = None
+
+    def get_existing_records(self, s3_urls: list):
+        return {k: self.existing_records[k] for k in s3_urls if k in self.existing_records}
+
+    @staticmethod
+    def is_unchanged(ddb_record: dict, s3_etag: str, s3_size: int):
+        return ddb_record.get('s3_etag') == s3_etag and ddb_record.get('s3_size') == s3_size
+
+    def __respond(self, key):
+        with self.lock:
+            self.calls.append(key)
+            if len(self.responses.get(key, [])) < 1:
+                return MockResponse(201)
+            response = self.responses[key].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def start(self, event):
+        return self.__respond(event['s3_url'])
+
+    def start_batch(self, s3_urls: list):
+        return self.__respond(tuple(s3_urls))
+
+
+class TestIngestS3Runner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_file = os.path.join(self.tmp_dir.name, 'checkpoint.txt')
+        MockIngester.existing_records = {}
+        MockIngester.responses = {}
+        MockIngester.calls = []
+        self.ingester_patcher = patch('parquet_flask.cdms_lambda_func.ingest_s3_to_cdms.ingest_s3_to_cdms.IngestS3ToCdms', MockIngester)
+        self.ingester_patcher.start()
+        return
+
+    def tearDown(self) -> None:
+        self.ingester_patcher.stop()
+        self.tmp_dir.cleanup()
+        return
+
+    def __read_checkpoint(self):
+        with open(self.checkpoint_file, 'r') as ff:
+            return sorted([k.strip() for k in ff.readlines()])
+
+    def test_checkpoint_resume(self):
+        s3_files = [(f's3://bucket/{i}.json', 10, f'etag{i}') for i in range(4)]
+        MockIngester.responses = {'s3://bucket/2.json': [MockResponse(500, {'message': 'mock error'})]}
+        self.assertEqual((3, 1), IngestS3Runner(workers=2, checkpoint_file=self.checkpoint_file).start(s3_files), 'wrong counts of first run')
+        self.assertEqual(['s3://bucket/0.json', 's3://bucket/1.json', 's3://bucket/3.json'], self.__read_checkpoint(), 'failed file is in checkpoint')
+
+        MockIngester.calls = []
+        self.assertEqual((1, 0), IngestS3Runner(workers=2, checkpoint_file=self.checkpoint_file).start(s3_files), 'wrong counts of resumed run')
+        self.assertEqual(['s3://bucket/2.json'], MockIngester.calls, 'files in checkpoint are sent again')
+        self.assertEqual([f's3://bucket/{i}.json' for i in range(4)], self.__read_checkpoint(), 'resumed file is not in checkpoint')
+        return
+
+    def test_skip_unchanged(self):
+        MockIngester.existing_records = {
+            's3://bucket/changed.json': {'s3_url': 's3://bucket/changed.json', 's3_etag': 'old_etag', 's3_size': 10},
+            's3://bucket/unchanged.json': {'s3_url': 's3://bucket/unchanged.json', 's3_etag': 'etag', 's3_size': 10},
+        }
+        s3_files = [
+            ('s3://bucket/new1.json', 10, 'etag'),
+            ('s3://bucket/new2.json', 10, 'etag'),
+            ('s3://bucket/changed.json', 10, 'etag'),
+            ('s3://bucket/unchanged.json', 10, 'etag'),
+        ]
+        self.assertEqual((3, 0), IngestS3Runner(batch_size=5).start(s3_files), 'wrong counts')
+        self.assertEqual(sorted([('s3://bucket/new1.json', 's3://bucket/new2.json'), 's3://bucket/changed.json'], key=str), sorted(MockIngester.calls, key=str),
+                         'new files should be in a batch, changed files are sent 1 by 1, and unchanged files are skipped')
+        return
+
+    def test_retry(self):
+        MockIngester.responses = {
+            's3://bucket/throttled.json': [MockResponse(429), requests.exceptions.ConnectionError('mock connection error'), MockResponse(201)],
+            's3://bucket/unavailable.json': [MockResponse(503)] * 4,
+            's3://bucket/bad_request.json': [MockResponse(400)],
+        }
+        s3_files = [(f's3://bucket/{k}.json', 10, 'etag') for k in ['throttled', 'unavailable', 'bad_request']]
+        self.assertEqual((1, 2), IngestS3Runner(max_retries=3, backoff_seconds=0).start(s3_files), 'wrong counts')
+        self.assertEqual(3, MockIngester.calls.count('s3://bucket/throttled.json'), 'throttled file is not retried till it succeeds')
+        self.assertEqual(4, MockIngester.calls.count('s3://bucket/unavailable.json'), 'wrong attempts before giving up')
+        self.assertEqual(1, MockIngester.calls.count('s3://bucket/bad_request.json'), 'non-retriable error is retried')
+        return
+
+    def test_partially_failed_batch(self):
+        s3_files = [(f's3://bucket/{i}.json', 10, 'etag') for i in range(3)]
+        MockIngester.responses = {tuple([k[0] for k in s3_files]): [MockResponse(207, {'failed': [{'s3_url': 's3://bucket/1.json', 'details': 'mock error'}]})]}
+        self.assertEqual((2, 1), IngestS3Runner(batch_size=3, checkpoint_file=self.checkpoint_file).start(s3_files), 'wrong counts')
+        self.assertEqual(['s3://bucket/0.json', 's3://bucket/2.json'], self.__read_checkpoint(), 'failed file of batch is in checkpoint')
+        return
@@ -0,0 +1,75 @@
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from parquet_flask.authenticator.cached_authenticator import CachedAuthenticator
+from parquet_flask.utils.singleton import Singleton
+
+
+class TestCachedAuthenticator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        self.__cred_file = os.path.join(self.__tmp_dir.name, 'cred.json')
+        self.__write_token('token-1')
+        self.__env_backup = {k: os.environ.get(k) for k in ['authentication_type', 'authentication_key', 'authentication_cache_ttl_seconds', 'authentication_max_stale_seconds']}
+        os.environ['authentication_type'] = 'FILE'
+        os.environ['authentication_key'] = self.__cred_file
+        os.environ['authentication_cache_ttl_seconds'] = '0.1'
+        os.environ['authentication_max_stale_seconds'] = '60'
+        Singleton._instances.pop(CachedAuthenticator, None)
+        return
+
+    def tearDown(self) -> None:
+        for k, v in self.__env_backup.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        Singleton._instances.pop(CachedAuthenticator, None)
+        self.__tmp_dir.cleanup()
+        return
+
+    def __write_token(self, token):
+        with open(self.__cred_file, 'w') as ff:
+            ff.write(json.dumps({'auth_cred': token}))
+        return
+
+    @staticmethod
+    def __get_headers(token):
+        return {'Authorization': base64.standard_b64encode(token.encode()).decode()}
+
+    def __wait_for_token(self, authenticator, token):
+        for _ in range(50):
+            if authenticator.authenticate(self.__get_headers(token)) is None:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def test_authenticate(self):
+        authenticator = CachedAuthenticator()
+        self.assertEqual(None, authenticator.authenticate(self.__get_headers('token-1')), 'valid token is rejected')
+        self.assertNotEqual(None, authenticator.authenticate(self.__get_headers('token-2')), 'invalid token is accepted')
+        os.remove(self.__cred_file)
+        self.assertEqual(None, authenticator.authenticate(self.__get_headers('token-1')), 'cached token is not used while file is missing')
+        return
+
+    def test_refresh(self):
+        authenticator = CachedAuthenticator()
+        self.assertEqual(None, authenticator.authenticate(self.__get_headers('token-1')), 'valid token is rejected')
+        self.__write_token('token-2')
+        time.sleep(0.2)
+        self.assertTrue(self.__wait_for_token(authenticator, 'token-2'), 'token is not refreshed')
+        return
+
+    def test_max_stale(self):
+        os.environ['authentication_max_stale_seconds'] = '0.1'
+        authenticator = CachedAuthenticator()
+        self.assertEqual(None, authenticator.authenticate(self.__get_headers('token-1')), 'valid token is rejected')
+        os.remove(self.__cred_file)
+        time.sleep(0.2)
+        with self.assertRaises(ValueError):
+            authenticator.authenticate(self.__get_headers('token-1'))
+        return
@@ -0,0 +1,43 @@
+import os
+import unittest
+from threading import Thread
+
+from parquet_flask.aws.aws_client_cache import AwsClientCache
+from parquet_flask.aws.aws_cred import AwsCred
+from parquet_flask.utils.singleton import Singleton
+
+
+class TestAwsClientCache(unittest.TestCase):
+    def setUp(self) -> None:
+        os.environ['aws_access_key_id'] = 'key-1'
+        os.environ['aws_secret_access_key'] = 'secret-1'
+        os.environ['aws_max_pool_connections'] = '20'
+        Singleton._instances.pop(AwsClientCache, None)
+        return
+
+    def tearDown(self) -> None:
+        for k in ['aws_access_key_id', 'aws_secret_access_key', 'aws_max_pool_connections']:
+            os.environ.pop(k)
+        Singleton._instances.pop(AwsClientCache, None)
+        return
+
+    def test_get_client(self):
+        client = AwsCred().get_client('s3')
+        self.assertTrue(client is AwsCred().get_client('s3'), 'client is not reused')
+        self.assertFalse(client is AwsCred().get_client('dynamodb'), 'different services share a client')
+        self.assertEqual(20, client.meta.config.max_pool_connections, 'wrong max_pool_connections')
+        os.environ['aws_access_key_id'] = 'key-2'
+        rotated_client = AwsCred().get_client('s3')
+        self.assertFalse(client is rotated_client, 'client is not re-created after rotation')
+        self.assertEqual('key-2', rotated_client._request_signer._credentials.access_key, 'wrong credentials')
+        return
+
+    def test_get_resource(self):
+        resource = AwsCred().get_resource('dynamodb')
+        self.assertTrue(resource is AwsCred().get_resource('dynamodb'), 'resource is not reused in the same thread')
+        other_thread_resources = []
+        each_thread = Thread(target=lambda: other_thread_resources.append(AwsCred().get_resource('dynamodb')))
+        each_thread.start()
+        each_thread.join()
+        self.assertFalse(resource is other_thread_resources[0], 'resource is shared between threads')
+        return
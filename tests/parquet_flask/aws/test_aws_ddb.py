@@ -0,0 +1,185 @@
+import unittest
+from unittest.mock import patch
+
+from parquet_flask.aws.aws_ddb import AwsDdb, AwsDdbProps
+
+
+class MockDdbResource:
+    def __init__(self, unprocessed_attempts=0):
+        self.calls = []
+        self.__unprocessed_attempts = unprocessed_attempts
+
+    def batch_get_item(self, RequestItems):
+        self.calls.append(RequestItems)
+        keys = RequestItems['tbl']['Keys']
+        if self.__unprocessed_attempts > 0:
+            self.__unprocessed_attempts -= 1
+            return {'Responses': {'tbl': [{'s3_url': k['s3_url']} for k in keys[:1]]},
+                    'UnprocessedKeys': {'tbl': {**RequestItems['tbl'], 'Keys': keys[1:]}}}
+        return {'Responses': {'tbl': [{'s3_url': k['s3_url']} for k in keys if k['s3_url'] != 'missing']}, 'UnprocessedKeys': {}}
+
+
+class MockDdbClient:
+    def __init__(self, pages_per_segment=3, items_per_page=2):
+        self.calls = []
+        self.__pages_per_segment = pages_per_segment
+        self.__items_per_page = items_per_page
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        segment = kwargs.get('Segment', 0)
+        page = kwargs.get('ExclusiveStartKey', {'page': {'N': '0'}})['page']['N']
+        result = {'Items': [{'s3_url': {'S': f'{segment}-{page}-{i}'}, 'records_count': {'N': '10'}} for i in range(self.__items_per_page)]}
+        if int(page) + 1 < self.__pages_per_segment:
+            result['LastEvaluatedKey'] = {'page': {'N': str(int(page) + 1)}}
+        return result
+
+
+class MockTransactionCanceledException(Exception):
+    def __init__(self, cancel_code):
+        super().__init__(cancel_code)
+        self.response = {'CancellationReasons': [{'Code': cancel_code}]}
+
+
+class MockDdbExceptions:
+    TransactionCanceledException = MockTransactionCanceledException
+    ProvisionedThroughputExceededException = TimeoutError
+    TransactionInProgressException = TimeoutError
+
+
+class MockTransactDdbClient:
+    exceptions = MockDdbExceptions
+
+    def __init__(self, cancel_code=None):
+        self.transactions = []
+        self.__cancel_code = cancel_code
+
+    def transact_write_items(self, TransactItems):
+        self.transactions.append(TransactItems)
+        if self.__cancel_code is not None:
+            raise MockTransactionCanceledException(self.__cancel_code)
+        return {}
+
+
+class MockDdbTable:
+    def __init__(self):
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        page = kwargs.get('ExclusiveStartKey', {'page': 0})['page']
+        result = {'Items': [{'s3_url': f'{page}-{i}'} for i in range(2)]}
+        if page < 2:
+            result['LastEvaluatedKey'] = {'page': page + 1}
+        return result
+
+
+class MockDdbTableResource:
+    def __init__(self):
+        self.table = MockDdbTable()
+
+    def Table(self, tbl_name):
+        return self.table
+
+
+class TestAwsDdb(unittest.TestCase):
+    def __get_ddb(self, ddb_resource):
+        props = AwsDdbProps()
+        props.tbl_name = 'tbl'
+        props.hash_key = 's3_url'
+        ddb = AwsDdb(props)
+        ddb._ddb_resource = ddb_resource
+        return ddb
+
+    def test_batch_get_items_chunks(self):
+        ddb_resource = MockDdbResource()
+        hash_vals = [f's3://bucket/{i}.json' for i in range(250)] + ['s3://bucket/0.json', 'missing']
+        items = self.__get_ddb(ddb_resource).batch_get_items(hash_vals, ['s3_url', 'uuid'])
+        self.assertEqual(250, len(items), 'wrong number of items')
+        self.assertEqual([100, 100, 51], [len(k['tbl']['Keys']) for k in ddb_resource.calls], 'wrong chunks')
+        self.assertEqual({'#attr0': 's3_url', '#attr1': 'uuid'}, ddb_resource.calls[0]['tbl']['ExpressionAttributeNames'], 'wrong projection')
+        return
+
+    @patch('parquet_flask.aws.aws_ddb.sleep')
+    def test_batch_get_items_unprocessed(self, mock_sleep):
+        ddb_resource = MockDdbResource(unprocessed_attempts=2)
+        items = self.__get_ddb(ddb_resource).batch_get_items([f's3://bucket/{i}.json' for i in range(5)])
+        self.assertEqual(5, len(items), 'unprocessed keys are not retried')
+        self.assertEqual(3, len(ddb_resource.calls), 'wrong number of calls')
+        self.assertEqual(2, mock_sleep.call_count, 'no backoff between retries')
+        return
+
+    @patch('parquet_flask.aws.aws_ddb.sleep')
+    def test_batch_get_items_max_retries(self, mock_sleep):
+        ddb_resource = MockDdbResource(unprocessed_attempts=10)
+        with self.assertRaises(RuntimeError):
+            self.__get_ddb(ddb_resource).batch_get_items([f's3://bucket/{i}.json' for i in range(20)], max_retries=2)
+        return
+
+    def test_scan_items(self):
+        ddb = self.__get_ddb(MockDdbResource())
+        ddb._ddb_client = MockDdbClient()
+        items = list(ddb.scan_items('#records_count > :records_count', {'#records_count': 'records_count'}, {':records_count': 1.5}, ['s3_url']))
+        self.assertEqual(6, len(items), 'wrong number of items')
+        self.assertEqual({'s3_url': '0-0-0', 'records_count': 10}, items[0], 'wrong item')
+        self.assertEqual(3, len(ddb._ddb_client.calls), 'wrong number of pages')
+        self.assertTrue('Limit' not in ddb._ddb_client.calls[0], 'page size is limited')
+        self.assertEqual({'#records_count': 'records_count', '#proj0': 's3_url'}, ddb._ddb_client.calls[0]['ExpressionAttributeNames'], 'wrong names')
+        self.assertEqual({':records_count': {'N': '1.5'}}, ddb._ddb_client.calls[0]['ExpressionAttributeValues'], 'wrong values')
+        return
+
+    def test_scan_items_in_parallel(self):
+        ddb = self.__get_ddb(MockDdbResource())
+        ddb._ddb_client = MockDdbClient(pages_per_segment=5)
+        items = list(ddb.scan_items(total_segments=4))
+        self.assertEqual(40, len(items), 'wrong number of items')
+        self.assertEqual(set(range(4)), set([k['Segment'] for k in ddb._ddb_client.calls]), 'not all segments are scanned')
+        self.assertEqual(set([f'{s}-{p}-{i}' for s in range(4) for p in range(5) for i in range(2)]), set([k['s3_url'] for k in items]), 'wrong items')
+        return
+
+    def test_scan_items_stop_early(self):
+        ddb = self.__get_ddb(MockDdbResource())
+        ddb._ddb_client = MockDdbClient(pages_per_segment=1000)
+        items = ddb.scan_items(total_segments=2)
+        self.assertEqual(3, len([next(items) for _ in range(3)]), 'wrong number of items')
+        items.close()
+        self.assertTrue(len(ddb._ddb_client.calls) < 100, 'segments are not stopped')
+        return
+
+    def test_transact_put_items(self):
+        ddb = self.__get_ddb(MockDdbResource())
+        ddb._ddb_client = MockTransactDdbClient()
+        failed = ddb.transact_put_items([{'s3_url': f's3://bucket/{i}.json', 'records_count': 1.5} for i in range(150)])
+        self.assertEqual(0, len(failed), 'wrong failed items')
+        self.assertEqual([100, 50], [len(k) for k in ddb._ddb_client.transactions], 'wrong chunks')
+        first_put = ddb._ddb_client.transactions[0][0]['Put']
+        self.assertEqual('attribute_not_exists(#hash_key)', first_put['ConditionExpression'], 'wrong insert condition')
+        self.assertEqual({'N': '1.5'}, first_put['Item']['records_count'], 'wrong serialized item')
+        return
+
+    def test_transact_put_items_condition_failed(self):
+        ddb = self.__get_ddb(MockDdbResource())
+        ddb._ddb_client = MockTransactDdbClient(cancel_code='ConditionalCheckFailed')
+        put_items = []
+
+        def mock_add_one_item(item_dict, hash_val, range_val=None, replace=False):
+            if hash_val.endswith('1.json'):
+                raise ValueError('conditional check failed')
+            put_items.append(hash_val)
+            return
+        ddb.add_one_item = mock_add_one_item
+        failed = ddb.transact_put_items([{'s3_url': f's3://bucket/{i}.json'} for i in range(3)], replace=True)
+        self.assertEqual(['s3://bucket/1.json'], [k[0]['s3_url'] for k in failed], 'wrong failed items')
+        self.assertEqual(['s3://bucket/0.json', 's3://bucket/2.json'], put_items, 'other items are not put one by one')
+        self.assertEqual(1, len(ddb._ddb_client.transactions), 'conditional check failure is retried')
+        return
+
+    def test_query_index_range(self):
+        ddb_resource = MockDdbTableResource()
+        ddb = self.__get_ddb(ddb_resource)
+        items = list(ddb.query_index_range('ingested_day-index', 'ingested_day', '2022-01-01', 'ingested_date', 1, 2))
+        self.assertEqual(6, len(items), 'not all pages are retrieved')
+        self.assertTrue('Limit' not in ddb_resource.table.calls[0], 'page size is limited')
+        self.assertEqual('ingested_day-index', ddb_resource.table.calls[0]['IndexName'], 'wrong index')
+        self.assertEqual(6, len(ddb.get_from_index('uuid-index', {'uuid': 'job-1'})), 'not all pages are retrieved from index')
+        return
@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import unittest
+
+from parquet_flask.aws.aws_s3 import AwsS3
+
+
+class MockS3Body:
+    def __init__(self, content):
+        self.__content = content
+
+    def read(self):
+        return self.__content
+
+
+class MockS3Client:
+    def __init__(self, content):
+        self.__content = content
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        return {'ResponseMetadata': {'HTTPHeaders': {'content-length': str(len(self.__content))}}}
+
+    def get_object(self, Bucket, Key, Range):
+        start, end = [int(k) for k in Range.replace('bytes=', '').split('-')]
+        self.ranges.append((start, end))
+        return {'Body': MockS3Body(self.__content[start: end + 1])}
+
+
+class TestAwsS3(unittest.TestCase):
+    def setUp(self) -> None:
+        os.environ['s3_transfer_part_size_mb'] = '1'
+        os.environ['s3_transfer_max_concurrency'] = '3'
+        return
+
+    def tearDown(self) -> None:
+        os.environ.pop('s3_transfer_part_size_mb')
+        os.environ.pop('s3_transfer_max_concurrency')
+        return
+
+    def __download(self, s3_key, content):
+        s3 = AwsS3().set_s3_url(f's3://bucket/{s3_key}')
+        mock_client = MockS3Client(content)
+        s3._AwsS3__s3_client = mock_client
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_file_path, sha512 = s3.download_streaming(tmp_dir)
+            with open(local_file_path, 'rb') as ff:
+                downloaded = ff.read()
+        return local_file_path, sha512, downloaded, mock_client.ranges
+
+    def test_download_streaming(self):
+        content = os.urandom(5 * 1024 * 1024 + 10)
+        local_file_path, sha512, downloaded, ranges = self.__download('a/b.json', content)
+        self.assertTrue(local_file_path.endswith('b.json'), f'wrong file name: {local_file_path}')
+        self.assertEqual(content, downloaded, 'wrong content')
+        self.assertEqual(hashlib.sha512(content).hexdigest(), sha512, 'wrong sha512')
+        self.assertEqual(6, len(ranges), 'wrong number of parts')
+        return
+
+    def test_download_streaming_gzip(self):
+        content = b''.join([f'{{"index": {i}}}\n'.encode() for i in range(300000)])
+        zipped = gzip.compress(content[:1000]) + gzip.compress(content[1000:])  # multi-member gzip
+        local_file_path, sha512, downloaded, ranges = self.__download('a/b.json.gz', zipped)
+        self.assertTrue(local_file_path.endswith('b.json'), f'wrong file name: {local_file_path}')
+        self.assertEqual(content, downloaded, 'wrong unzipped content')
+        self.assertEqual(hashlib.sha512(zipped).hexdigest(), sha512, 'sha512 is not from gzipped file')
+        return
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from time import sleep, time
+from unittest.mock import patch
+
+from parquet_flask.io_logic.async_query_job import AsyncQueryJob
+from parquet_flask.utils.singleton import Singleton
+
+
+class MockQueryV4:
+    SPOOL_FORMATS = ['parquet', 'ndjson']
+
+    def __init__(self, props):
+        self.props = props
+
+    def spool(self, output_path, output_format='parquet'):
+        if self.props.provider == 'failing_provider':
+            raise ValueError('mock spark error')
+        os.makedirs(output_path)
+        for file_name in ['part-00000.parquet', 'part-00001.parquet', '_SUCCESS', '.part-00000.parquet.crc']:
+            with open(os.path.join(output_path, file_name), 'w') as ff:
+                ff.write('mock')
+        return True
+
+
+def create_query_json(provider='mock_provider'):
+    return {
+        'start_from': 0, 'size': 0, 'provider': provider,
+        'min_depth': -99, 'max_depth': 0, 'min_time': '2017-01-01T00:00:00Z', 'max_time': '2017-02-01T00:00:00Z',
+        'min_lat_lon': [-45, -90], 'max_lat_lon': [45, 90],
+    }
+
+
+def wait_for_job(async_query_job: AsyncQueryJob, job_id, timeout=5):
+    end_time = time() + timeout
+    while time() < end_time:
+        job_status = async_query_job.get_status(job_id)
+        if job_status['status'] in [AsyncQueryJob.DONE, AsyncQueryJob.FAILED]:
+            return job_status
+        sleep(0.01)
+    raise TimeoutError(f'job is not finished: {job_id}')
+
+
+class TestAsyncQueryJob(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.environ['query_spool_dir'] = self.tmp_dir.name
+        os.environ['async_query_result_ttl_seconds'] = '3600'
+        Singleton._instances.pop(AsyncQueryJob, None)
+        self.query_patcher = patch('parquet_flask.io_logic.async_query_job.QueryV4', MockQueryV4)
+        self.query_patcher.start()
+        return
+
+    def tearDown(self) -> None:
+        self.query_patcher.stop()
+        for k in ['query_spool_dir', 'async_query_result_ttl_seconds']:
+            os.environ.pop(k)
+        Singleton._instances.pop(AsyncQueryJob, None)
+        self.tmp_dir.cleanup()
+        return
+
+    def test_submit_and_result(self):
+        async_query_job = AsyncQueryJob()
+        job_id = async_query_job.submit(create_query_json(), 'ndjson')
+        job_status = wait_for_job(async_query_job, job_id)
+        self.assertEqual(AsyncQueryJob.DONE, job_status['status'], f'wrong status: {job_status}')
+        self.assertEqual('ndjson', job_status['format'], f'wrong format: {job_status}')
+        self.assertTrue(job_status['has_data'], f'wrong has_data: {job_status}')
+        self.assertEqual([('part-00000.parquet', None), ('part-00001.parquet', None)], async_query_job.get_result_files(job_id), 'markers are not excluded')
+        return
+
+    def test_failed_job(self):
+        async_query_job = AsyncQueryJob()
+        job_id = async_query_job.submit(create_query_json('failing_provider'))
+        job_status = wait_for_job(async_query_job, job_id)
+        self.assertEqual(AsyncQueryJob.FAILED, job_status['status'], f'wrong status: {job_status}')
+        self.assertEqual('mock spark error', job_status['details'], f'wrong details: {job_status}')
+        self.assertEqual([], async_query_job.get_result_files(job_id), 'failed job should not have files')
+        return
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            AsyncQueryJob().submit(create_query_json(), 'csv')
+        return
+
+    def test_unknown_job(self):
+        self.assertIsNone(AsyncQueryJob().get_status('unknown_job'), 'unknown job should be None')
+        return
+
+    def test_clean_up(self):
+        os.environ['async_query_result_ttl_seconds'] = '0'
+        Singleton._instances.pop(AsyncQueryJob, None)
+        async_query_job = AsyncQueryJob()
+        job_id = async_query_job.submit(create_query_json())
+        wait_for_job(async_query_job, job_id)
+        orphan_dir = os.path.join(self.tmp_dir.name, 'job_before_restart')
+        os.makedirs(orphan_dir)
+        old_time = time() - 10
+        for each_dir in [orphan_dir, async_query_job.get_output_path(job_id)]:
+            os.utime(each_dir, (old_time, old_time))
+        sleep(0.01)
+        async_query_job.clean_up(force=True)
+        self.assertIsNone(async_query_job.get_status(job_id), 'expired job is not removed')
+        self.assertEqual([], os.listdir(self.tmp_dir.name), 'expired spool is not deleted')
+        return
+
+    def test_clean_up_keeps_recent_jobs(self):
+        async_query_job = AsyncQueryJob()
+        job_id = async_query_job.submit(create_query_json())
+        wait_for_job(async_query_job, job_id)
+        old_time = time() - 7200
+        os.utime(async_query_job.get_output_path(job_id), (old_time, old_time))  # still kept since the job is not expired
+        async_query_job.clean_up(force=True)
+        self.assertEqual(AsyncQueryJob.DONE, async_query_job.get_status(job_id)['status'], 'recent job is removed')
+        self.assertEqual(2, len(async_query_job.get_result_files(job_id)), 'recent spool is deleted')
+        return
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from parquet_flask.io_logic.ingest_job_status import IngestJobStatus
+from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.singleton import Singleton
+
+
+class TestIngestJobStatus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        os.environ['ingest_queue_dir'] = self.__tmp_dir.name
+        Singleton._instances.pop(IngestWorkerPool, None)
+        return
+
+    def tearDown(self) -> None:
+        os.environ.pop('ingest_queue_dir')
+        Singleton._instances.pop(IngestWorkerPool, None)
+        self.__tmp_dir.cleanup()
+        return
+
+    def test_status_from_queue(self):
+        IngestWorkerPool()  # creating state directories
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.FAILED, 'job1.json'), {
+            'job_id': 'job1',
+            's3_url': 's3://bucket/key.json',
+            'records_total': 10,
+            'stage_timings': {'download': 5, 'validate': 3},
+            'response': {'message': 'failed to ingest to parquet', 'details': 'mock error'},
+        })
+        status = IngestJobStatus().get_status('job1')
+        self.assertEqual(IngestJobStatus.FAILED, status['status'], 'wrong status')
+        self.assertEqual(10, status['records_total'], 'wrong records_total')
+        self.assertTrue('stage' not in status, 'finished job should not have stage')
+        self.assertEqual({'download': 5, 'validate': 3}, status['stage_timings'], 'wrong stage_timings')
+        self.assertEqual('mock error', status['details'], 'wrong details')
+        return
+
+    def test_update_running_job(self):
+        IngestWorkerPool()
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.RUNNING, 'job1.json'), {'job_id': 'job1'})
+        IngestWorkerPool.update_running_job('job1', {'records_total': 10, 'stage': 'write', 'stage_timings': {'validate': 3}})
+        status = IngestJobStatus().get_status('job1')
+        self.assertEqual(IngestJobStatus.RUNNING, status['status'], 'wrong status')
+        self.assertEqual(10, status['records_total'], 'records_total is not updated')
+        self.assertEqual('write', status['stage'], 'stage is not updated')
+        self.assertEqual({'validate': 3}, status['stage_timings'], 'stage_timings is not updated')
+        return
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from parquet_flask.io_logic.ingest_new_file import IngestNewJsonFile
+
+
+class TestIngestNewJsonFile(unittest.TestCase):
+    """
+    appending delta with a stub spark session, data frames and JobPartitionDiff. check test_job_partition_diff for get_new_rows itself
+    """
+    def setUp(self) -> None:
+        self.new_df = MagicMock()
+        self.new_df.cache.return_value = self.new_df
+        self.job_partition_diff = MagicMock()
+        self.job_partition_diff.return_value.get_new_rows.return_value = self.new_df
+        self.patchers = [
+            patch('parquet_flask.io_logic.ingest_new_file.RetrieveSparkSession'),
+            patch('parquet_flask.io_logic.ingest_new_file.QueryResultCache'),
+            patch('parquet_flask.io_logic.ingest_new_file.JobPartitionDiff', self.job_partition_diff),
+            patch.object(IngestNewJsonFile, 'create_data_frame', return_value=MagicMock()),
+            patch.object(IngestNewJsonFile, 'create_df_writer'),
+        ]
+        self.mocks = [k.start() for k in self.patchers]
+        self.df_writer = self.mocks[-1]
+        return
+
+    def tearDown(self) -> None:
+        for each in self.patchers:
+            each.stop()
+        return
+
+    def __append(self, input_json: dict):
+        ingest_new_file = IngestNewJsonFile(True)
+        ingest_new_file.is_appending_delta = True
+        records_count = ingest_new_file.write_json_objects([input_json], 'job1')
+        return ingest_new_file, records_count
+
+    def test_append_new_rows(self):
+        self.new_df.count.return_value = 2
+        self.new_df.select.return_value.distinct.return_value.collect.return_value = [('p1', 'j1', '30'), ('p1', 'j1', '41')]
+        ingest_new_file, records_count = self.__append({'provider': 'p1', 'project': 'j1', 'observations': [{}, {}, {}]})
+        self.assertEqual(3, records_count, 'wrong number of records in the file')
+        self.assertEqual(2, ingest_new_file.appended_records, 'wrong appended_records')
+        self.assertEqual([('p1', 'j1', '30'), ('p1', 'j1', '41')], ingest_new_file.ingested_partitions, 'wrong ingested_partitions')
+        self.df_writer.assert_called_once_with(self.new_df)
+        self.df_writer.return_value.mode.assert_called_once_with('append')
+        self.assertTrue('diff' in ingest_new_file.stage_timings, 'diff timing is missing')
+        self.new_df.unpersist.assert_called_once()
+        return
+
+    def test_nothing_to_append(self):
+        self.new_df.count.return_value = 0
+        ingest_new_file, records_count = self.__append({'provider': 'p1', 'project': 'j1', 'observations': [{}, {}]})
+        self.assertEqual(0, ingest_new_file.appended_records, 'wrong appended_records')
+        self.assertEqual([], ingest_new_file.ingested_partitions, 'nothing should be ingested')
+        self.df_writer.assert_not_called()
+        self.new_df.unpersist.assert_called_once()
+        return
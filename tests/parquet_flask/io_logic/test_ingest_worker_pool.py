@@ -0,0 +1,151 @@
+import os
+import queue
+import tempfile
+import unittest
+from time import time
+from unittest.mock import patch
+
+from parquet_flask.io_logic.ingest_worker_pool import IngestWorkerPool
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.utils.singleton import Singleton
+
+
+class MockProcess:
+    def __init__(self, target, args, daemon):
+        self.pid = 1
+        self.exitcode = None
+
+    def start(self):
+        return
+
+    def is_alive(self):
+        return True
+
+
+class MockContext:
+    """
+    worker processes are not started. jobs are left in their task queues, and results are put into the result queue by tests.
+    """
+    def __init__(self):
+        self.result_queue = None
+
+    def Queue(self):
+        new_queue = queue.Queue()
+        if self.result_queue is None:
+            self.result_queue = new_queue  # created first by IngestWorkerPool.start
+        return new_queue
+
+    def Process(self, target, args, daemon):
+        return MockProcess(target, args, daemon)
+
+
+class MockThread:
+    def __init__(self, target, daemon):
+        return
+
+    def start(self):
+        return
+
+
+MB = 1024 * 1024
+
+
+class TestIngestWorkerPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        os.environ['ingest_queue_dir'] = self.__tmp_dir.name
+        os.environ['ingest_memory_budget_mb'] = '100'
+        os.environ['ingest_memory_factor'] = '10'
+        os.environ['ingest_max_workers'] = '3'
+        Singleton._instances.pop(IngestWorkerPool, None)
+        self.__mock_context = MockContext()
+        self.__patchers = [
+            patch('parquet_flask.io_logic.ingest_worker_pool.get_context', lambda method: self.__mock_context),
+            patch('parquet_flask.io_logic.ingest_worker_pool.Thread', MockThread),
+            patch('parquet_flask.io_logic.ingest_worker_pool.QueryResultCache'),
+        ]
+        for each in self.__patchers:
+            each.start()
+        return
+
+    def tearDown(self) -> None:
+        for each in self.__patchers:
+            each.stop()
+        for k in ['ingest_queue_dir', 'ingest_memory_budget_mb', 'ingest_memory_factor', 'ingest_max_workers',
+                  'ingest_job_retention_seconds', 'ingest_job_retention_count']:
+            os.environ.pop(k, None)
+        Singleton._instances.pop(IngestWorkerPool, None)
+        self.__tmp_dir.cleanup()
+        return
+
+    def __get_states(self, pool: IngestWorkerPool, job_ids: list):
+        return [pool.get_job(k)[0] for k in job_ids]
+
+    def test_requeue_running_jobs(self):
+        FileUtils.mk_dir_p(os.path.join(self.__tmp_dir.name, IngestWorkerPool.RUNNING))
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.RUNNING, 'job1.json'), {'job_id': 'job1', 'file_size': 10})
+        pool = IngestWorkerPool()
+        self.assertEqual(100 * 1024 * 1024, pool.memory_budget, 'wrong memory_budget')
+        state, job = pool.get_job('job1')
+        self.assertEqual(IngestWorkerPool.PENDING, state, 'running job is not queued again')
+        self.assertEqual({'job_id': 'job1', 'file_size': 10}, job, 'wrong job')
+        self.assertEqual((None, None), pool.get_job('job2'), 'unknown job is found')
+        return
+
+    def test_memory_budget_admission(self):
+        pool = IngestWorkerPool()
+        pool.submit({'job_id': 'job1', 'file_size': 6 * MB})  # 60 MB
+        pool.submit({'job_id': 'job2', 'file_size': 5 * MB})  # 50 MB. does not fit with job1
+        pool.submit({'job_id': 'job3', 'file_size': 1 * MB})  # 10 MB. fits, but waits for job2 to keep the order
+        pool.poll()
+        self.assertEqual([IngestWorkerPool.RUNNING, IngestWorkerPool.PENDING, IngestWorkerPool.PENDING],
+                         self.__get_states(pool, ['job1', 'job2', 'job3']), 'wrong states with 1 running job')
+        self.__mock_context.result_queue.put(('job1', {'code': 201, 'response': {'message': 'ingested'}}))
+        pool.poll()
+        self.assertEqual([IngestWorkerPool.DONE, IngestWorkerPool.RUNNING, IngestWorkerPool.RUNNING],
+                         self.__get_states(pool, ['job1', 'job2', 'job3']), 'wrong states after job1 is done')
+        return
+
+    def test_large_job_runs_alone(self):
+        pool = IngestWorkerPool()
+        pool.submit({'job_id': 'job1', 'file_size': 20 * MB})  # 200 MB. larger than the whole budget
+        pool.submit({'job_id': 'job2', 'file_size': 0})
+        pool.poll()
+        self.assertEqual([IngestWorkerPool.RUNNING, IngestWorkerPool.PENDING], self.__get_states(pool, ['job1', 'job2']),
+                         'large job should run when nothing else is running')
+        self.__mock_context.result_queue.put(('job1', {'code': 500, 'response': {'message': 'failed'}}))
+        pool.poll()
+        self.assertEqual([IngestWorkerPool.FAILED, IngestWorkerPool.RUNNING], self.__get_states(pool, ['job1', 'job2']),
+                         'wrong states after job1 failed')
+        return
+
+    def test_requeued_job_is_dispatched(self):
+        FileUtils.mk_dir_p(os.path.join(self.__tmp_dir.name, IngestWorkerPool.RUNNING))
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.RUNNING, 'job1.json'), {'job_id': 'job1', 'file_size': 10})
+        pool = IngestWorkerPool().start()
+        pool.poll()
+        state, job = pool.get_job('job1')
+        self.assertEqual(IngestWorkerPool.RUNNING, state, 'requeued job is not started')
+        self.assertTrue('started_at' in job, f'wrong job: {job}')
+        return
+
+    def test_clean_up(self):
+        os.environ['ingest_job_retention_seconds'] = '3600'
+        os.environ['ingest_job_retention_count'] = '2'
+        pool = IngestWorkerPool()
+        for i in range(4):
+            job_path = os.path.join(self.__tmp_dir.name, IngestWorkerPool.DONE, f'job{i}.json')
+            FileUtils.write_json(job_path, {'job_id': f'job{i}'})
+            os.utime(job_path, (time() - 10 + i, time() - 10 + i))
+        expired_path = os.path.join(self.__tmp_dir.name, IngestWorkerPool.FAILED, 'expired.json')
+        FileUtils.write_json(expired_path, {'job_id': 'expired'})
+        os.utime(expired_path, (time() - 7200, time() - 7200))
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.FAILED, 'recent.json'), {'job_id': 'recent'})
+        FileUtils.write_json(os.path.join(self.__tmp_dir.name, IngestWorkerPool.PENDING, 'pending.json'), {'job_id': 'pending', 'file_size': 0})
+        self.assertEqual(3, pool.clean_up(force=True), 'wrong number of deleted jobs')
+        self.assertEqual([None, None, IngestWorkerPool.DONE, IngestWorkerPool.DONE], self.__get_states(pool, [f'job{i}' for i in range(4)]),
+                         'oldest jobs beyond retention count are not deleted')
+        self.assertEqual([None, IngestWorkerPool.FAILED, IngestWorkerPool.PENDING], self.__get_states(pool, ['expired', 'recent', 'pending']),
+                         'wrong jobs are deleted by age')
+        self.assertEqual(0, pool.clean_up(), 'clean up should not run again within the interval')
+        return
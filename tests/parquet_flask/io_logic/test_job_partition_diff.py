@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from parquet_flask.io_logic.ingest_new_file import IngestNewJsonFile
+from parquet_flask.io_logic.job_partition_diff import JobPartitionDiff
+
+
+def create_fingerprint(platform_code, month, row_count, hash_sum):
+    partition_values = ('p1', 'j1', platform_code, 2018, month)
+    return tuple([str(k) for k in partition_values]), (row_count, hash_sum, partition_values)
+
+
+class TestJobPartitionDiff(unittest.TestCase):
+    def test_is_same_fingerprint(self):
+        self.assertTrue(JobPartitionDiff.is_same_fingerprint((10, 123, ('a',)), (10, 123, ('a',))), 'same fingerprint')
+        self.assertFalse(JobPartitionDiff.is_same_fingerprint((10, 123, ('a',)), (10, 124, ('a',))), 'different hash')
+        self.assertFalse(JobPartitionDiff.is_same_fingerprint((10, 123, ('a',)), (11, 123, ('a',))), 'different row count')
+        self.assertFalse(JobPartitionDiff.is_same_fingerprint((10, 123, ('a',)), None), 'new partition')
+        self.assertFalse(JobPartitionDiff.is_same_fingerprint((10, 123, ('a',)), (None, None, ('a',))), 'existing partition which cannot be compared')
+        return
+
+    def test_diff_fingerprints(self):
+        new_fingerprints = dict([
+            create_fingerprint('30', 1, 10, 100),  # unchanged
+            create_fingerprint('30', 2, 10, 200),  # changed
+            create_fingerprint('41', 1, 5, 300),  # new
+        ])
+        existing_fingerprints = dict([
+            create_fingerprint('30', 1, 10, 100),
+            create_fingerprint('30', 2, 10, 201),
+            create_fingerprint('42', 3, 7, 400),  # removed
+        ])
+        changed, removed = JobPartitionDiff.diff_fingerprints(new_fingerprints, existing_fingerprints)
+        self.assertEqual([('p1', 'j1', '30', 2018, 2), ('p1', 'j1', '41', 2018, 1)], changed, 'wrong changed partitions')
+        self.assertEqual([('p1', 'j1', '42', 2018, 3)], removed, 'wrong removed partitions')
+        return
+
+    def test_all_unchanged(self):
+        fingerprints = dict([create_fingerprint('30', 1, 10, 100), create_fingerprint('30', 2, 10, 200)])
+        self.assertEqual(([], []), JobPartitionDiff.diff_fingerprints(fingerprints, dict(fingerprints)), 'unchanged partitions are rewritten')
+        return
+
+    def test_all_removed(self):
+        existing_fingerprints = dict([create_fingerprint('30', 1, 10, 100), create_fingerprint('30', 2, 10, 200)])
+        changed, removed = JobPartitionDiff.diff_fingerprints({}, existing_fingerprints)
+        self.assertEqual([], changed, 'wrong changed partitions')
+        self.assertEqual([('p1', 'j1', '30', 2018, 1), ('p1', 'j1', '30', 2018, 2)], removed, 'wrong removed partitions')
+        return
+
+    def test_nothing_existing(self):
+        new_fingerprints = dict([create_fingerprint('30', 1, 10, 100)])
+        self.assertEqual(([('p1', 'j1', '30', 2018, 1)], []), JobPartitionDiff.diff_fingerprints(new_fingerprints, {}), 'new partitions are not changed')
+        return
+
+    def test_not_comparable(self):
+        new_fingerprints = dict([create_fingerprint('30', 1, 10, 100), create_fingerprint('30', 2, 10, 200)])
+        existing_partitions = dict([create_fingerprint('30', 1, None, None), create_fingerprint('30', 3, None, None)])
+        changed, removed = JobPartitionDiff.diff_fingerprints(new_fingerprints, existing_partitions)
+        self.assertEqual([('p1', 'j1', '30', 2018, 1), ('p1', 'j1', '30', 2018, 2)], changed, 'all partitions should be changed')
+        self.assertEqual([('p1', 'j1', '30', 2018, 3)], removed, 'wrong removed partitions')
+        return
+
+    def test_get_job_path(self):
+        job_path = JobPartitionDiff(None, 's3a://bucket/parquet').get_job_path('p1', 'j1', 'job1')
+        self.assertEqual('s3a://bucket/parquet/provider=p1/project=j1/platform_code=*/year=*/month=*/job_id=job1', job_path,
+                         'all platform codes of the job should be listed')
+        return
+
+
+@unittest.skipIf(shutil.which('java') is None, 'local spark needs java')
+class TestJobPartitionDiffSpark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        from pyspark.sql import SparkSession
+        cls.spark = SparkSession.builder.master('local[1]').appName('test_job_partition_diff').getOrCreate()
+        return
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.spark.stop()
+        return
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.parquet_name = os.path.join(self.tmp_dir.name, 'parquet')
+        return
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        return
+
+    @staticmethod
+    def __create_row(time, air_temperature, relative_humidity=None, platform_code='30'):
+        return {'time': time, 'latitude': 10.0, 'longitude': 20.0, 'depth': -99999.0, 'platform': {'code': platform_code},
+                'air_temperature': air_temperature, 'relative_humidity': relative_humidity}
+
+    def __create_df(self, rows: list):
+        return IngestNewJsonFile.create_data_frame(self.spark, rows, 'job1', 'p1', 'j1')
+
+    def test_get_new_rows(self):
+        existing_rows = [self.__create_row('2018-01-01T00:00:00Z', 10.0), self.__create_row('2018-01-01T01:00:00Z', 11.0)]
+        IngestNewJsonFile.create_df_writer(self.__create_df(existing_rows)).mode('append').parquet(self.parquet_name)
+        new_rows = existing_rows + [
+            self.__create_row('2018-01-01T00:00:00Z', None, 80.0),  # same row key, different observation
+            self.__create_row('2018-01-01T02:00:00Z', 12.0),
+        ]
+        new_df = JobPartitionDiff(self.spark, self.parquet_name).get_new_rows(self.__create_df(new_rows), 'job1')
+        self.assertEqual(sorted(new_df.columns), sorted(self.__create_df(new_rows).columns), 'hash column is not dropped')
+        self.assertEqual([('2018-01-01T00:00:00Z', None, 80.0), ('2018-01-01T02:00:00Z', 12.0, None)],
+                         sorted([(k['time'], k['air_temperature'], k['relative_humidity']) for k in new_df.collect()]),
+                         'rows sharing the row key are dropped, or written rows are appended again')
+        return
+
+    def test_get_new_rows_of_new_job(self):
+        new_df = JobPartitionDiff(self.spark, self.parquet_name).get_new_rows(self.__create_df([self.__create_row('2018-01-01T00:00:00Z', 10.0)]), 'job1')
+        self.assertEqual(1, new_df.count(), 'all rows of a new job are new')
+        return
+
+    def test_removed_platform(self):
+        existing_rows = [self.__create_row('2018-01-01T00:00:00Z', 10.0), self.__create_row('2018-02-01T00:00:00Z', 11.0, platform_code='41')]
+        IngestNewJsonFile.create_df_writer(self.__create_df(existing_rows)).mode('append').parquet(self.parquet_name)
+        job_partition_diff = JobPartitionDiff(self.spark, self.parquet_name)
+        changed, removed = job_partition_diff.diff_partitions(self.__create_df(existing_rows[:1]), 'job1')
+        self.assertEqual([], changed, 'unchanged platform is rewritten')
+        self.assertEqual([('p1', 'j1', '41', 2018, 2)], [(k[0], k[1], str(k[2]), int(k[3]), int(k[4])) for k in removed], 'platform which is not in the file is not removed')
+        job_partition_diff.delete_partitions(removed, 'job1')
+        self.assertEqual(['30'], [str(k[0]) for k in job_partition_diff.read_job_rows(self.__create_df(existing_rows[:1]), 'job1').select('platform_code').distinct().collect()],
+                         'rows of the removed platform are not deleted')
+        return
+
+    def test_get_new_rows_with_new_column(self):
+        existing_rows = [self.__create_row('2018-01-01T00:00:00Z', 10.0), self.__create_row('2018-01-01T01:00:00Z', 11.0)]
+        IngestNewJsonFile.create_df_writer(self.__create_df(existing_rows)).mode('append').parquet(self.parquet_name)
+        new_rows = [{**k, 'sea_water_temperature': None} for k in existing_rows]
+        new_rows[1]['sea_water_temperature'] = 20.0
+        new_df = JobPartitionDiff(self.spark, self.parquet_name).get_new_rows(self.__create_df(new_rows), 'job1')
+        self.assertEqual([('2018-01-01T01:00:00Z', 20.0)], [(k['time'], k['sea_water_temperature']) for k in new_df.collect()],
+                         'new column is not compared, or its null values are different from the written rows')
+        return
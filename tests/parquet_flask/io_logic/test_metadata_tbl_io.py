@@ -0,0 +1,17 @@
+import unittest
+from unittest.mock import patch
+
+from parquet_flask.io_logic.metadata_tbl_io import MetadataTblIO
+
+
+class TestMetadataTblIO(unittest.TestCase):
+    @patch('parquet_flask.io_logic.metadata_tbl_io.AwsDdb')
+    def test_query_by_date_range(self, mock_ddb):
+        mock_ddb.return_value.query_index_range.side_effect = lambda index_name, hash_key, hash_val, range_key, range_start, range_end: [{'ingested_day': hash_val}]
+        start_time = 1640995200000 + 23 * 3600 * 1000  # 2022-01-01T23:00:00Z
+        end_time = 1640995200000 + 2 * 86400 * 1000 + 3600 * 1000  # 2022-01-03T01:00:00Z
+        records = MetadataTblIO().query_by_date_range(start_time, end_time)
+        self.assertEqual(['2022-01-01', '2022-01-02', '2022-01-03'], [k['ingested_day'] for k in records], 'wrong days')
+        query_args = mock_ddb.return_value.query_index_range.call_args_list[0][0]
+        self.assertEqual(('ingested_day-index', 'ingested_day', '2022-01-01', 'ingested_date', start_time, end_time), query_args, 'wrong query')
+        return
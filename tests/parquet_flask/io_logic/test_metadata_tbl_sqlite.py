@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from parquet_flask.io_logic.metadata_tbl_factory import MetadataTblFactory
+from parquet_flask.io_logic.metadata_tbl_sqlite import MetadataTblSqlite
+
+
+class TestMetadataTblSqlite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        os.environ['metadata_tbl_sqlite_path'] = os.path.join(self.__tmp_dir.name, 'metadata.sqlite')
+        return
+
+    def tearDown(self) -> None:
+        os.environ.pop('metadata_tbl_sqlite_path')
+        self.__tmp_dir.cleanup()
+        return
+
+    @staticmethod
+    def __get_record(index, job_id='job-1'):
+        return {'s3_url': f's3://bucket/{index}.json', 'uuid': job_id, 'ingested_date': 1000 + index, 'records_count': index}
+
+    def test_insert_replace(self):
+        db_io = MetadataTblFactory().get_instance(MetadataTblFactory.SQLITE)
+        self.assertTrue(isinstance(db_io, MetadataTblSqlite), 'wrong instance')
+        db_io.insert_record(self.__get_record(1))
+        self.assertEqual(self.__get_record(1), db_io.get_by_s3_url('s3://bucket/1.json'), 'wrong record')
+        self.assertEqual(None, db_io.get_by_s3_url('s3://bucket/2.json'), 'missing record is found')
+        with self.assertRaises(ValueError):
+            db_io.insert_record(self.__get_record(1))
+        with self.assertRaises(ValueError):
+            db_io.replace_record(self.__get_record(2))
+        db_io.replace_record(self.__get_record(1, 'job-2'))
+        self.assertEqual('job-2', MetadataTblSqlite().get_by_s3_url('s3://bucket/1.json')['uuid'], 'record is not replaced')
+        return
+
+    def test_queries(self):
+        db_io = MetadataTblSqlite()
+        failed = db_io.write_records([self.__get_record(k, f'job-{k % 2}') for k in range(1000)], False)
+        self.assertEqual([], failed, 'failed to write records')
+        failed = db_io.write_records([self.__get_record(5), self.__get_record(1001)], True)
+        self.assertEqual(['s3://bucket/1001.json'], [k['s3_url'] for k in failed], 'wrong failed records')
+        self.assertEqual(500, len(db_io.get_by_uuid('job-1')), 'wrong records by uuid')
+        found = db_io.get_by_s3_urls([f's3://bucket/{k}.json' for k in range(995, 1005)])
+        self.assertEqual(set([f's3://bucket/{k}.json' for k in range(995, 1000)]), set(found.keys()), 'wrong records by s3 urls')
+        in_range = db_io.query_by_date_range(1010, 1019)
+        self.assertEqual(list(range(1010, 1020)), [k['ingested_date'] for k in in_range], 'wrong records by date range')
+        db_io.delete_records([f's3://bucket/{k}.json' for k in range(0, 1000, 2)] + ['s3://bucket/1001.json'])
+        self.assertEqual([], db_io.get_by_uuid('job-0'), 'records are not deleted')
+        self.assertEqual(500, len(db_io.get_by_uuid('job-1')), 'other records are deleted')
+        return
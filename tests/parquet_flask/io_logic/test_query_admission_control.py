@@ -0,0 +1,41 @@
+import os
+import unittest
+
+from parquet_flask.io_logic.partitioned_parquet_path import PartitionedParquetPath
+from parquet_flask.io_logic.query_admission_control import QueryAdmissionControl
+from parquet_flask.utils.singleton import Singleton
+
+
+class TestQueryAdmissionControl(unittest.TestCase):
+    def setUp(self) -> None:
+        os.environ['query_max_concurrent_jobs'] = '2'
+        os.environ['query_max_queued_jobs'] = '0'
+        os.environ['query_admission_wait_seconds'] = '0.1'
+        os.environ['query_bulk_partition_threshold'] = '2'
+        Singleton._instances.pop(QueryAdmissionControl, None)
+        return
+
+    def tearDown(self) -> None:
+        for k in ['query_max_concurrent_jobs', 'query_max_queued_jobs', 'query_admission_wait_seconds', 'query_bulk_partition_threshold']:
+            os.environ.pop(k)
+        Singleton._instances.pop(QueryAdmissionControl, None)
+        return
+
+    def test_acquire(self):
+        admission_control = QueryAdmissionControl()
+        self.assertTrue(admission_control.acquire(), 'first query is rejected')
+        self.assertTrue(admission_control.acquire(), 'second query is rejected')
+        self.assertFalse(admission_control.acquire(), 'third query is admitted')
+        self.assertEqual(2, admission_control.running_jobs, 'wrong running_jobs')
+        admission_control.release()
+        self.assertTrue(admission_control.acquire(), 'query is rejected after release')
+        return
+
+    def test_get_scheduler_pool(self):
+        admission_control = QueryAdmissionControl()
+        base_path = PartitionedParquetPath('my_base').set_provider('p1').set_project('j1')
+        self.assertEqual(QueryAdmissionControl.BULK_POOL, admission_control.get_scheduler_pool([], 10), 'whole parquet scan')
+        self.assertEqual(QueryAdmissionControl.INTERACTIVE_POOL, admission_control.get_scheduler_pool([base_path], 10), 'small scan')
+        self.assertEqual(QueryAdmissionControl.BULK_POOL, admission_control.get_scheduler_pool([base_path] * 3, 10), 'many partitions')
+        self.assertEqual(QueryAdmissionControl.BULK_POOL, admission_control.get_scheduler_pool([base_path], 20000), 'large page')
+        return
@@ -0,0 +1,42 @@
+import os
+import unittest
+from time import perf_counter
+
+from tests.bench_mark.bench_query_planner import BenchQueryPlanner
+
+
+class TestQueryPlannerBench(unittest.TestCase):
+    """
+    Light version of tests.bench_mark.bench_query_planner.
+    Path counts are exact. Wall-clock time limits depend on the machine load,
+    so they are only checked with `run_bench_mark_tests=true`.
+    """
+    def test_path_counts(self):
+        for scenario_name, (props, expected_paths) in BenchQueryPlanner.get_scenarios().items():
+            paths, _ = BenchQueryPlanner.plan(props)
+            self.assertEqual(expected_paths, len(paths), f'wrong number of paths for {scenario_name}')
+            self.assertEqual(len(paths), len(set(paths)), f'duplicated paths for {scenario_name}')
+        return
+
+    @unittest.skipUnless(os.environ.get('run_bench_mark_tests', 'false').strip().lower() == 'true', 'timing test. set run_bench_mark_tests=true to run it')
+    def test_planning_time(self):
+        time_limits = {
+            'single_platform_month': 0.05,
+            'fifty_platforms_decade': 1,
+            'two_hundred_platforms_decade': 3,
+        }
+        scenarios = BenchQueryPlanner.get_scenarios()
+        for scenario_name, time_limit in time_limits.items():
+            start_time = perf_counter()
+            BenchQueryPlanner.plan(scenarios[scenario_name][0])
+            duration = perf_counter() - start_time
+            self.assertTrue(duration < time_limit, f'{scenario_name} took {duration:.3f} s. limit: {time_limit} s')
+        return
+
+    def test_compare(self):
+        baseline = {'mock_scenario': {'paths': 10, 'median_ms': 1.0}}
+        self.assertEqual([], BenchQueryPlanner.compare({'mock_scenario': {'paths': 10, 'median_ms': 1.4}}, baseline, 1.5), 'not a regression')
+        self.assertEqual(1, len(BenchQueryPlanner.compare({'mock_scenario': {'paths': 10, 'median_ms': 1.6}}, baseline, 1.5)), 'slower')
+        self.assertEqual(1, len(BenchQueryPlanner.compare({'mock_scenario': {'paths': 11, 'median_ms': 1.0}}, baseline, 1.5)), 'more paths')
+        self.assertEqual([], BenchQueryPlanner.compare({'new_scenario': {'paths': 11, 'median_ms': 9.0}}, baseline, 1.5), 'not in baseline')
+        return
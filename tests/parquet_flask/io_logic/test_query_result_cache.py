@@ -0,0 +1,83 @@
+import os
+import unittest
+from time import sleep
+
+from parquet_flask.io_logic.partitioned_parquet_path import PartitionedParquetPath
+from parquet_flask.io_logic.query_result_cache import QueryResultCache
+from parquet_flask.utils.singleton import Singleton
+
+
+class TestQueryResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        os.environ['query_cache_max_entries'] = '2'
+        os.environ['query_cache_max_bytes'] = '1000'
+        os.environ['query_cache_ttl_seconds'] = '300'
+        Singleton._instances.pop(QueryResultCache, None)
+        return
+
+    def tearDown(self) -> None:
+        for k in ['query_cache_max_entries', 'query_cache_max_bytes', 'query_cache_ttl_seconds']:
+            os.environ.pop(k)
+        Singleton._instances.pop(QueryResultCache, None)
+        return
+
+    def test_gen_key(self):
+        first = QueryResultCache.gen_key({'start_from': 0, 'size': 10, 'platform_code': ['30', '3B'], 'min_time': '2018-03-03T00:00:00Z'})
+        second = QueryResultCache.gen_key({'min_time': '2018-03-03T00:00:00Z', 'platform_code': ['3B', '30'], 'size': 10, 'start_from': 0})
+        third = QueryResultCache.gen_key({'start_from': 0, 'size': 10, 'platform_code': ['30', '3B'], 'min_time': '2018-03-04T00:00:00Z'})
+        self.assertEqual(first, second, 'same query with different ordering')
+        self.assertNotEqual(first, third, 'different cursor')
+        fourth = QueryResultCache.gen_key({'start_from': 0, 'size': 10, 'platform_code': ['30', '3B'], 'min_time': '2018-03-03T00:00:00Z', 'timeout': 5})
+        self.assertEqual(first, fourth, 'timeout should not be in the key')
+        fifth = QueryResultCache.gen_key({'start_from': 0, 'size': 10, 'platform_code': ['30', '3B'], 'min_time': '2018-03-03T00:00:00Z', 'timeout': 5, 'partial_result': True})
+        self.assertNotEqual(first, fifth, 'partial_result pages have no total. it should be in the key')
+        return
+
+    def test_partial_page(self):
+        cache = QueryResultCache()
+        self.assertFalse(cache.put('a', {'total': 1, 'results': [{'a': 1}], 'partial': True}, [(None, None, None)]), 'partial page is cached')
+        self.assertIsNone(cache.get('a'), 'partial page is returned')
+        self.assertTrue(cache.put('a', {'total': 1, 'results': [{'a': 1}], 'partial': False}, [(None, None, None)]), 'complete page is not cached')
+        return
+
+    def test_lru(self):
+        cache = QueryResultCache()
+        cache.put('a', {'total': 1, 'results': [{'a': 1}]}, [(None, None, None)])
+        cache.put('b', {'total': 1, 'results': [{'b': 1}]}, [(None, None, None)])
+        self.assertEqual(cache.get('a'), {'total': 1, 'results': [{'a': 1}]}, 'wrong cached result')
+        cache.put('c', {'total': 1, 'results': [{'c': 1}]}, [(None, None, None)])
+        self.assertEqual(2, len(cache), 'wrong length')
+        self.assertIsNone(cache.get('b'), 'least recently used is not evicted')
+        self.assertIsNotNone(cache.get('a'), 'recently used is evicted')
+        self.assertFalse(cache.put('d', {'total': 1, 'results': ['d' * 1000]}, []), 'caching page larger than max bytes')
+        return
+
+    def test_returned_copy(self):
+        cache = QueryResultCache()
+        cache.put('a', {'total': 1, 'results': [{'a': 1}]}, [(None, None, None)])
+        cache.get('a')['next'] = 'mock_url'
+        self.assertEqual(cache.get('a'), {'total': 1, 'results': [{'a': 1}]}, 'cached result is mutated')
+        return
+
+    def test_ttl(self):
+        os.environ['query_cache_ttl_seconds'] = '0.1'
+        cache = QueryResultCache()
+        cache.put('a', {'total': 1, 'results': []}, [(None, None, None)])
+        sleep(0.2)
+        self.assertIsNone(cache.get('a'), 'expired page is returned')
+        self.assertEqual(0, cache.current_bytes, 'wrong current bytes')
+        return
+
+    def test_invalidate_partitions(self):
+        cache = QueryResultCache()
+        base_path = PartitionedParquetPath('my_base').set_provider('p1').set_project('j1')
+        cache.put('a', {'total': 1, 'results': []}, cache.gen_partition_tags([base_path.duplicate().set_platform('30'), base_path.duplicate().set_platform('41')]))
+        cache.put('b', {'total': 1, 'results': []}, cache.gen_partition_tags([base_path.duplicate().set_platform('42')]))
+        self.assertEqual(0, cache.invalidate_partitions([('p1', 'j1', '3B')]), 'evicting unrelated pages')
+        self.assertEqual(1, cache.invalidate_partitions([('p1', 'j1', '41')]), 'not evicting related page')
+        self.assertIsNone(cache.get('a'), 'related page is not evicted')
+        self.assertIsNotNone(cache.get('b'), 'unrelated page is evicted')
+        cache.put('c', {'total': 1, 'results': []}, cache.gen_partition_tags([]))
+        self.assertEqual(1, cache.invalidate_partitions([('p2', 'j2', '3B')]), 'full scan page should match any partitions')
+        self.assertIsNotNone(cache.get('b'), 'unrelated page is evicted')
+        return
@@ -0,0 +1,103 @@
+import unittest
+from time import sleep
+from unittest.mock import patch
+
+from parquet_flask.io_logic.query_metrics import QueryMetrics
+from parquet_flask.io_logic.query_timing import QueryTiming
+from parquet_flask.utils.singleton import Singleton
+
+
+class MockJobInfo:
+    def __init__(self, stage_ids):
+        self.stageIds = stage_ids
+
+
+class MockStatusTracker:
+    def getJobIdsForGroup(self, job_group):
+        return [3, 2] if job_group == 'mock_group' else []
+
+    def getJobInfo(self, job_id):
+        return MockJobInfo([job_id * 10, job_id * 10 + 1])
+
+
+class MockSparkContext:
+    uiWebUrl = 'http://localhost:4040'
+    applicationId = 'mock_app'
+
+    def statusTracker(self):
+        return MockStatusTracker()
+
+
+class MockResponse:
+    status_code = 200
+
+    def __init__(self, url):
+        self.__stage_id = int(url.split('/')[-1])
+
+    def json(self):
+        return [{'inputBytes': self.__stage_id}, {'inputBytes': 1}]
+
+
+class TestQueryTiming(unittest.TestCase):
+    def test_phases(self):
+        timing = QueryTiming()
+        with timing.phase('planning'):
+            sleep(0.01)
+        timing.add_phase('count', 0.5)
+        timing.add_phase('count', 0.25)
+        self.assertTrue(timing.phases['planning'] >= 0.01, f'wrong planning: {timing.phases}')
+        self.assertEqual(0.75, timing.phases['count'], f'durations of the same phase are not added')
+        timing.finish()
+        total = timing.total
+        sleep(0.01)
+        self.assertEqual(total, timing.finish().total, f'total changed after finish')
+        timing_dict = timing.to_dict()
+        self.assertEqual(750, timing_dict['phases']['count'], f'wrong ms: {timing_dict}')
+        self.assertEqual(['planning', 'count'], list(timing_dict['phases'].keys()), f'wrong order: {timing_dict}')
+        server_timing = timing.to_server_timing().split(', ')
+        self.assertEqual('count;dur=750.0', server_timing[1], f'wrong server timing: {server_timing}')
+        self.assertTrue(server_timing[-1].startswith('total;dur='), f'missing total: {server_timing}')
+        return
+
+    def test_phase_with_exception(self):
+        timing = QueryTiming()
+        with self.assertRaises(ValueError):
+            with timing.phase('retrieval'):
+                raise ValueError('mock error')
+        self.assertTrue('retrieval' in timing.phases, f'failed phase is not recorded')
+        return
+
+    def test_collect_spark_stats(self):
+        timing = QueryTiming()
+        with patch('parquet_flask.io_logic.query_timing.requests.get', side_effect=lambda url, timeout: MockResponse(url)) as mock_get:
+            timing.collect_spark_stats(MockSparkContext(), 'mock_group')
+        self.assertEqual([2, 3], timing.spark_job_ids, f'wrong job ids')
+        self.assertEqual(20 + 21 + 30 + 31 + 4, timing.bytes_read, f'wrong bytes_read')
+        self.assertEqual(4, mock_get.call_count, f'wrong number of stage requests')
+        return
+
+    def test_collect_spark_stats_failure(self):
+        timing = QueryTiming()
+        with patch('parquet_flask.io_logic.query_timing.requests.get', side_effect=ConnectionError('mock error')):
+            timing.collect_spark_stats(MockSparkContext(), 'mock_group')
+        self.assertEqual([2, 3], timing.spark_job_ids, f'wrong job ids')
+        self.assertEqual(None, timing.bytes_read, f'bytes_read should be unknown')
+        return
+
+
+class TestQueryMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        Singleton._instances.pop(QueryMetrics, None)
+        return
+
+    def test_observe(self):
+        timing = QueryTiming()
+        timing.add_phase('count', 0.2)
+        timing.files_scanned = 12
+        QueryMetrics().observe('mock_endpoint', 200, timing.finish())
+        exported = QueryMetrics().export().decode()
+        self.assertTrue('parquet_query_phase_seconds_count{endpoint="mock_endpoint",phase="count"} 1.0' in exported, f'missing phase: {exported}')
+        self.assertTrue('parquet_query_seconds_count{endpoint="mock_endpoint",status="200"} 1.0' in exported, f'missing total: {exported}')
+        self.assertTrue('parquet_query_files_scanned_sum{endpoint="mock_endpoint"} 12.0' in exported, f'missing files: {exported}')
+        self.assertTrue('parquet_query_bytes_read_count{endpoint="mock_endpoint"}' not in exported, f'unknown bytes are recorded: {exported}')
+        return
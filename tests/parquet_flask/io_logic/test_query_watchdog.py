@@ -0,0 +1,39 @@
+import unittest
+from time import sleep, time
+
+from parquet_flask.io_logic.query_watchdog import QueryWatchdog
+
+
+class MockSparkContext:
+    def __init__(self):
+        self.cancelled_groups = []
+
+    def cancelJobGroup(self, group_id):
+        self.cancelled_groups.append(group_id)
+        return
+
+
+class TestQueryWatchdog(unittest.TestCase):
+    def test_deadline(self):
+        spark_context = MockSparkContext()
+        with QueryWatchdog(spark_context, 'group_1', deadline=time() + 0.1, poll_interval=0.05) as watchdog:
+            sleep(0.3)
+        self.assertEqual(QueryWatchdog.DEADLINE, watchdog.cancel_reason, 'wrong cancel reason')
+        self.assertEqual(['group_1'], spark_context.cancelled_groups, 'job group is not cancelled')
+        return
+
+    def test_disconnected(self):
+        spark_context = MockSparkContext()
+        with QueryWatchdog(spark_context, 'group_1', disconnect_check=lambda: True, poll_interval=0.05) as watchdog:
+            sleep(0.2)
+        self.assertEqual(QueryWatchdog.DISCONNECTED, watchdog.cancel_reason, 'wrong cancel reason')
+        return
+
+    def test_finished_in_time(self):
+        spark_context = MockSparkContext()
+        with QueryWatchdog(spark_context, 'group_1', deadline=time() + 10, disconnect_check=lambda: False, poll_interval=0.05) as watchdog:
+            sleep(0.1)
+        sleep(0.1)
+        self.assertFalse(watchdog.is_cancelled, 'query is cancelled')
+        self.assertEqual([], spark_context.cancelled_groups, 'job group is cancelled')
+        return
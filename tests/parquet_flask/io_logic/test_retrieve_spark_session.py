@@ -0,0 +1,141 @@
+import unittest
+from threading import Event, Thread
+from time import time
+from unittest.mock import patch
+
+from parquet_flask.io_logic.retrieve_spark_session import RetrieveSparkSession
+from parquet_flask.utils.singleton import Singleton
+
+
+class MockJavaSparkContext:
+    def __init__(self, spark):
+        self.__spark = spark
+
+    def sc(self):
+        return self
+
+    def isStopped(self):
+        return self.__spark.is_stopped
+
+
+class MockSparkContext:
+    def __init__(self, spark):
+        self._jsc = MockJavaSparkContext(spark)
+
+
+class MockSparkSession:
+    def __init__(self):
+        self.is_stopped = False
+        self.sparkContext = MockSparkContext(self)
+
+    def stop(self):
+        self.is_stopped = True
+        return
+
+
+class MockBuilder:
+    def appName(self, name):
+        return self
+
+    def config(self, conf):
+        return self
+
+    def master(self, master):
+        return self
+
+    def getOrCreate(self):
+        return MockSparkSession()
+
+
+class MockSparkSessionClass:
+    builder = MockBuilder()
+
+
+class MockSlowBuilder(MockBuilder):
+    started = Event()
+    finishing = Event()
+
+    def getOrCreate(self):
+        self.started.set()
+        self.finishing.wait(5)
+        return MockSparkSession()
+
+
+class MockSlowSparkSessionClass:
+    builder = MockSlowBuilder()
+
+
+class MockDeadSparkContext:
+    @property
+    def _jsc(self):
+        raise ConnectionRefusedError('mock py4j gateway is gone')
+
+
+class TestRetrieveSparkSession(unittest.TestCase):
+    def setUp(self) -> None:
+        Singleton._instances.pop(RetrieveSparkSession, None)
+        return
+
+    def tearDown(self) -> None:
+        Singleton._instances.pop(RetrieveSparkSession, None)
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.SparkSession', MockSparkSessionClass)
+    def test_rebuild_dead_session(self):
+        retriever = RetrieveSparkSession()
+        spark = retriever.retrieve_spark_session('app', 'local')
+        self.assertTrue(spark is retriever.retrieve_spark_session('app', 'local'), 'live session is not reused')
+        spark.is_stopped = True
+        new_spark = retriever.retrieve_spark_session('app', 'local')
+        self.assertFalse(spark is new_spark, 'dead session is reused')
+        metrics = retriever.get_session_metrics()
+        self.assertEqual(1, metrics['total_rebuild_count'], 'wrong total_rebuild_count')
+        self.assertTrue(metrics['sessions'][0]['is_alive'], 'rebuilt session is not alive')
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.SparkSession', MockSparkSessionClass)
+    def test_execute_with_retry(self):
+        retriever = RetrieveSparkSession()
+        used_sessions = []
+
+        def die_once(spark):
+            used_sessions.append(spark)
+            if len(used_sessions) == 1:
+                spark.is_stopped = True
+                raise ConnectionError('mock executor lost')
+            return 'done'
+        self.assertEqual('done', retriever.execute_with_retry('app', 'local', die_once), 'not retried')
+        self.assertEqual(2, len(used_sessions), 'wrong attempt count')
+
+        def fail_on_live_session(spark):
+            raise ValueError('mock query error')
+        with self.assertRaises(ValueError, msg='error on live session is retried'):
+            retriever.execute_with_retry('app', 'local', fail_on_live_session)
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.SparkSession', MockSlowSparkSessionClass)
+    def test_metrics_while_creating(self):
+        retriever = RetrieveSparkSession()
+        creating_thread = Thread(target=retriever.retrieve_spark_session, args=('app', 'local'), daemon=True)
+        creating_thread.start()
+        self.assertTrue(MockSlowBuilder.started.wait(5), 'session creation is not started')
+        start_time = time()
+        metrics = retriever.get_session_metrics()
+        self.assertTrue(time() - start_time < 1, 'metrics are blocked by session creation')
+        self.assertEqual(RetrieveSparkSession.CREATING, metrics['sessions'][0]['status'], f'wrong status: {metrics}')
+        self.assertFalse(metrics['sessions'][0]['is_alive'], f'session is alive while creating: {metrics}')
+        self.assertIsNone(metrics['sessions'][0]['age_seconds'], f'age of a session being created: {metrics}')
+        MockSlowBuilder.finishing.set()
+        creating_thread.join(5)
+        metrics = retriever.get_session_metrics()
+        self.assertEqual(RetrieveSparkSession.ALIVE, metrics['sessions'][0]['status'], f'wrong status after creation: {metrics}')
+        return
+
+    def test_is_session_alive(self):
+        spark = MockSparkSession()
+        self.assertTrue(RetrieveSparkSession.is_session_alive(spark), 'live session')
+        spark.stop()
+        self.assertFalse(RetrieveSparkSession.is_session_alive(spark), 'stopped session')
+        spark.sparkContext = MockDeadSparkContext()
+        self.assertFalse(RetrieveSparkSession.is_session_alive(spark), 'session with unreachable gateway')
+        return
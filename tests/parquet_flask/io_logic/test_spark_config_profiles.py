@@ -0,0 +1,29 @@
+import os
+import unittest
+
+from parquet_flask.io_logic.spark_config_profiles import SparkConfigProfiles
+
+
+class TestSparkConfigProfiles(unittest.TestCase):
+    def tearDown(self) -> None:
+        os.environ.pop('spark_config_profiles', None)
+        return
+
+    def test_default_profiles(self):
+        profiles = SparkConfigProfiles()
+        self.assertEqual(['interactive-query', 'bulk-query', 'ingest', 'compaction'], profiles.profile_names, 'wrong profile names')
+        self.assertEqual('dynamic', profiles.get_profile(SparkConfigProfiles.INGEST)['spark.sql.sources.partitionOverwriteMode'], 'ingest is not overwriting dynamically')
+        self.assertTrue('spark.sql.sources.partitionOverwriteMode' not in profiles.get_profile(SparkConfigProfiles.INTERACTIVE_QUERY), 'ingest setting in interactive-query')
+        self.assertRaises(ValueError, profiles.get_profile, 'unknown')
+        return
+
+    def test_overrides(self):
+        os.environ['spark_config_profiles'] = '{"ingest": {"spark.sql.shuffle.partitions": "4"}, "unknown": {"a": "b"}}'
+        profiles = SparkConfigProfiles()
+        ingest_profile = profiles.get_profile(SparkConfigProfiles.INGEST)
+        self.assertEqual('4', ingest_profile['spark.sql.shuffle.partitions'], 'override is not applied')
+        self.assertEqual('dynamic', ingest_profile['spark.sql.sources.partitionOverwriteMode'], 'default is removed by override')
+        self.assertEqual(4, len(profiles.profile_names), 'unknown profile is added')
+        ingest_profile['spark.sql.shuffle.partitions'] = '1'
+        self.assertEqual('4', profiles.get_profile(SparkConfigProfiles.INGEST)['spark.sql.shuffle.partitions'], 'profile is not copied')
+        return
@@ -0,0 +1,116 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from pyspark.sql.utils import AnalysisException
+
+from parquet_flask.io_logic.spark_warm_up import SparkWarmUp
+from parquet_flask.utils.singleton import Singleton
+
+
+class MockDataFrame:
+    def __init__(self, read_error):
+        self.__read_error = read_error
+
+    def schema(self, *args):
+        return self
+
+    def parquet(self, *args):
+        if self.__read_error is not None:
+            raise self.__read_error
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def collect(self):
+        return []
+
+
+class MockSpark:
+    def __init__(self, read_error=None):
+        self.read = MockDataFrame(read_error)
+
+
+class MockRetrieveSparkSession:
+    session_errors = []
+    read_error = None
+    calls = 0
+
+    def retrieve_spark_session(self, app_name, master_spark):
+        MockRetrieveSparkSession.calls += 1
+        if len(self.session_errors) > 0:
+            raise self.session_errors.pop(0)
+        return MockSpark(self.read_error)
+
+
+class TestSparkWarmUp(unittest.TestCase):
+    def setUp(self) -> None:
+        os.environ['spark_warm_up_max_backoff_seconds'] = '4'
+        MockRetrieveSparkSession.session_errors = []
+        MockRetrieveSparkSession.read_error = None
+        MockRetrieveSparkSession.calls = 0
+        return
+
+    def tearDown(self) -> None:
+        os.environ.pop('spark_warm_up', None)
+        os.environ.pop('spark_warm_up_max_backoff_seconds', None)
+        Singleton._instances.pop(SparkWarmUp, None)
+        return
+
+    def test_disabled(self):
+        os.environ['spark_warm_up'] = 'FALSE'
+        Singleton._instances.pop(SparkWarmUp, None)
+        warm_up = SparkWarmUp().start()
+        self.assertTrue(warm_up.is_ready, 'disabled warm up is not ready')
+        self.assertEqual({'status': SparkWarmUp.READY, 'timings': {}, 'attempts': 0}, warm_up.get_status(), 'wrong status')
+        return
+
+    def test_not_started(self):
+        os.environ['spark_warm_up'] = 'true'
+        Singleton._instances.pop(SparkWarmUp, None)
+        warm_up = SparkWarmUp()
+        self.assertFalse(warm_up.is_ready, 'warm up is ready before starting')
+        self.assertEqual(SparkWarmUp.NOT_STARTED, warm_up.get_status()['status'], 'wrong status')
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.RetrieveSparkSession', MockRetrieveSparkSession)
+    @patch('parquet_flask.io_logic.spark_warm_up.sleep')
+    def test_retry(self, mock_sleep):
+        os.environ['spark_warm_up'] = 'true'
+        Singleton._instances.pop(SparkWarmUp, None)
+        MockRetrieveSparkSession.session_errors = [ConnectionError('master is not up')] * 4
+        warm_up = SparkWarmUp().start()
+        self.assertTrue(warm_up.is_ready, 'not ready after retrying')
+        self.assertEqual(5, warm_up.get_status()['attempts'], 'wrong attempts')
+        self.assertTrue('details' not in warm_up.get_status(), 'error of earlier attempts is still in status')
+        self.assertEqual([1, 2, 4, 4], [k[0][0] for k in mock_sleep.call_args_list], 'wrong backoff')
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.RetrieveSparkSession', MockRetrieveSparkSession)
+    @patch('parquet_flask.io_logic.spark_warm_up.sleep')
+    def test_missing_path(self, mock_sleep):
+        os.environ['spark_warm_up'] = 'true'
+        Singleton._instances.pop(SparkWarmUp, None)
+        MockRetrieveSparkSession.read_error = AnalysisException(message='[PATH_NOT_FOUND] Path does not exist: file:/tmp/parquet.')
+        warm_up = SparkWarmUp().start()
+        self.assertTrue(warm_up.is_ready, 'missing parquet path should be ready')
+        self.assertEqual(1, warm_up.get_status()['attempts'], 'missing parquet path is retried')
+        mock_sleep.assert_not_called()
+        return
+
+    @patch('parquet_flask.io_logic.retrieve_spark_session.RetrieveSparkSession', MockRetrieveSparkSession)
+    @patch('parquet_flask.io_logic.spark_warm_up.sleep')
+    def test_read_error(self, mock_sleep):
+        os.environ['spark_warm_up'] = 'true'
+        Singleton._instances.pop(SparkWarmUp, None)
+        MockRetrieveSparkSession.read_error = AnalysisException(message='[UNABLE_TO_INFER_SCHEMA] Unable to infer schema.')
+        mock_sleep.side_effect = [None, InterruptedError('stop retrying')]
+        warm_up = SparkWarmUp()
+        with self.assertRaises(InterruptedError):
+            warm_up.start()
+        self.assertFalse(warm_up.is_ready, 'ready after failed reads')
+        self.assertEqual(SparkWarmUp.WARMING_UP, warm_up.get_status()['status'], 'wrong status while retrying')
+        self.assertEqual(2, MockRetrieveSparkSession.calls, 'failed read is not retried')
+        self.assertTrue('UNABLE_TO_INFER_SCHEMA' in warm_up.get_status()['details'], 'error is not in status')
+        return
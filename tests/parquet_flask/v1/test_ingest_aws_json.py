@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.v1.ingest_aws_json import IngestAwsJson, IngestAwsJsonProps
+
+
+class TestIngestAwsJson(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_io = MagicMock()
+        self.s3 = MagicMock()
+        self.s3.set_s3_url.return_value = self.s3
+        self.s3.get_s3_obj_etag_size.return_value = ('mock_etag', 10)
+        self.patchers = [
+            patch('parquet_flask.v1.ingest_aws_json.MetadataTblFactory', return_value=MagicMock(get_instance=MagicMock(return_value=self.db_io))),
+            patch('parquet_flask.v1.ingest_aws_json.AwsS3', return_value=self.s3),
+        ]
+        for each in self.patchers:
+            each.start()
+        return
+
+    def tearDown(self) -> None:
+        for each in self.patchers:
+            each.stop()
+        self.tmp_dir.cleanup()
+        return
+
+    def __create_props(self):
+        props = IngestAwsJsonProps()
+        props.s3_url = 's3://bucket/a.json'
+        props.uuid = 'new_job_id'
+        props.working_dir = self.tmp_dir.name
+        props.is_replacing = True
+        return props
+
+    def test_skip_unchanged_etag(self):
+        self.db_io.get_by_s3_url.return_value = {CDMSConstants.uuid_key: 'existing_job_id', CDMSConstants.s3_etag_key: 'mock_etag', CDMSConstants.s3_size_key: 10}
+        response, code = IngestAwsJson(self.__create_props()).ingest()
+        self.assertEqual(200, code, f'wrong code: {response}')
+        self.assertEqual('existing_job_id', response['job_id'], 'job_id of the existing record is not returned')
+        self.s3.download.assert_not_called()
+        return
+
+    def test_skip_unchanged_sha512(self):
+        def mock_download(working_dir):
+            with open(os.path.join(working_dir, 'a.json'), 'w') as ff:
+                ff.write('{"observations": []}')
+            return os.path.join(working_dir, 'a.json')
+        self.s3.download.side_effect = mock_download
+        file_sha512 = FileUtils.get_checksum(mock_download(self.tmp_dir.name))
+        self.db_io.get_by_s3_url.return_value = {CDMSConstants.uuid_key: 'existing_job_id', CDMSConstants.s3_etag_key: 'old_etag',
+                                                 CDMSConstants.s3_size_key: 10, CDMSConstants.checksum_key: file_sha512}
+        response, code = IngestAwsJson(self.__create_props()).ingest()
+        self.assertEqual(200, code, f'wrong code: {response}')
+        self.assertEqual('existing_job_id', response['job_id'], 'job_id of the existing record is not returned')
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'a.json')), 'downloaded file is not deleted')
+        return
@@ -0,0 +1,263 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from parquet_flask import get_app
+from parquet_flask.io_logic.cdms_constants import CDMSConstants
+from parquet_flask.utils.file_utils import FileUtils
+from parquet_flask.v1.ingest_aws_json_batch import IngestAwsJsonBatch, IngestAwsJsonBatchProps
+
+
+class MockDbIo:
+    def __init__(self):
+        self.existing_records = {}
+        self.failing_s3_urls = []
+        self.written_records = []
+        self.deleted_s3_urls = []
+
+    def get_by_s3_urls(self, s3_urls: list):
+        return {k: self.existing_records[k] for k in s3_urls if k in self.existing_records}
+
+    def write_records(self, new_records: list, is_replacing: bool):
+        self.written_records.extend(new_records)
+        return [{'s3_url': k[CDMSConstants.s3_url_key], 'details': 'mock write error'} for k in new_records if k[CDMSConstants.s3_url_key] in self.failing_s3_urls]
+
+    def delete_records(self, s3_urls: list):
+        self.deleted_s3_urls.extend(s3_urls)
+        return
+
+
+class MockMetadataTblFactory:
+    db_io = MockDbIo()
+
+    def get_instance(self):
+        return self.db_io
+
+
+class MockIngestAwsJson:
+    """
+    s3 urls with `missing` fail to download. s3 urls with `corrupted` are downloaded, but cannot be parsed.
+    """
+    def __init__(self, props):
+        self.__props = props
+        self.saved_file_name = None
+        self.sha512_result = True
+        self.file_sha512 = f'sha512_{props.s3_url}'
+
+    def download(self):
+        if 'missing' in self.__props.s3_url:
+            raise FileNotFoundError(f'mock missing s3 file: {self.__props.s3_url}')
+        FileUtils.mk_dir_p(self.__props.working_dir)
+        self.saved_file_name = os.path.join(self.__props.working_dir, 'downloaded.json')
+        with open(self.saved_file_name, 'w') as ff:
+            ff.write('{"observations": [' if 'corrupted' in self.__props.s3_url else '{"observations": [{}, {}]}')
+        return
+
+    def create_metadata_record(self, num_records, start_time, end_time, stage_timings):
+        return {CDMSConstants.s3_url_key: self.__props.s3_url, CDMSConstants.uuid_key: self.__props.uuid, CDMSConstants.records_count_key: num_records}
+
+
+class MockAwsS3:
+    sizes = {}
+    head_s3_urls = []
+
+    def __init__(self):
+        self.__s3_url = None
+
+    def set_s3_url(self, s3_url):
+        self.__s3_url = s3_url
+        return self
+
+    def get_s3_obj_etag_size(self):
+        MockAwsS3.head_s3_urls.append(self.__s3_url)
+        if self.__s3_url not in MockAwsS3.sizes:
+            raise FileNotFoundError(f'mock missing s3 file: {self.__s3_url}')
+        return 'mock_etag', MockAwsS3.sizes[self.__s3_url]
+
+
+class MockIngestNewJsonFile:
+    written_jsons = []
+    deleted_job_ids = []
+
+    def __init__(self, is_overwriting=False):
+        self.sanitize_record = True
+        self.ingested_partitions = [('p1', 'j1', '30')]
+
+    def read_json(self, abs_file_path):
+        input_json = FileUtils.read_json(abs_file_path)
+        if input_json is None:
+            raise ValueError(f'invalid json file: {abs_file_path}')
+        return input_json
+
+    def write_json_objects(self, input_json_list: list, job_id):
+        MockIngestNewJsonFile.written_jsons.extend(input_json_list)
+        return
+
+    def delete_job_rows(self, job_id):
+        MockIngestNewJsonFile.deleted_job_ids.append(job_id)
+        return 1
+
+
+class TestIngestAwsJsonBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        MockMetadataTblFactory.db_io = MockDbIo()
+        MockIngestNewJsonFile.written_jsons = []
+        MockIngestNewJsonFile.deleted_job_ids = []
+        self.patchers = [
+            patch('parquet_flask.v1.ingest_aws_json_batch.MetadataTblFactory', MockMetadataTblFactory),
+            patch('parquet_flask.v1.ingest_aws_json_batch.IngestAwsJson', MockIngestAwsJson),
+            patch('parquet_flask.v1.ingest_aws_json_batch.IngestNewJsonFile', MockIngestNewJsonFile),
+        ]
+        for each in self.patchers:
+            each.start()
+        return
+
+    def tearDown(self) -> None:
+        for each in self.patchers:
+            each.stop()
+        self.tmp_dir.cleanup()
+        return
+
+    def __create_props(self, s3_urls: list):
+        props = IngestAwsJsonBatchProps()
+        props.s3_urls = s3_urls
+        props.working_dir = self.tmp_dir.name
+        return props
+
+    def test_ingest(self):
+        s3_urls = ['s3://bucket/a.json', 's3://bucket/b.json', 's3://bucket/a.json']
+        response, code = IngestAwsJsonBatch(self.__create_props(s3_urls)).ingest()
+        self.assertEqual(201, code, f'wrong code: {response}')
+        self.assertEqual(2, response['ingested'], f'duplicated url is not removed: {response}')
+        self.assertEqual(4, response['records_count'], f'wrong records_count: {response}')
+        self.assertEqual([], response['failed'], f'wrong failed: {response}')
+        self.assertEqual([], response['skipped'], f'wrong skipped: {response}')
+        self.assertEqual(2, len(MockIngestNewJsonFile.written_jsons), 'files are not written in 1 batch')
+        self.assertEqual([2, 2], [k[CDMSConstants.batch_size_key] for k in MockMetadataTblFactory.db_io.written_records], 'wrong batch size in metadata')
+        self.assertEqual([], [k for k in os.listdir(self.tmp_dir.name) for _ in os.listdir(os.path.join(self.tmp_dir.name, k))], 'downloaded files are not deleted')
+        return
+
+    def test_partial_failures(self):
+        s3_urls = ['s3://bucket/a.json', 's3://bucket/missing.json', 's3://bucket/corrupted.json', 's3://bucket/d.json']
+        response, code = IngestAwsJsonBatch(self.__create_props(s3_urls)).ingest()
+        self.assertEqual(207, code, f'wrong code: {response}')
+        self.assertEqual(2, response['ingested'], f'wrong ingested count: {response}')
+        self.assertEqual(4, response['records_count'], f'records of a and d are written to parquet: {response}')
+        self.assertEqual(['s3://bucket/missing.json', 's3://bucket/corrupted.json'], [k['s3_url'] for k in response['failed']],
+                         f'wrong failed: {response}')
+        self.assertTrue('mock missing s3 file' in response['failed'][0]['details'], f'download error is not in details: {response}')
+        self.assertEqual(2, len(MockIngestNewJsonFile.written_jsons), 'failed files are written')
+        return
+
+    def test_metadata_failure(self):
+        MockMetadataTblFactory.db_io.failing_s3_urls = ['s3://bucket/d.json']
+        props = self.__create_props(['s3://bucket/a.json', 's3://bucket/missing.json', 's3://bucket/d.json'])
+        response, code = IngestAwsJsonBatch(props).ingest()
+        self.assertEqual(500, code, f'wrong code: {response}')
+        self.assertEqual(['s3://bucket/missing.json', 's3://bucket/d.json'], [k['s3_url'] for k in response['failed']], f'wrong failed: {response}')
+        self.assertEqual([props.uuid], MockIngestNewJsonFile.deleted_job_ids, 'parquet rows of the batch are not deleted')
+        self.assertEqual(['s3://bucket/a.json'], MockMetadataTblFactory.db_io.deleted_s3_urls, 'written metadata records are not deleted')
+        return
+
+    def test_metadata_failure_of_replace(self):
+        MockMetadataTblFactory.db_io.existing_records = {k: {CDMSConstants.uuid_key: 'job1', CDMSConstants.batch_size_key: 2} for k in ['s3://bucket/a.json', 's3://bucket/d.json']}
+        MockMetadataTblFactory.db_io.failing_s3_urls = ['s3://bucket/d.json']
+        props = self.__create_props(['s3://bucket/a.json', 's3://bucket/d.json'])
+        props.uuid = 'job1'
+        props.is_replacing = True
+        response, code = IngestAwsJsonBatch(props).ingest()
+        self.assertEqual(207, code, f'wrong code: {response}')
+        self.assertEqual(['s3://bucket/d.json'], [k['s3_url'] for k in response['failed']], f'wrong failed: {response}')
+        self.assertEqual([], MockIngestNewJsonFile.deleted_job_ids, 'replaced rows cannot be rolled back')
+        return
+
+    @patch('parquet_flask.v1.ingest_aws_json_batch.IngestWorkerPool')
+    @patch('parquet_flask.v1.ingest_aws_json_batch.AwsS3', MockAwsS3)
+    def test_async_total_size(self, mock_pool):
+        MockAwsS3.sizes = {'s3://bucket/a.json': 10, 's3://bucket/b.json': 20}
+        MockAwsS3.head_s3_urls = []
+        props = self.__create_props(['s3://bucket/a.json', 's3://bucket/b.json', 's3://bucket/missing.json'])
+        props.wait_till_complete = False
+        response, code = IngestAwsJsonBatch(props).ingest()
+        self.assertEqual(202, code, f'wrong code: {response}')
+        self.assertEqual(30, mock_pool.return_value.submit.call_args[0][0]['file_size'], 'sizes of explicit s3 urls are not in the job')
+        props = self.__create_props(['s3://bucket/a.json'])
+        props.wait_till_complete = False
+        props.total_size = 100
+        IngestAwsJsonBatch(props).ingest()
+        self.assertEqual(100, mock_pool.return_value.submit.call_args[0][0]['file_size'], 'listed total_size is overwritten')
+        self.assertEqual(3, len(MockAwsS3.head_s3_urls), 'listed files are HEADed again')
+        return
+
+    def test_all_failed(self):
+        response, code = IngestAwsJsonBatch(self.__create_props(['s3://bucket/missing1.json', 's3://bucket/missing2.json'])).ingest()
+        self.assertEqual(500, code, f'wrong code: {response}')
+        self.assertEqual(2, len(response['failed']), f'wrong failed: {response}')
+        self.assertEqual([], MockIngestNewJsonFile.written_jsons, 'nothing should be written')
+        return
+
+    def test_skip_ingested(self):
+        MockMetadataTblFactory.db_io.existing_records = {'s3://bucket/a.json': {CDMSConstants.uuid_key: 'old_job'}}
+        response, code = IngestAwsJsonBatch(self.__create_props(['s3://bucket/a.json', 's3://bucket/b.json'])).ingest()
+        self.assertEqual(201, code, f'wrong code: {response}')
+        self.assertEqual(['s3://bucket/a.json'], response['skipped'], f'wrong skipped: {response}')
+        self.assertEqual(1, response['ingested'], f'wrong ingested count: {response}')
+        self.assertEqual(['s3://bucket/b.json'], [k[CDMSConstants.s3_url_key] for k in MockMetadataTblFactory.db_io.written_records], 'ingested file is written again')
+
+        response, code = IngestAwsJsonBatch(self.__create_props(['s3://bucket/a.json'])).ingest()
+        self.assertEqual(200, code, f'wrong code: {response}')
+        self.assertEqual('all files are already ingested', response['message'], f'wrong message: {response}')
+        return
+
+    def test_replace_needs_whole_batch(self):
+        MockMetadataTblFactory.db_io.existing_records = {k: {CDMSConstants.uuid_key: 'job1', CDMSConstants.batch_size_key: 2} for k in ['s3://bucket/a.json', 's3://bucket/b.json']}
+        props = self.__create_props(['s3://bucket/a.json'])
+        props.uuid = 'job1'
+        props.is_replacing = True
+        response, code = IngestAwsJsonBatch(props).ingest()
+        self.assertEqual(500, code, f'replacing a part of batch: {response}')
+        self.assertEqual([], MockIngestNewJsonFile.written_jsons, 'nothing should be written')
+        return
+
+
+class TestIngestJsonS3Batch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.auth_patcher = patch('parquet_flask.v1.authenticator_decorator.CachedAuthenticator')
+        self.auth_patcher.start().return_value.authenticate.return_value = None
+        self.client = get_app().test_client()
+        return
+
+    def tearDown(self) -> None:
+        self.auth_patcher.stop()
+        os.environ.pop('ingest_batch_max_files', None)
+        return
+
+    def test_invalid_body(self):
+        response = self.client.put('/1.0/ingest_json_s3_batch', json={'s3_urls': []})
+        self.assertEqual(400, response.status_code, f'empty s3_urls: {response.json}')
+        response = self.client.put('/1.0/ingest_json_s3_batch', json={'s3_urls': ['s3://bucket/a.json'], 's3_prefix': 's3://bucket/'})
+        self.assertEqual(400, response.status_code, f's3_urls and s3_prefix together: {response.json}')
+        return
+
+    def test_too_many_files(self):
+        os.environ['ingest_batch_max_files'] = '2'
+        response = self.client.put('/1.0/ingest_json_s3_batch', json={'s3_urls': ['s3://bucket/a.json', 's3://bucket/b.json', 's3://bucket/c.json']})
+        self.assertEqual(400, response.status_code, f'too many files: {response.json}')
+        return
+
+    @patch('parquet_flask.v1.ingest_json_s3_batch.IngestAwsJsonBatch')
+    @patch('parquet_flask.v1.ingest_json_s3_batch.AwsS3')
+    def test_s3_prefix(self, mock_s3, mock_batch):
+        mock_s3.return_value.split_s3_url.return_value = ('bucket', 'prefix/')
+        mock_s3.return_value.get_child_s3_files.return_value = [('prefix/a.json', 10), ('prefix/b.json.gz', 20)]
+        mock_batch.return_value.ingest.return_value = ({'message': 'ingested'}, 201)
+        response = self.client.put('/1.0/ingest_json_s3_batch', json={'s3_prefix': 's3://bucket/prefix/', 'wait_till_finish': False})
+        self.assertEqual(201, response.status_code, f'wrong status code: {response.json}')
+        props = mock_batch.call_args[0][0]
+        self.assertEqual(['s3://bucket/prefix/a.json', 's3://bucket/prefix/b.json.gz'], props.s3_urls, 'wrong s3_urls from prefix')
+        self.assertEqual(30, props.total_size, 'wrong total_size')
+        self.assertFalse(props.wait_till_complete, 'wrong wait_till_complete')
+        self.assertFalse(props.is_replacing, 'wrong is_replacing')
+        return
@@ -0,0 +1,85 @@
+import json
+import os
+import unittest
+from time import sleep
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+from parquet_flask import get_app
+from parquet_flask.io_logic.query_admission_control import QueryAdmissionControl
+from parquet_flask.utils.singleton import Singleton
+
+QUERY_STRING = 'startTime=2017-01-01T00:00:00Z&endTime=2017-02-01T00:00:00Z&minDepth=-99&maxDepth=0&bbox=-90,-45,90,45&provider=mock_provider'
+
+
+class MockQueryV4:
+    QUERY_SECONDS = 0.5
+
+    def __init__(self, props):
+        self.props = props
+        self.disconnect_check = None
+        self.timing = None
+
+    def search(self):
+        sleep(self.QUERY_SECONDS)  # blocking like a spark call
+        return {'total': 0, 'results': []}
+
+
+class TestQueryDataDoms(unittest.TestCase):
+    """
+    Running the app on a gevent WSGIServer without monkey patching, which is how parquet_flask.__main__ runs it.
+    Clients are run in the gevent threadpool so that the server keeps running in this thread.
+    """
+    def setUp(self) -> None:
+        os.environ['query_max_concurrent_jobs'] = '1'
+        os.environ['query_max_queued_jobs'] = '1'
+        os.environ['query_admission_wait_seconds'] = '0.1'
+        Singleton._instances.pop(QueryAdmissionControl, None)
+        self.query_patcher = patch('parquet_flask.v1.query_data_doms.QueryV4', MockQueryV4)
+        self.query_patcher.start()
+        self.server = WSGIServer(('127.0.0.1', 0), get_app(), log=None)
+        self.server.start()
+        return
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.query_patcher.stop()
+        for k in ['query_max_concurrent_jobs', 'query_max_queued_jobs', 'query_admission_wait_seconds']:
+            os.environ.pop(k)
+        Singleton._instances.pop(QueryAdmissionControl, None)
+        return
+
+    def __get(self):
+        try:
+            with urlopen(f'http://127.0.0.1:{self.server.server_port}/1.0/query_data_doms?{QUERY_STRING}') as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def __get_concurrently(self, num_requests: int):
+        threadpool = gevent.get_hub().threadpool
+        results = []
+        for _ in range(num_requests):
+            results.append(threadpool.spawn(self.__get))
+            gevent.sleep(0.05)  # keeping the order of arrival
+        return [k.get(timeout=10) for k in results]
+
+    def test_too_many_queries(self):
+        results = self.__get_concurrently(3)
+        self.assertEqual(200, results[0][0], f'running query failed: {results[0]}')
+        self.assertEqual(429, results[1][0], f'queued query is not rejected after waiting: {results[1]}')
+        self.assertEqual(429, results[2][0], f'query is not rejected when the queue is full: {results[2]}')
+        self.assertEqual(0, QueryAdmissionControl().running_jobs, 'running_jobs is not released')
+        self.assertEqual(0, QueryAdmissionControl().queued_jobs, 'queued_jobs is not released')
+        return
+
+    def test_queued_query_is_admitted(self):
+        os.environ['query_admission_wait_seconds'] = '5'
+        Singleton._instances.pop(QueryAdmissionControl, None)
+        results = self.__get_concurrently(2)
+        self.assertEqual([200, 200], [k[0] for k in results], f'queued query is not admitted: {results}')
+        return
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from parquet_flask import get_app
+from parquet_flask.io_logic.async_query_job import AsyncQueryJob
+from parquet_flask.utils.singleton import Singleton
+from tests.parquet_flask.io_logic.test_async_query_job import MockQueryV4, wait_for_job
+
+
+QUERY_STRING = 'startTime=2017-01-01T00:00:00Z&endTime=2017-02-01T00:00:00Z&minDepth=-99&maxDepth=0&bbox=-90,-45,90,45'
+
+
+class TestQueryDataDomsAsync(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.environ['query_spool_dir'] = self.tmp_dir.name
+        Singleton._instances.pop(AsyncQueryJob, None)
+        self.query_patcher = patch('parquet_flask.io_logic.async_query_job.QueryV4', MockQueryV4)
+        self.query_patcher.start()
+        self.client = get_app().test_client()
+        return
+
+    def tearDown(self) -> None:
+        self.query_patcher.stop()
+        os.environ.pop('query_spool_dir')
+        Singleton._instances.pop(AsyncQueryJob, None)
+        self.tmp_dir.cleanup()
+        return
+
+    def test_submit_status_and_files(self):
+        response = self.client.get(f'/1.0/query_data_doms_async?provider=mock_provider&{QUERY_STRING}&format=ndjson')
+        self.assertEqual(202, response.status_code, f'wrong status code: {response.json}')
+        job_id = response.json['job_id']
+        self.assertTrue(response.json['status'].endswith(f'/1.0/query_data_doms_async/{job_id}'), f'wrong status url: {response.json}')
+        wait_for_job(AsyncQueryJob(), job_id)
+
+        response = self.client.get(f'/1.0/query_data_doms_async/{job_id}')
+        self.assertEqual(200, response.status_code, f'wrong status code: {response.json}')
+        self.assertEqual(AsyncQueryJob.DONE, response.json['status'], f'wrong job status: {response.json}')
+        self.assertEqual(['part-00000.parquet', 'part-00001.parquet'], [k['name'] for k in response.json['files']], f'wrong files: {response.json}')
+
+        response = self.client.get(response.json['files'][0]['url'].replace('http://localhost', ''))
+        self.assertEqual(200, response.status_code, 'failed to download result file')
+        self.assertEqual(b'mock', response.data, 'wrong file content')
+        response.close()
+        return
+
+    def test_invalid_format(self):
+        response = self.client.get(f'/1.0/query_data_doms_async?provider=mock_provider&{QUERY_STRING}&format=csv')
+        self.assertEqual(400, response.status_code, f'wrong status code: {response.json}')
+        return
+
+    def test_submit_with_post(self):
+        response = self.client.post(f'/1.0/query_data_doms_async?provider=mock_provider&{QUERY_STRING}')
+        self.assertEqual(405, response.status_code, 'only GET submits an async query')
+        return
+
+    def test_unknown_job(self):
+        self.assertEqual(404, self.client.get('/1.0/query_data_doms_async/unknown_job').status_code, 'unknown job status')
+        self.assertEqual(404, self.client.get('/1.0/query_data_doms_async/unknown_job/files/part-00000.parquet').status_code, 'unknown job file')
+        return
+
+    def test_failed_job(self):
+        response = self.client.get(f'/1.0/query_data_doms_async?provider=failing_provider&{QUERY_STRING}')
+        job_id = response.json['job_id']
+        wait_for_job(AsyncQueryJob(), job_id)
+        response = self.client.get(f'/1.0/query_data_doms_async/{job_id}')
+        self.assertEqual(AsyncQueryJob.FAILED, response.json['status'], f'wrong job status: {response.json}')
+        self.assertTrue('files' not in response.json, f'failed job should not have files: {response.json}')
+        self.assertEqual(404, self.client.get(f'/1.0/query_data_doms_async/{job_id}/files/part-00000.parquet').status_code, 'failed job file')
+        return